@@ -1,7 +1,11 @@
+import json
+import numpy as np
 import pandas as pd
 import re
 import math
-from typing import Any
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 
 # 🔹 Add this where yo
@@ -13,321 +17,297 @@ from typing import Any
 # Capture the last tab as the Account Overview tab
 # *_, account_tab = st.tabs([*getattr(st.session_state, "TAB_LABELS", ["Risk Analysis", "Liquidity", "Profitability"]), "Account Overview"])
 
-def main(Iteam_List_df: pd.DataFrame, Payment_History_df: pd.DataFrame)-> pd.DataFrame:
-    import pandas as pd
-    import streamlit as st
-
-    # Heading (keep as in Excel)
-    st.header("ACCOUNT OVERVIEW")
-
-    # ---- Table structure (headings/subheadings exactly as in the Excel layout) ----
-    # Row labels (left-most column) in the same order as the Excel:
-    row_labels = [
-        "OSC01",
-        "Aerotek",
-        "OCS03",
-        "Aviation",
-        "Aston Carter",
-        "SJA01",
-        "Actalent",
-        "CE",
-        "Scientific",
-        "Services",
-        "Actalent Canada",
-        "Services_EASCA",          # Services - EASCA
-        "Aerotek Canada",
-        "Aston Carter Canada",
-        "MLA/IEL",
-        "Teksystems",
-        "Tek Global",
-        "Totals",            # totals row at the end
-    ]
-
-    num_rows_lables = [
-        "OSC01",
-        "OCS03",
-        "Aviation",
-        "SJA01",
-        "CE",
-        "Scientific",
-        "Services",
-        "Actalent Canada",
-        "Services_EASCA",          # Services - EASCA
-        "Aerotek Canada",
-        "Aston Carter Canada",
-        "MLA/IEL",
-        "Teksystems",
-        "Tek Global",
-    ]
-
-    # Column headers as shown in the Excel (ignore numeric values, keep header text)
-    col_headers = ["Current", "1-30", "31-60", "61-90", "91-180", "181+",  "Total"]
-
-    # Create an empty dataframe with the same shape; values will be supplied from your existing DataFrames
-    account_overview_df = pd.DataFrame(
-        data=[[""] * len(col_headers) for _ in row_labels],  # placeholders only
-        index=row_labels,
-        columns = col_headers
+# Rows of the aging table and the item-list Units they sum, in display order (see the file's description)
+BUSINESS_UNITS_PATH = "business_units.json"
+TOTALS_LABEL = "Totals"
+
+# Aging buckets of `Days Late`, right-closed: Current is <= 0, 1-30 is (0, 30], ..., 181+ is > 180
+AGING_BUCKETS = ["Current", "1-30", "31-60", "61-90", "91-180", "181+"]
+AGING_BIN_EDGES = [-np.inf, 0, 30, 60, 90, 180, np.inf]
+
+# Column headers as shown in the Excel (ignore numeric values, keep header text)
+COL_HEADERS = [*AGING_BUCKETS, "Total"]
+
+# Windows of the payment-history summary: last 3 months, last 12 months, whole history
+SINCE_LABEL = "Since 2/17/2006"
+SUMMARY_WINDOWS = ("L3M", "LTM", SINCE_LABEL)
+
+
+@lru_cache(maxsize=None)
+def load_business_units(path: str = BUSINESS_UNITS_PATH) -> Tuple[List[str], Dict[str, str], Dict[str, List[str]]]:
+    """
+    Load the business-unit mapping of the aging table.
+
+    Args:
+        path: JSON file with a "rows" list; each row has a label and either the
+              Unit codes it sums ("units") or the rows it rolls up ("children")
+
+    Returns:
+        (row labels in display order, Unit code -> row label, roll-up row -> child rows)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        rows = json.load(f)["rows"]
+
+    row_labels = [row["label"] for row in rows]
+    unit_rows = {}
+    rollups = {}
+    for row in rows:
+        for unit in row.get("units", []):
+            if unit in unit_rows:
+                raise ValueError(f"Unit {unit} is mapped to both {unit_rows[unit]} and {row['label']}")
+            unit_rows[unit] = row["label"]
+        if row.get("children"):
+            unknown = [child for child in row["children"] if child not in row_labels]
+            if unknown:
+                raise ValueError(f"Roll-up {row['label']} has unknown rows: {', '.join(unknown)}")
+            rollups[row["label"]] = row["children"]
+    return row_labels, unit_rows, rollups
+
+
+def aging_balances(Iteam_List_df: pd.DataFrame, business_units_path: str = BUSINESS_UNITS_PATH) -> pd.DataFrame:
+    """
+    Unrounded item balances per aging-table row and bucket, in one pass.
+
+    Every item is assigned its row (from Unit, through the business-unit
+    mapping) and aging bucket (from `Days Late`) and the balances are summed
+    per row and bucket at once. The sums of separate chunks of an item list
+    add up to the sums of the whole list.
+
+    Args:
+        Iteam_List_df: Item list (or a chunk of one) with Unit, Days Late and Item Balance columns
+        business_units_path: Business-unit mapping (see load_business_units)
+
+    Returns:
+        DataFrame indexed by the rows that have units, with AGING_BUCKETS columns
+    """
+    row_labels, unit_rows, _ = load_business_units(business_units_path)
+    num_rows_lables = [label for label in row_labels if label in set(unit_rows.values())]
+
+    rows = Iteam_List_df["Unit"].astype(object).map(unit_rows)
+    buckets = pd.cut(Iteam_List_df["Days Late"], bins=AGING_BIN_EDGES, labels=AGING_BUCKETS,
+                     right=True, include_lowest=True)
+    balances = Iteam_List_df["Item Balance"].astype("float64")
+
+    values = balances.groupby([rows, buckets], observed=False).sum().unstack().rename_axis(index=None, columns=None)
+    return values.reindex(index=num_rows_lables, columns=AGING_BUCKETS, fill_value=0.0).fillna(0.0)
+
+
+def format_aging_table(balances: pd.DataFrame, business_units_path: str = BUSINESS_UNITS_PATH) -> pd.DataFrame:
+    """
+    Aging table from the balances of aging_balances.
+
+    Cells are rounded to 2 decimals before the Total column, the roll-up
+    rows and the Totals row add them up, as in the Excel.
+
+    Args:
+        balances: Output of aging_balances (summed over chunks if the item list was read in chunks)
+        business_units_path: Business-unit mapping (see load_business_units)
+
+    Returns:
+        DataFrame indexed by the mapping's row labels and Totals with
+        COL_HEADERS columns, values formatted as "1,234.56"
+    """
+    row_labels, _, rollups = load_business_units(business_units_path)
+    values = balances.round(2)
+    values["Total"] = values[AGING_BUCKETS].sum(axis=1).round(2)
+    totals = values.sum(axis=0).round(2)
+
+    def roll_up(label):
+        if label not in values.index:
+            values.loc[label] = pd.concat([roll_up(child) for child in rollups[label]], axis=1).sum(axis=1).round(2)
+        return values.loc[label]
+
+    for label in rollups:
+        roll_up(label)
+    values.loc[TOTALS_LABEL] = totals
+
+    # Only numeric cells are formatted; rows without values stay blank
+    formatted = values.apply(lambda column: column.map("{:,.2f}".format))
+    return formatted.reindex(index=[*row_labels, TOTALS_LABEL], columns=COL_HEADERS, fill_value="")
+
+
+def aging_table(Iteam_List_df: pd.DataFrame, business_units_path: str = BUSINESS_UNITS_PATH) -> pd.DataFrame:
+    """
+    Aging table of the item list, computed in one pass.
+
+    Args:
+        Iteam_List_df: Item list with Unit, Days Late and Item Balance columns
+        business_units_path: Business-unit mapping (see load_business_units)
+
+    Returns:
+        DataFrame indexed by the mapping's row labels and Totals with
+        COL_HEADERS columns, values formatted as "1,234.56"
+    """
+    return format_aging_table(aging_balances(Iteam_List_df, business_units_path), business_units_path)
+
+
+def total_credits(Iteam_List_df: pd.DataFrame) -> float:
+    """Sum of the negative item balances."""
+    balances = Iteam_List_df['Item Balance']
+    return balances[balances < 0].sum()
+
+
+@dataclass
+class AccountOverview:
+    """Aging table and payment-history summary of one customer's uploads"""
+    aging: pd.DataFrame
+    # Window (SUMMARY_WINDOWS) -> value
+    invoices_paid: Dict[str, int]
+    amount_paid: Dict[str, float]
+    average_dpd: Dict[str, float]
+    last_payment_date: Optional[pd.Timestamp]
+    last_payment_amount: float
+    net_terms: Any
+    total_credits: float
+
+
+def resolve_reference_date(reference_date=None) -> pd.Timestamp:
+    """Date the L3M and LTM windows end on; today if not given."""
+    return pd.Timestamp.today().normalize() if reference_date is None else pd.Timestamp(reference_date)
+
+
+def payment_totals(Payment_History_df: pd.DataFrame,
+                   reference_date: pd.Timestamp) -> Tuple[pd.DataFrame, Optional[pd.Timestamp], float]:
+    """
+    Additive payment-history totals, in one vectorized pass.
+
+    Dates, amounts and days past due are parsed once and every payment is
+    assigned the narrowest summary window it falls in (L3M, else LTM, else
+    older or undated), aggregated with one groupby. The totals of separate
+    chunks of a history add up to the totals of the whole history. The
+    input is neither modified nor copied.
+
+    Args:
+        Payment_History_df: Payment history (or a chunk of one) with Payment Date,
+                            Amt Applied to Customer and Days Past Due columns
+        reference_date: Date the L3M (91 days) and LTM (365 days) windows end on
+
+    Returns:
+        (DataFrame indexed by narrowest window 0 = L3M, 1 = LTM, 2 = older or undated
+         with payments, amounts, amount_paid, dpd_total and dpd_count columns,
+         last payment date or None, amount paid on the last payment's calendar day)
+    """
+    payment_dates = pd.to_datetime(Payment_History_df['Payment Date'], errors='coerce')
+    # Accumulated in float64 even when the columns were read with compact dtypes
+    amounts = pd.to_numeric(Payment_History_df['Amt Applied to Customer'], errors='coerce').astype("float64")
+    days_past_due = pd.to_numeric(Payment_History_df['Days Past Due'], errors='coerce').astype("float64")
+
+    window = np.select(
+        [payment_dates >= reference_date - pd.Timedelta(days=91),
+         payment_dates >= reference_date - pd.Timedelta(days=365)],
+        [0, 1],
+        default=2,
     )
-    # def value, decimals=0):
-    #     """
-    #     Format a numeric value with commas (e.g. 31983000 -> '31,983,000').
-
-    #     Args:
-    #         value: int, float, or numeric string
-    #         decimals: number of decimal places to display (default 0)
-
-    #     Returns:
-    #         str: formatted number with commas (e.g. '31,983,000' or '31,983,000.25')
-    #     """
-    #     try:
-    #         if pd.isna(value):
-    #             return "-"
-    #         value = float(value)
-    #         return f"{value:,.{decimals}f}"
-    #     except (ValueError, TypeError):
-    #         return str(value)
-        
-    # def  value) -> str:
-    #     """Format financial values"""
-    #     if pd.isna(value) or value is None:
-    #         return "-"
-    #     # Convert to thousands
-    #     value = value / 1000
-    #     if value < 0:
-    #         return f"$({abs(value):,.0f})"
-    #     else:
-    #         return f"${value:,.0f}"
-
-
-
-    # 👉 If you already compute values elsewhere, just assign them into `account_overview_df`
-    # Example (pseudo):
-    # account_overview_df.loc[:, col_headers] = your_values_df.loc[row_labels, col_headers].values
-    # Assigning values to OSC01.
-    account_overview_df.loc["OSC01", "Current"] = Iteam_List_df.query('Unit == "OCS01" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["OSC01", "1-30"] = Iteam_List_df.query('Unit == "OCS01" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["OSC01", "31-60"] = Iteam_List_df.query('Unit == "OCS01" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["OSC01", "61-90"] = Iteam_List_df.query('Unit == "OCS01" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["OSC01", "91-180"] =Iteam_List_df.query('Unit == "OCS01" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["OSC01", "181+"] = Iteam_List_df.query('Unit == "OCS01" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["OSC01", "Total"] = account_overview_df.loc["OSC01", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to OSC03.
-    account_overview_df.loc["OCS03", "Current"] = Iteam_List_df.query('Unit == "OCS03" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["OCS03", "1-30"] = Iteam_List_df.query('Unit == "OCS03" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["OCS03", "31-60"] = Iteam_List_df.query('Unit == "OCS03" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["OCS03", "61-90"] = Iteam_List_df.query('Unit == "OCS03" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["OCS03", "91-180"] = Iteam_List_df.query('Unit == "OCS03" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["OCS03", "181+"] = Iteam_List_df.query('Unit == "OCS03" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["OCS03", "Total"] = account_overview_df.loc["OCS03", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to Avaiation.)
-    account_overview_df.loc["Aviation", "Current"] = Iteam_List_df.query('Unit == "OAV01" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aviation", "1-30"] = Iteam_List_df.query('Unit == "OAV01" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aviation", "31-60"] = Iteam_List_df.query('Unit == "OAV01" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aviation", "61-90"] = Iteam_List_df.query('Unit == "OAV01" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aviation", "91-180"] = Iteam_List_df.query('Unit == "OAV01" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aviation", "181+"] = Iteam_List_df.query('Unit == "OAV01" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aviation", "Total"] = account_overview_df.loc["Aviation", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to SJA01.
-    account_overview_df.loc["SJA01", "Current"] = Iteam_List_df.query('Unit == "SJA01" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["SJA01", "1-30"] = Iteam_List_df.query('Unit == "SJA01" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["SJA01", "31-60"] = Iteam_List_df.query('Unit == "SJA01" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["SJA01", "61-90"] = Iteam_List_df.query('Unit == "SJA01" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["SJA01", "91-180"] = Iteam_List_df.query('Unit == "SJA01" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["SJA01", "181+"] = Iteam_List_df.query('Unit == "SJA01" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["SJA01", "Total"] = account_overview_df.loc["SJA01", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to CE."{:,.0f}".format(
-    account_overview_df.loc["CE", "Current"] = Iteam_List_df.query('Unit == "OCS02" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["CE", "1-30"] = Iteam_List_df.query('Unit == "OCS02" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["CE", "31-60"] = Iteam_List_df.query('Unit == "OCS02" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["CE", "61-90"] = Iteam_List_df.query('Unit == "OCS02" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["CE", "91-180"] = Iteam_List_df.query('Unit == "OCS02" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["CE", "181+"] = Iteam_List_df.query('Unit == "OCS02" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["CE", "Total"] = account_overview_df.loc["CE", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to Scientific.
-    account_overview_df.loc["Scientific", "Current"] = Iteam_List_df.query('Unit == "ASC01" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Scientific", "1-30"] = Iteam_List_df.query('Unit == "ASC01" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Scientific", "31-60"] = Iteam_List_df.query('Unit == "ASC01" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Scientific", "61-90"] = Iteam_List_df.query('Unit == "ASC01" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Scientific", "91-180"] = Iteam_List_df.query('Unit == "ASC01" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Scientific", "181+"] = Iteam_List_df.query('Unit == "ASC01" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Scientific", "Total"] = account_overview_df.loc["Scientific", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to Services.
-    account_overview_df.loc["Services", "Current"] = Iteam_List_df.query('Unit == "INP01" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Services", "1-30"] = Iteam_List_df.query('Unit == "INP01" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Services", "31-60"] = Iteam_List_df.query('Unit == "INP01" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Services", "61-90"] = Iteam_List_df.query('Unit == "INP01" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Services", "91-180"] = Iteam_List_df.query('Unit == "INP01" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Services", "181+"] = Iteam_List_df.query('Unit == "INP01" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Services", "Total"] = account_overview_df.loc["Services", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to Actalent Canada.
-    account_overview_df.loc["Actalent Canada", "Current"] = Iteam_List_df.query('Unit == "CACOR" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Actalent Canada", "1-30"] = Iteam_List_df.query('Unit == "CACOR" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Actalent Canada", "31-60"] = Iteam_List_df.query('Unit == "CACOR" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Actalent Canada", "61-90"] = Iteam_List_df.query('Unit == "CACOR" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Actalent Canada", "91-180"] = Iteam_List_df.query('Unit == "CACOR" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Actalent Canada", "181+"] = Iteam_List_df.query('Unit == "CACOR" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Actalent Canada", "Total"] = account_overview_df.loc["Actalent Canada", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to Services_EASCA.
-    account_overview_df.loc["Services_EASCA", "Current"] = Iteam_List_df.query('Unit == "EASCA" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Services_EASCA", "1-30"] = Iteam_List_df.query('Unit == "EASCA" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Services_EASCA", "31-60"] = Iteam_List_df.query('Unit == "EASCA" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Services_EASCA", "61-90"] = Iteam_List_df.query('Unit == "EASCA" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Services_EASCA", "91-180"] = Iteam_List_df.query('Unit == "EASCA" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Services_EASCA", "181+"] = Iteam_List_df.query('Unit == "EASCA" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Services_EASCA", "Total"] = account_overview_df.loc["Services_EASCA", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to Aerotek Canada.
-    account_overview_df.loc["Aerotek Canada", "Current"] = Iteam_List_df.query('Unit == "CAIND" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aerotek Canada", "1-30"] = Iteam_List_df.query('Unit == "CAIND" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aerotek Canada", "31-60"] = Iteam_List_df.query('Unit == "CAIND" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aerotek Canada", "61-90"] = Iteam_List_df.query('Unit == "CAIND" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aerotek Canada", "91-180"] = Iteam_List_df.query('Unit == "CAIND" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aerotek Canada", "181+"] = Iteam_List_df.query('Unit == "CAIND" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aerotek Canada", "Total"] = account_overview_df.loc["Aerotek Canada", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to Aston Carter Canada.
-    account_overview_df.loc["Aston Carter Canada", "Current"] = Iteam_List_df.query('Unit == "CAAC1" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aston Carter Canada", "1-30"] = Iteam_List_df.query('Unit == "CAAC1" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aston Carter Canada", "31-60"] = Iteam_List_df.query('Unit == "CAAC1" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aston Carter Canada", "61-90"] = Iteam_List_df.query('Unit == "CAAC1" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aston Carter Canada", "91-180"] = Iteam_List_df.query('Unit == "CAAC1" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aston Carter Canada", "181+"] = Iteam_List_df.query('Unit == "CAAC1" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Aston Carter Canada", "Total"] = account_overview_df.loc["Aston Carter Canada", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to MLA/IEL.
-    account_overview_df.loc["MLA/IEL", "Current"] = Iteam_List_df.query('Unit == "IELO1" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["MLA/IEL", "1-30"] = Iteam_List_df.query('Unit == "IELO1" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["MLA/IEL", "31-60"] = Iteam_List_df.query('Unit == "IELO1" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["MLA/IEL", "61-90"] = Iteam_List_df.query('Unit == "IELO1" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["MLA/IEL", "91-180"] = Iteam_List_df.query('Unit == "IELO1" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["MLA/IEL", "181+"] = Iteam_List_df.query('Unit == "IELO1" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["MLA/IEL", "Total"] = account_overview_df.loc["MLA/IEL", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to Teksystems.
-    account_overview_df.loc["Teksystems", "Current"] = Iteam_List_df.query('Unit == "TEK01" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Teksystems", "1-30"] = Iteam_List_df.query('Unit == "TEK01" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Teksystems", "31-60"] = Iteam_List_df.query('Unit == "TEK01" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Teksystems", "61-90"] = Iteam_List_df.query('Unit == "TEK01" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Teksystems", "91-180"] = Iteam_List_df.query('Unit == "TEK01" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Teksystems", "181+"] = Iteam_List_df.query('Unit == "TEK01" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Teksystems", "Total"] = account_overview_df.loc["Teksystems", col_headers[:-1]].sum().round(2)
-
-    # assigning values to Tek Global.
-    account_overview_df.loc["Tek Global", "Current"] = Iteam_List_df.query('Unit == "TKC01" and `Days Late` <= 0')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Tek Global", "1-30"] = Iteam_List_df.query('Unit == "TKC01" and `Days Late` > 0 and `Days Late` <= 30')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Tek Global", "31-60"] = Iteam_List_df.query('Unit == "TKC01" and `Days Late` > 30 and `Days Late` <= 60')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Tek Global", "61-90"] = Iteam_List_df.query('Unit == "TKC01" and `Days Late` > 60 and `Days Late` <= 90')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Tek Global", "91-180"] = Iteam_List_df.query('Unit == "TKC01" and `Days Late` > 90 and `Days Late` <= 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Tek Global", "181+"] = Iteam_List_df.query('Unit == "TKC01" and `Days Late` > 180')['Item Balance'].sum().round(2)
-    account_overview_df.loc["Tek Global", "Total"] = account_overview_df.loc["Tek Global", col_headers[:-1]].sum().round(2)
-
-    # Assigning values to Totals.
-    account_overview_df.loc["Totals", "Current"] = account_overview_df.loc[num_rows_lables, "Current"].sum().round(2)
-    account_overview_df.loc["Totals", "1-30"] = account_overview_df.loc[num_rows_lables, "1-30"].sum().round(2)
-    account_overview_df.loc["Totals", "31-60"] = account_overview_df.loc[num_rows_lables, "31-60"].sum().round(2)
-    account_overview_df.loc["Totals", "61-90"] = account_overview_df.loc[num_rows_lables, "61-90"].sum().round(2)
-    account_overview_df.loc["Totals", "91-180"] = account_overview_df.loc[num_rows_lables, "91-180"].sum().round(2)
-    account_overview_df.loc["Totals", "181+"] = account_overview_df.loc[num_rows_lables, "181+"].sum().round(2)
-    account_overview_df.loc["Totals", "Total"] = account_overview_df.loc[num_rows_lables, "Total"].sum().round(2)
-
-    # Only format numeric values, leave strings as they are
-    account_overview_df = account_overview_df.applymap(lambda x: f'{x:,.2f}' if isinstance(x, (int, float)) else x)
-
-
-
-    
-    # ---------- invoice paid-----------
-    # L3M_invoices_paid = Payment_History_df[pd.to_datetime(Payment_History_df['Payment Date']) >= (pd.to_datetime('08-09-2024') - pd.DateOffset(months=3))]['Invoice Number'].nunique()
-    payment_history = pd.DataFrame(columns=["Payment Date"])
-
-    payment_history["Payment Date"] = pd.to_datetime(Payment_History_df['Payment Date'], errors='coerce')
-
-    # F5 is your reference date (as a pandas Timestamp or parseable string)
-    # example: f5 = pd.Timestamp('2025-09-01')
-    cutoff_90 = pd.to_datetime('08-09-2024') - pd.Timedelta(days=91)
-
-    L3M_invoices_paid = (payment_history['Payment Date'] >= cutoff_90).sum()
-
-    #LTM Invoice paid
-    cutoff_365 = pd.to_datetime('08-09-2024') - pd.Timedelta(days=365)
-    LTM_invoice_paid  = (payment_history['Payment Date'] >= cutoff_365).sum()
-
-    Invoice_paid_2006 = Payment_History_df['Amt Applied to Customer'].count()
-
-    # ----------------$paid amount-----------
-    # Ensure Payment Date is in datetime format
-    Payment_History_df['Payment Date'] = pd.to_datetime(Payment_History_df['Payment Date'], errors="coerce")
-
-    # Define cutoff date (last 91 days from today)
-    cutoff_paid_90 = pd.to_datetime('08-09-2024') - pd.Timedelta(days=91)
-
-    # Filter and sum
-    L3M_Paid_90 = Payment_History_df.loc[Payment_History_df["Payment Date"] >= cutoff_paid_90, "Amt Applied to Customer"].sum()
-
-    cutoff_paid_365 = pd.to_datetime('08-09-2024') - pd.Timedelta(days=365)
-
-    # Filter and sum
-    LTM_Paid_365 = Payment_History_df.loc[Payment_History_df["Payment Date"] >= cutoff_paid_365, "Amt Applied to Customer"].sum()
-
-    # Amount_paid_2006
-    Amount_paid_2006 = Payment_History_df["Amt Applied to Customer"].sum()
-
-    # -----------Average DPD----------------
-
-    L3L_averageDPD__90 = Payment_History_df.loc[Payment_History_df["Payment Date"] >= cutoff_paid_90, "Days Past Due"].mean()
-    LTM_averageDPD_365 = Payment_History_df.loc[Payment_History_df["Payment Date"] >= cutoff_paid_365, "Days Past Due"].mean()
-    Average_DPD_2006 = Payment_History_df["Days Past Due"].mean()
-
-
-    # Total credits
-    total_credits = Iteam_List_df.query('`Item Balance` < 0')['Item Balance'].sum()
-
-
-    # ---------------LAst Payment and Amount----------------
-    
-    df = Payment_History_df.copy()
+    by_window = pd.DataFrame({"window": window, "amount": amounts, "dpd": days_past_due}).groupby("window").agg(
+        payments=("window", "size"),
+        amounts=("amount", "count"),
+        amount_paid=("amount", "sum"),
+        dpd_total=("dpd", "sum"),
+        dpd_count=("dpd", "count"),
+    )
+    by_window = by_window.reindex(range(len(SUMMARY_WINDOWS)), fill_value=0)
 
-    # 1) Parse dates safely
-    df['Payment Date'] = pd.to_datetime(df['Payment Date'], errors='coerce')  # add dayfirst=True if needed
+    # Last payment and the amount paid on its calendar day (ignores time-of-day)
+    last_ts = payment_dates.max()
+    if pd.isna(last_ts):
+        return by_window, None, 0.0
+    return by_window, last_ts, amounts[payment_dates >= last_ts.normalize()].sum()
+
+
+def summarize_payments(by_window: pd.DataFrame, last_payment_date: Optional[pd.Timestamp],
+                       last_payment_amount: float, net_terms: Any) -> Dict[str, Any]:
+    """
+    Payment-history metrics of the account summary from payment_totals.
+
+    Each window contains the narrower ones, so the window totals are
+    accumulated into the L3M, LTM and whole-history figures.
+
+    Returns:
+        dict with invoices_paid, amount_paid and average_dpd per window,
+        last_payment_date, last_payment_amount and net_terms
+    """
+    cumulative = by_window.cumsum()
+    cumulative.index = list(SUMMARY_WINDOWS)
+    average_dpd = cumulative["dpd_total"] / cumulative["dpd_count"].replace(0, np.nan)
+
+    # Invoices paid count the payments of the window; over the whole history, payments with an amount
+    invoices_paid = cumulative["payments"].to_dict()
+    invoices_paid[SINCE_LABEL] = cumulative.loc[SINCE_LABEL, "amounts"]
+
+    return {
+        "invoices_paid": invoices_paid,
+        "amount_paid": cumulative["amount_paid"].to_dict(),
+        "average_dpd": average_dpd.to_dict(),
+        "last_payment_date": last_payment_date,
+        "last_payment_amount": last_payment_amount,
+        "net_terms": net_terms,
+    }
+
+
+def payment_history_metrics(Payment_History_df: pd.DataFrame, reference_date=None) -> Dict[str, Any]:
+    """
+    Payment-history metrics of the account summary, in one vectorized pass.
+
+    Args:
+        Payment_History_df: Payment history with Payment Date, Amt Applied to Customer,
+                            Days Past Due and Terms columns
+        reference_date: Date the L3M (91 days) and LTM (365 days) windows end on
+                        (anything pd.Timestamp accepts; defaults to today)
+
+    Returns:
+        dict with invoices_paid, amount_paid and average_dpd per window,
+        last_payment_date, last_payment_amount and net_terms
+    """
+    by_window, last_payment_date, last_payment_amount = payment_totals(
+        Payment_History_df, resolve_reference_date(reference_date))
 
-    # 2) Parse amounts safely (handles '$', commas, etc. if present)
-    df['Amt Applied to Customer'] = pd.to_numeric(
-        df['Amt Applied to Customer'], errors='coerce'
+    # Net terms
+    net_terms = Payment_History_df['Terms'].iloc[0] if not Payment_History_df.empty else "N/A"
+    return summarize_payments(by_window, last_payment_date, last_payment_amount, net_terms)
+
+
+def compute_account_overview(Iteam_List_df: pd.DataFrame, Payment_History_df: pd.DataFrame,
+                             reference_date=None,
+                             business_units_path: str = BUSINESS_UNITS_PATH) -> AccountOverview:
+    """
+    Compute the account overview of an item list and payment history.
+
+    Pure computation: nothing is rendered and the inputs are not modified,
+    so the result can be computed once per upload and shared by the
+    Streamlit tab and the HTML report.
+
+    Args:
+        Iteam_List_df: Item list with Unit, Days Late and Item Balance columns
+        Payment_History_df: Payment history with Payment Date, Amt Applied to Customer,
+                            Days Past Due and Terms columns
+        reference_date: Date the L3M and LTM windows end on (defaults to today)
+        business_units_path: Business-unit mapping of the aging table
+
+    Returns:
+        AccountOverview
+    """
+    return AccountOverview(
+        aging=aging_table(Iteam_List_df, business_units_path),
+        total_credits=total_credits(Iteam_List_df),
+        **payment_history_metrics(Payment_History_df, reference_date),
     )
 
-    # 3) Find the last payment date (skip NaT)
-    last_ts = df['Payment Date'].max()
-
-    if pd.isna(last_ts):
-        Last_Payment = pd.NaT
-        Last_Payment_Date_Amount = 0.0
-    else:
-        # If you care about exact timestamp:
-        # mask = df['Payment Date'].eq(last_ts)
 
-        # If you care about the calendar day (ignores time-of-day):
-        mask = df['Payment Date'].dt.normalize().eq(last_ts.normalize())
+def format_payment_date(value: Optional[pd.Timestamp]) -> str:
+    """Last payment date as shown in the summary."""
+    return value.strftime('%m-%d-%Y') if value is not None else "N/A"
 
-        Last_Payment = last_ts
-        Last_Payment_Date_Amount = df.loc[mask, 'Amt Applied to Customer'].sum()
 
+def render_account_overview(overview: AccountOverview) -> None:
+    """Render a computed account overview in the current Streamlit container."""
+    import streamlit as st
 
-    # Net terms
-    Net_terms = Payment_History_df['Terms'].iloc[0]
-    
+    # Heading (keep as in Excel)
+    st.header("ACCOUNT OVERVIEW")
 
     # Render the table (structure-only; numbers come from your dataframes)
     st.dataframe(
-        account_overview_df,
+        overview.aging,
         use_container_width=True,
         hide_index=False
     )
@@ -342,34 +322,35 @@ def main(Iteam_List_df: pd.DataFrame, Payment_History_df: pd.DataFrame)-> pd.Dat
         h1.markdown(" ")  # empty leading cell
         h2.markdown("**L3M**")
         h3.markdown("**LTM**")
-        h4.markdown("**Since 2/17/2006**")
+        h4.markdown(f"**{SINCE_LABEL}**")
         with h5:
             st.markdown("**Last Payment Date:**")
-            st.markdown("05-08-2024")
+            st.markdown(format_payment_date(overview.last_payment_date))
 
         # Row: Invoices Paid
         c1, c2, c3, c4, c5 = st.columns([1.2, 1, 1, 1.2, 1.6])
         c1.markdown("**Invoices Paid**")
-        c2.markdown(L3M_invoices_paid)
-        c3.markdown(LTM_invoice_paid)
-        c4.markdown(Invoice_paid_2006)
-        c5.markdown("**Amount:** " f"${Last_Payment_Date_Amount}")
+        for column, window in zip((c2, c3, c4), SUMMARY_WINDOWS):
+            column.markdown(overview.invoices_paid[window])
+        c5.markdown("**Amount:** " f"${overview.last_payment_amount}")
 
         # Row: $ Paid
         c1, c2, c3, c4, c5 = st.columns([1.2, 1, 1, 1.2, 1.6])
         c1.markdown("**$ Paid**")
-        c2.markdown(L3M_Paid_90)
-        c3.markdown(LTM_Paid_365)
-        c4.markdown(Amount_paid_2006)
-        c5.markdown("**Net Terms:**  " f"{Net_terms}")
+        for column, window in zip((c2, c3, c4), SUMMARY_WINDOWS):
+            column.markdown(overview.amount_paid[window])
+        c5.markdown("**Net Terms:**  " f"{overview.net_terms}")
 
         # Row: Average DPD
         c1, c2, c3, c4, c5 = st.columns([1.2, 1, 1, 1.2, 1.6])
         c1.markdown("**Average DPD**")
-        c2.markdown(L3L_averageDPD__90)
-        c3.markdown(LTM_averageDPD_365)
-        c4.markdown(Average_DPD_2006)
-        c5.markdown("**Total Credits:** " f"${total_credits}")
-    return account_overview_df
- 
-    
+        for column, window in zip((c2, c3, c4), SUMMARY_WINDOWS):
+            column.markdown(overview.average_dpd[window])
+        c5.markdown("**Total Credits:** " f"${overview.total_credits}")
+
+
+def main(Iteam_List_df: pd.DataFrame, Payment_History_df: pd.DataFrame)-> pd.DataFrame:
+    """Compute and render the account overview; returns the aging table."""
+    overview = compute_account_overview(Iteam_List_df, Payment_History_df)
+    render_account_overview(overview)
+    return overview.aging
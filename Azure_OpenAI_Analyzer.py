@@ -38,6 +38,22 @@ from llama_index.embeddings.azure_openai import AzureOpenAIEmbedding
 from llama_index.core.indices.prompt_helper import PromptHelper
 from llama_index.core.callbacks import CallbackManager, LlamaDebugHandler
 
+# Bump whenever an analysis prompt changes so stored analyses are regenerated
+PROMPT_VERSION = "1"
+
+# Messages the analyze_* methods return in place of an analysis when they fail
+ANALYSIS_FALLBACK_PREFIXES = (
+    "AI analysis unavailable",
+    "Unable to",
+    "No risk-related details found",
+)
+
+
+def is_fallback_analysis(analysis) -> bool:
+    """True if an analyze_* result is a failure or fallback message rather than an analysis."""
+    return not analysis or str(analysis).strip().startswith(ANALYSIS_FALLBACK_PREFIXES)
+
+
 class AzureOpenAIAnalyzer:
     """Handles Azure OpenAI document analysis with vector embeddings"""
 
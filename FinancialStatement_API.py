@@ -1,12 +1,56 @@
-import requests
+import time
+import threading
 import pandas as pd
 import json
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from numeric_parser import parse_money
+from rate_limited_clients import get_session
+from nasdaq_cache import is_financials_payload, shared_cache
+
+NASDAQ_FINANCIALS_URL = "https://api.nasdaq.com/api/company/{ticker}/financials?frequency={frequency}"
+
+# NASDAQ payloads are shared across Financial_api instances for this long (0 disables)
+PAYLOAD_CACHE_TTL_SECONDS = 3600
+# Payloads held in memory at most; the on-disk NASDAQ cache holds the rest
+PAYLOAD_CACHE_MAX_ENTRIES = 64
+
+# (value column, Δ% column) labels of each frequency's period columns
+QUARTERLY_LABELS = ('Q{n}_{period}', 'Q{n}_Δ%')
+ANNUAL_LABELS = ('FY_{period}', 'FY_{period}_Δ%')
+
+_payload_cache = OrderedDict()
+_payload_cache_lock = threading.Lock()
+
+
+def _remember_payload(key, data, ttl):
+    """Share a payload in memory, evicting expired and least recently fetched payloads."""
+    now = time.time()
+    with _payload_cache_lock:
+        for expired in [k for k, (fetched_at, _) in _payload_cache.items() if now - fetched_at >= ttl]:
+            del _payload_cache[expired]
+        _payload_cache[key] = (now, data)
+        _payload_cache.move_to_end(key)
+        while len(_payload_cache) > PAYLOAD_CACHE_MAX_ENTRIES:
+            _payload_cache.popitem(last=False)
 
 class Financial_api:
     
-    def __init__(self, ticker):
+    def __init__(self, ticker, cache_ttl=PAYLOAD_CACHE_TTL_SECONDS, disk_cache=shared_cache):
+        """
+        Args:
+            ticker (str): Company ticker
+            cache_ttl (int): Seconds fetched payloads are shared with other instances (0 disables)
+            disk_cache (NasdaqCache): On-disk payload cache shared across sessions and restarts
+                                      (None disables)
+        """
         self.ticker = ticker
+        self.cache_ttl = cache_ttl
+        self.disk_cache = disk_cache
+        self._payloads = {}
+        self._payloads_lock = threading.Lock()
         self.HEADERS = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                         "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -39,14 +83,19 @@ class Financial_api:
             frequency (int): 1 for annual, 2 for quarterly
         
         Returns:
-            dict: JSON response data or None if request fails
+            dict: JSON response data or None if request fails or holds no financials
         """
-        url = f"https://api.nasdaq.com/api/company/{self.ticker}/financials?frequency={frequency}"
+        url = NASDAQ_FINANCIALS_URL.format(ticker=self.ticker, frequency=frequency)
         
         try:
-            response = requests.get(url, headers=self.HEADERS, timeout=10)
+            response = get_session().get(url, headers=self.HEADERS, timeout=10)
             if response.status_code == 200:
-                return response.json()
+                payload = response.json()
+                if is_financials_payload(payload):
+                    return payload
+                status = payload.get("status") if isinstance(payload, dict) else None
+                print(f"No financials returned for {self.ticker}: {status}")
+                return None
             else:
                 print(f"Request failed with status code: {response.status_code}")
                 return None
@@ -54,27 +103,57 @@ class Financial_api:
             print(f"Error fetching data: {e}")
             return None
     
-    def _clean_numeric_value(self, value):
-        """
-        Clean financial values by removing formatting and converting to numeric.
+    def get_financial_data(self, frequency=1):
         """
-        if pd.isna(value) or value == '' or value == 'N/A':
-            return np.nan
+        Get financial data for a frequency, fetching it at most once per instance.
         
-        # Convert to string and clean
-        value_str = str(value)
+        Payloads are also shared across instances for cache_ttl seconds and
+        through the on-disk cache, so several reports for the same ticker
+        download it once.
         
-        # Handle parentheses for negative numbers
-        if '(' in value_str:
-            value_str = '-' + value_str.replace('(', '').replace(')', '')
+        Args:
+            frequency (int): 1 for annual, 2 for quarterly
         
-        # Remove common formatting
-        value_str = value_str.replace('$', '').replace(',', '').replace('%', '')
+        Returns:
+            dict: JSON response data or None if request fails
+        """
+        with self._payloads_lock:
+            if frequency in self._payloads:
+                return self._payloads[frequency]
+        
+        key = (self.ticker.upper(), frequency)
+        data = None
+        if self.cache_ttl:
+            with _payload_cache_lock:
+                cached = _payload_cache.get(key)
+            if cached and time.time() - cached[0] < self.cache_ttl:
+                data = cached[1]
+        
+        if data is None:
+            if self.disk_cache is not None:
+                data = self.disk_cache.fetch(self.ticker, frequency, self.fetch_financial_data)
+            else:
+                data = self.fetch_financial_data(frequency)
+            if data is not None and self.cache_ttl:
+                _remember_payload(key, data, self.cache_ttl)
+        
+        # Failed fetches are not memoized so the next statement retries them
+        if data is not None:
+            with self._payloads_lock:
+                self._payloads[frequency] = data
+        return data
+    
+    def _fetch_quarterly_and_annual(self):
+        """
+        Get the quarterly and annual financial data, fetching both concurrently.
         
-        try:
-            return float(value_str)
-        except:
-            return np.nan
+        Returns:
+            tuple: (quarterly data, annual data)
+        """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            quarterly = executor.submit(self.get_financial_data, 2)
+            annual = executor.submit(self.get_financial_data, 1)
+            return quarterly.result(), annual.result()
     
     def _format_currency(self, value):
         """
@@ -87,13 +166,80 @@ class Financial_api:
         else:
             return f'${value:,.0f}'
     
-    def _calculate_percentage_change(self, current, previous):
+    def _percentage_changes(self, current, previous):
         """
-        Calculate percentage change between two values.
+        Calculate percentage changes between two Series of values.
         """
-        if pd.isna(current) or pd.isna(previous) or previous == 0:
-            return np.nan
-        return ((current - previous) / abs(previous))
+        return ((current - previous) / previous.abs()).where(previous != 0).tolist()
+    
+    def _statement_frame(self, statement_data):
+        """
+        Convert a statement payload into a DataFrame indexed by metric name.
+        
+        Args:
+            statement_data (dict): Statement table with 'headers' and 'rows'
+        
+        Returns:
+            tuple: (DataFrame with one value column per period, in header order,
+                    list of header values)
+        """
+        headers = statement_data.get('headers', {})
+        header_vals = self._ordered_header_values(headers) if headers else []
+        value_cols = [f'value{i+1}' for i in range(1, len(header_vals))]
+        
+        rows = pd.DataFrame(statement_data['rows'])
+        rows = rows.reindex(columns=['value1'] + value_cols)
+        rows['value1'] = rows['value1'].fillna('').astype(str).str.strip()
+        
+        # The first row of each metric wins
+        frame = rows.drop_duplicates('value1', keep='first').set_index('value1')
+        return frame, header_vals
+    
+    def _period_columns(self, statement_data, metrics_list, labels, currency=True):
+        """
+        Build the latest 3 period columns of one frequency.
+        
+        Args:
+            statement_data (dict): Statement table with 'headers' and 'rows'
+            metrics_list (list): Metrics to include, in order
+            labels (tuple): (value column, Δ% column) label formats
+            currency (bool): Format values as currency with Δ% columns for the first 2
+                             periods, instead of numeric values rounded to 2 decimals
+        
+        Returns:
+            dict: Column name -> values, in column order
+        """
+        columns = {}
+        if not statement_data or 'rows' not in statement_data:
+            return columns
+        
+        frame, header_vals = self._statement_frame(statement_data)
+        
+        # Select every period of every metric at once and clean them column by column
+        values = frame.reindex(index=metrics_list).apply(parse_money)
+        
+        num_periods = min(3, len(header_vals) - 1)  # -1 for 'Period Ending:' header
+        for i in range(num_periods):
+            col_idx = i + 1  # Skip first header
+            period = header_vals[col_idx]
+            value_label, change_label = (label.format(n=i + 1, period=period) for label in labels)
+            current = values[f'value{col_idx+1}']
+            
+            if not currency:
+                # Ratios stay numeric, rounded to 2 decimal places
+                columns[value_label] = current.round(2).tolist()
+                continue
+            
+            columns[value_label] = [self._format_currency(value) for value in current]
+            
+            # Calculate percentage change only for first 2 periods
+            if i < 2:
+                if col_idx + 1 < len(header_vals):
+                    columns[change_label] = self._percentage_changes(current, values[f'value{col_idx+2}'])
+                else:
+                    columns[change_label] = [np.nan] * len(metrics_list)
+        
+        return columns
     
     def _process_statement_data(self, quarterly_data, annual_data, metrics_list, statement_name):
         """
@@ -111,108 +257,8 @@ class Financial_api:
         # Create DataFrame structure
         df_data = {}
         df_data['Metric'] = metrics_list
-        
-        # Process quarterly data (latest 3 quarters)
-        if quarterly_data and 'rows' in quarterly_data:
-            headers = quarterly_data.get('headers', {})
-            rows = quarterly_data['rows']
-            
-            # Get header values
-            header_vals = self._ordered_header_values(headers) if headers else []
-            
-            # Extract latest 3 quarters
-            num_quarters = min(3, len(header_vals) - 1)  # -1 for 'Period Ending:' header
-            
-            for i in range(num_quarters):
-                col_idx = i + 1  # Skip first header
-                if col_idx < len(header_vals):
-                    # Add quarter date column
-                    quarter_col = f'Q{i+1}_{header_vals[col_idx]}'
-                    df_data[quarter_col] = []
-                    
-                    # Add percentage change column only for first 2 quarters
-                    if i < 2:
-                        change_col = f'Q{i+1}_Δ%'
-                        df_data[change_col] = []
-                    
-                    # Fill data for each metric
-                    for metric in metrics_list:
-                        # Find the metric in rows
-                        metric_value = None
-                        for row in rows:
-                            if row.get('value1', '').strip() == metric:
-                                metric_value = row.get(f'value{col_idx+1}', np.nan)
-                                break
-                        
-                        # Clean and format value
-                        clean_value = self._clean_numeric_value(metric_value)
-                        formatted_value = self._format_currency(clean_value)
-                        df_data[quarter_col].append(formatted_value)
-                        
-                        # Calculate percentage change only for first 2 quarters
-                        if i < 2:
-                            if col_idx + 1 < len(header_vals):
-                                prev_value = None
-                                for row in rows:
-                                    if row.get('value1', '').strip() == metric:
-                                        prev_value = row.get(f'value{col_idx+2}', np.nan)
-                                        break
-                                prev_clean = self._clean_numeric_value(prev_value)
-                                pct_change = self._calculate_percentage_change(clean_value, prev_clean)
-                                df_data[change_col].append(pct_change)
-                            else:
-                                df_data[change_col].append(np.nan)
-        
-        # Process annual data (latest 3 years)
-        if annual_data and 'rows' in annual_data:
-            headers = annual_data.get('headers', {})
-            rows = annual_data['rows']
-            
-            # Get header values
-            header_vals = self._ordered_header_values(headers) if headers else []
-            
-            # Extract latest 3 years
-            num_years = min(3, len(header_vals) - 1)  # -1 for 'Period Ending:' header
-            
-            for i in range(num_years):
-                col_idx = i + 1  # Skip first header
-                if col_idx < len(header_vals):
-                    # Add year column
-                    year_col = f'FY_{header_vals[col_idx]}'
-                    df_data[year_col] = []
-                    
-                    # Add percentage change column only for first 2 years
-                    if i < 2:
-                        change_col = f'FY_{header_vals[col_idx]}_Δ%'
-                        df_data[change_col] = []
-                    
-                    # Fill data for each metric
-                    for metric in metrics_list:
-                        # Find the metric in rows
-                        metric_value = None
-                        for row in rows:
-                            if row.get('value1', '').strip() == metric:
-                                metric_value = row.get(f'value{col_idx+1}', np.nan)
-                                break
-                        
-                        # Clean and format value
-                        clean_value = self._clean_numeric_value(metric_value)
-                        formatted_value = self._format_currency(clean_value)
-                        df_data[year_col].append(formatted_value)
-                        
-                        # Calculate percentage change only for first 2 years
-                        if i < 2:
-                            if col_idx + 1 < len(header_vals):
-                                prev_value = None
-                                for row in rows:
-                                    if row.get('value1', '').strip() == metric:
-                                        prev_value = row.get(f'value{col_idx+2}', np.nan)
-                                        break
-                                prev_clean = self._clean_numeric_value(prev_value)
-                                pct_change = self._calculate_percentage_change(clean_value, prev_clean)
-                                df_data[change_col].append(pct_change)
-                            else:
-                                df_data[change_col].append(np.nan)
+        df_data.update(self._period_columns(quarterly_data, metrics_list, QUARTERLY_LABELS))
+        df_data.update(self._period_columns(annual_data, metrics_list, ANNUAL_LABELS))
         
         # Create DataFrame
         df = pd.DataFrame(df_data)
@@ -246,9 +292,8 @@ class Financial_api:
             'Net Income'
         ]
         
-        # Fetch quarterly and annual data
-        quarterly_data = self.fetch_financial_data(frequency=2)  # Quarterly
-        annual_data = self.fetch_financial_data(frequency=1)     # Annual
+        # Fetch quarterly and annual data (once per instance)
+        quarterly_data, annual_data = self._fetch_quarterly_and_annual()
         
         # Extract income statement tables
         quarterly_income = None
@@ -271,32 +316,17 @@ class Financial_api:
         if not df_income.empty:
             # Calculate Operation Expenses = Research and Development + Sales, General and Admin. + Non-Recurring Items + Other Operating Items
             if 'Operating Expenses' in df_income.index:
-                for col in df_income.columns:
-                    if 'Δ%' not in col:  # Only for value columns
-                        try:
-                            # Get individual expense values
-                            r_and_d_val = df_income.loc['Research and Development', col]
-                            sg_and_a_val = df_income.loc['Sales, General and Admin.', col]
-                            non_recurring_val = df_income.loc['Non-Recurring Items', col]
-                            other_operating_val = df_income.loc['Other Operating Items', col]
-                            
-                            # Clean values to numeric for calculation
-                            r_and_d_numeric = self._clean_numeric_value(r_and_d_val)
-                            sg_and_a_numeric = self._clean_numeric_value(sg_and_a_val)
-                            non_recurring_numeric = self._clean_numeric_value(non_recurring_val)
-                            other_operating_numeric = self._clean_numeric_value(other_operating_val)
-                            
-                            # Sum up to get Operating Expenses
-                            total_operating_expenses = sum(filter(pd.notna, [
-                                r_and_d_numeric,
-                                sg_and_a_numeric,
-                                non_recurring_numeric,
-                                other_operating_numeric
-                            ]))
-                            
-                            df_income.loc['Operating Expenses', col] = self._format_currency(total_operating_expenses)
-                        except:
-                            pass
+                value_cols = [col for col in df_income.columns if 'Δ%' not in col]  # Only value columns
+                expense_items = ['Research and Development', 'Sales, General and Admin.',
+                                 'Non-Recurring Items', 'Other Operating Items']
+                
+                # Clean values to numeric for calculation and sum up to get Operating Expenses
+                expenses = df_income.loc[expense_items, value_cols].apply(parse_money)
+                total_operating_expenses = expenses.sum(skipna=True)
+                
+                df_income.loc['Operating Expenses', value_cols] = [
+                    self._format_currency(value) for value in total_operating_expenses
+                ]
         
         return df_income
     
@@ -325,9 +355,8 @@ class Financial_api:
             'Net Worth(OE)'
         ]
         
-        # Fetch quarterly and annual data
-        quarterly_data = self.fetch_financial_data(frequency=2)  # Quarterly
-        annual_data = self.fetch_financial_data(frequency=1)     # Annual
+        # Fetch quarterly and annual data (once per instance)
+        quarterly_data, annual_data = self._fetch_quarterly_and_annual()
         
         # Extract balance sheet tables
         quarterly_balance = None
@@ -349,48 +378,29 @@ class Financial_api:
         
         # Calculate Working Capital and Shares Outstanding
         if not df_balance.empty:
+            value_cols = [col for col in df_balance.columns if 'Δ%' not in col]  # Only value columns
+            
             # Calculate Working Capital = Total Current Assets - Total Current Liabilities
             if 'Working Capital' in df_balance.index:
-                for col in df_balance.columns:
-                    if 'Δ%' not in col:  # Only for value columns
-                        try:
-                            # Get Total Current Assets value
-                            current_assets_val = df_balance.loc['Total Current Assets', col]
-                            # Get Total Current Liabilities value
-                            current_liabilities_val = df_balance.loc['Total Current Liabilities', col]
-                            
-                            # Clean values to numeric for calculation
-                            ca_numeric = self._clean_numeric_value(current_assets_val)
-                            cl_numeric = self._clean_numeric_value(current_liabilities_val)
-                            
-                            if pd.notna(ca_numeric) and pd.notna(cl_numeric):
-                                working_capital = ca_numeric - cl_numeric
-                                df_balance.loc['Working Capital', col] = self._format_currency(working_capital)
-                        except:
-                            pass
+                self._set_difference(df_balance, 'Working Capital', 'Total Current Assets',
+                                     'Total Current Liabilities', value_cols)
             
             # Calculate Shares Outstanding = Total Assets - Total Liabilities
             if 'Net Worth(OE)' in df_balance.index:
-                for col in df_balance.columns:
-                    if 'Δ%' not in col:  # Only for value columns
-                        try:
-                            # Get Total Assets value
-                            total_assets_val = df_balance.loc['Total Assets', col]
-                            # Get Total Liabilities value
-                            total_liabilities_val = df_balance.loc['Total Liabilities', col]
-                            
-                            # Clean values to numeric for calculation
-                            ta_numeric = self._clean_numeric_value(total_assets_val)
-                            tl_numeric = self._clean_numeric_value(total_liabilities_val)
-                            
-                            if pd.notna(ta_numeric) and pd.notna(tl_numeric):
-                                shares_outstanding = ta_numeric - tl_numeric
-                                df_balance.loc['Net Worth(OE)', col] = self._format_currency(shares_outstanding)
-                        except:
-                            pass
+                self._set_difference(df_balance, 'Net Worth(OE)', 'Total Assets',
+                                     'Total Liabilities', value_cols)
         
         return df_balance
     
+    def _set_difference(self, df, target, minuend, subtrahend, value_cols):
+        """
+        Set a row to the difference of two other rows, for the columns where both are present.
+        """
+        difference = parse_money(df.loc[minuend, value_cols]) - parse_money(df.loc[subtrahend, value_cols])
+        difference = difference.dropna()
+        if not difference.empty:
+            df.loc[target, list(difference.index)] = [self._format_currency(value) for value in difference]
+    
     def get_cash_flow(self):
         """
         Extract and process cash flow statement data with latest 3 quarterly and 3 annual periods.
@@ -422,9 +432,8 @@ class Financial_api:
             'Net Cash Flow'
         ]
         
-        # Fetch quarterly and annual data
-        quarterly_data = self.fetch_financial_data(frequency=2)  # Quarterly
-        annual_data = self.fetch_financial_data(frequency=1)     # Annual
+        # Fetch quarterly and annual data (once per instance)
+        quarterly_data, annual_data = self._fetch_quarterly_and_annual()
         
         # Extract cash flow tables
         quarterly_cashflow = None
@@ -459,9 +468,8 @@ class Financial_api:
             'Quick Ratio'
         ]
         
-        # Fetch quarterly and annual data
-        quarterly_data = self.fetch_financial_data(frequency=2)  # Quarterly
-        annual_data = self.fetch_financial_data(frequency=1)     # Annual
+        # Fetch quarterly and annual data (once per instance)
+        quarterly_data, annual_data = self._fetch_quarterly_and_annual()
         
         # Extract financial ratios tables (if available)
         quarterly_ratios = None
@@ -503,74 +511,8 @@ class Financial_api:
         # Create DataFrame structure
         df_data = {}
         df_data['Metric'] = metrics_list
-        
-        # Process quarterly data (latest 3 quarters)
-        if quarterly_data and 'rows' in quarterly_data:
-            headers = quarterly_data.get('headers', {})
-            rows = quarterly_data['rows']
-            
-            # Get header values
-            header_vals = self._ordered_header_values(headers) if headers else []
-            
-            # Extract latest 3 quarters
-            num_quarters = min(3, len(header_vals) - 1)  # -1 for 'Period Ending:' header
-            
-            for i in range(num_quarters):
-                col_idx = i + 1  # Skip first header
-                if col_idx < len(header_vals):
-                    # Add quarter date column (no percentage change for ratios)
-                    quarter_col = f'Q{i+1}_{header_vals[col_idx]}'
-                    df_data[quarter_col] = []
-                    
-                    # Fill data for each metric
-                    for metric in metrics_list:
-                        # Find the metric in rows
-                        metric_value = None
-                        for row in rows:
-                            if row.get('value1', '').strip() == metric:
-                                metric_value = row.get(f'value{col_idx+1}', np.nan)
-                                break
-                        
-                        # Clean value but keep as numeric (no currency formatting for ratios)
-                        clean_value = self._clean_numeric_value(metric_value)
-                        # Round to 2 decimal places for ratios
-                        if pd.notna(clean_value):
-                            clean_value = round(clean_value, 2)
-                        df_data[quarter_col].append(clean_value)
-        
-        # Process annual data (latest 3 years)
-        if annual_data and 'rows' in annual_data:
-            headers = annual_data.get('headers', {})
-            rows = annual_data['rows']
-            
-            # Get header values
-            header_vals = self._ordered_header_values(headers) if headers else []
-            
-            # Extract latest 3 years
-            num_years = min(3, len(header_vals) - 1)  # -1 for 'Period Ending:' header
-            
-            for i in range(num_years):
-                col_idx = i + 1  # Skip first header
-                if col_idx < len(header_vals):
-                    # Add year column (no percentage change for ratios)
-                    year_col = f'FY_{header_vals[col_idx]}'
-                    df_data[year_col] = []
-                    
-                    # Fill data for each metric
-                    for metric in metrics_list:
-                        # Find the metric in rows
-                        metric_value = None
-                        for row in rows:
-                            if row.get('value1', '').strip() == metric:
-                                metric_value = row.get(f'value{col_idx+1}', np.nan)
-                                break
-                        
-                        # Clean value but keep as numeric (no currency formatting for ratios)
-                        clean_value = self._clean_numeric_value(metric_value)
-                        # Round to 2 decimal places for ratios
-                        if pd.notna(clean_value):
-                            clean_value = round(clean_value, 2)
-                        df_data[year_col].append(clean_value)
+        df_data.update(self._period_columns(quarterly_data, metrics_list, QUARTERLY_LABELS, currency=False))
+        df_data.update(self._period_columns(annual_data, metrics_list, ANNUAL_LABELS, currency=False))
         
         # Create DataFrame
         df = pd.DataFrame(df_data)
@@ -6,8 +6,14 @@ from datetime import datetime, timedelta
 # import PyPDF2
 # import io
 # import base64
+import time
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
+
+from statement_engine import FieldIndex, StatementTable, evaluate_ratios, format_thousands
 # import json
 # import re
 # import logging
@@ -20,69 +26,109 @@ from pathlib import Path
 # from openai import AzureOpenAI
 # import tiktoken
 
+# Statement key -> yfinance Ticker property; each property is a separate Yahoo request
+STATEMENT_ATTRIBUTES = {
+    "quarterly_balance_sheet": "quarterly_balance_sheet",
+    "annual_balance_sheet": "balance_sheet",
+    "quarterly_income": "quarterly_income_stmt",
+    "annual_income": "income_stmt",
+    "quarterly_cashflow": "quarterly_cash_flow",
+    "annual_cashflow": "cash_flow",
+}
+# Fetched statements are reused for this long by every fetcher of the same ticker
+STATEMENT_CACHE_TTL_SECONDS = 3600
+
+# Ticker -> (fetched at, statements), shared across fetchers in this process
+_statement_cache: Dict[str, Tuple[float, Dict[str, Optional[pd.DataFrame]]]] = {}
+_statement_cache_lock = threading.Lock()
+
+# st.session_state key of the per-session fetchers
+SESSION_FETCHERS_KEY = "financial_data_fetchers"
+
+
+def _memoize_by_data(method):
+    """
+    Memoize a table formatter on its fetcher for the last data set it formatted.
+
+    Fetched statements are memoized, so the same data object is passed on
+    every Streamlit rerun until it is refetched; a new data object is a new
+    data version and is formatted again.
+    """
+    @functools.wraps(method)
+    def wrapper(self, data):
+        cached = self._tables.get(method.__name__)
+        if cached is not None and cached[0] is data:
+            return cached[1]
+        table = method(self, data)
+        self._tables[method.__name__] = (data, table)
+        return table
+    return wrapper
+
+
 class FinancialDataFetcher:
     """Fetches financial data using yfinance"""
 
     def __init__(self, ticker: str):
         self.ticker = ticker.upper()
         self.stock = yf.Ticker(self.ticker)
+        self._field_indexes: Dict[int, FieldIndex] = {}
+        self._ratio_cache: Optional[Tuple[Dict, Dict]] = None
+        self._tables: Dict[str, Tuple[Dict, pd.DataFrame]] = {}
+
+    def get_financial_statements(self, use_cache: bool = True) -> Dict[str, pd.DataFrame]:
+        """
+        Fetch quarterly and annual financial statements.
+
+        The six statements are requested concurrently through the ticker's
+        shared session, and the result is memoized per ticker for
+        STATEMENT_CACHE_TTL_SECONDS so repeated calls do not refetch.
+
+        Args:
+            use_cache: Serve a memoized result if it is still fresh
+
+        Returns:
+            Statement key -> DataFrame (None for statements that failed), or {} if none were fetched
+        """
+        if use_cache:
+            with _statement_cache_lock:
+                cached = _statement_cache.get(self.ticker)
+            if cached and time.time() - cached[0] < STATEMENT_CACHE_TTL_SECONDS:
+                return cached[1]
 
-    def get_financial_statements(self) -> Dict[str, pd.DataFrame]:
-        """Fetch quarterly and annual financial statements"""
         try:
             with st.spinner(f"Fetching financial data for {self.ticker}..."):
-                # Fetch data with error handling for each statement
-                data = {}
-
-                try:
-                    data["quarterly_balance_sheet"] = self.stock.quarterly_balance_sheet
-                except:
-                    data["quarterly_balance_sheet"] = None
-
-                try:
-                    data["annual_balance_sheet"] = self.stock.balance_sheet
-                except:
-                    data["annual_balance_sheet"] = None
-
-                try:
-                    data["quarterly_income"] = self.stock.quarterly_income_stmt
-                except:
-                    data["quarterly_income"] = None
-
-                try:
-                    data["annual_income"] = self.stock.income_stmt
-                except:
-                    data["annual_income"] = None
-
-                try:
-                    data["quarterly_cashflow"] = self.stock.quarterly_cash_flow
-                except:
-                    data["quarterly_cashflow"] = None
-
-                try:
-                    data["annual_cashflow"] = self.stock.cash_flow
-                except:
-                    data["annual_cashflow"] = None
+                # Fetch the statements concurrently, with error handling for each statement
+                with ThreadPoolExecutor(max_workers=len(STATEMENT_ATTRIBUTES)) as executor:
+                    futures = {key: executor.submit(self._fetch_statement, attribute)
+                               for key, attribute in STATEMENT_ATTRIBUTES.items()}
+                    data = {key: future.result() for key, future in futures.items()}
 
                 # Check if we got any data
                 if all(v is None for v in data.values()):
                     st.error(f"No financial data available for {self.ticker}")
                     return {}
 
+                with _statement_cache_lock:
+                    _statement_cache[self.ticker] = (time.time(), data)
                 return data
 
         except Exception as e:
             st.error(f"Error fetching financial data: {str(e)}")
             return {}
 
+    def _fetch_statement(self, attribute: str) -> Optional[pd.DataFrame]:
+        """Read one yfinance statement property, None if the request fails"""
+        try:
+            return getattr(self.stock, attribute)
+        except Exception:
+            return None
+
+    @_memoize_by_data
     def format_financial_table(self, data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
         """Format financial data into display table matching Excel structure"""
         if not data:
             return pd.DataFrame()
 
-        # Create formatted table structure
-        formatted_data = []
-
         # Balance Sheet Items
         balance_sheet_items = [
             ("BALANCE SHEET", None, "section_header"),
@@ -110,69 +156,18 @@ class FinancialDataFetcher:
             ("Debt to Equity", None, "ratio"),
         ]
 
-        # Process balance sheet
-        for item_name, field_name, item_type in balance_sheet_items:
-            row_data = {"Item": item_name}
-
-            if item_type in ("section_header", "subsection", "blank"):
-                formatted_data.append(row_data)
-                continue
-
-            # Add last 3 quarters (labeled as Q, Q, Q)
-            if "quarterly_balance_sheet" in data and data["quarterly_balance_sheet"] is not None:
-                qbs = data["quarterly_balance_sheet"]
-                if not qbs.empty and field_name:
-                    matching_fields = [idx for idx in qbs.index if str(idx).strip().lower() == str(field_name).strip().lower()]
-                    if matching_fields:
-                        field_to_use = matching_fields[0]
-                        for i in range(min(3, len(qbs.columns))):
-                            col_name = f"Q {qbs.columns[i].strftime('%m/%d/%Y')}"
-                            value = qbs.loc[field_to_use].iloc[i]
-                            row_data[col_name] = self._format_value(value)
-                            if i > 0:
-                                prev_value = qbs.loc[field_to_use].iloc[i-1]
-                                pct_change = self._calculate_percentage_change(prev_value, value)
-                                row_data[f"Q Δ% {i}"] = pct_change
-
-            # Add last 3 annual data
-            if "annual_balance_sheet" in data and data["annual_balance_sheet"] is not None:
-                abs_data = data["annual_balance_sheet"]
-                if not abs_data.empty and field_name:
-                    matching_fields = [idx for idx in abs_data.index if str(idx).strip().lower() == str(field_name).strip().lower()]
-                    if matching_fields:
-                        field_to_use = matching_fields[0]
-                        for i in range(min(3, len(abs_data.columns))):
-                            col_name = f"FY {abs_data.columns[i].year}"
-                            value = abs_data.loc[field_to_use].iloc[i]
-                            row_data[col_name] = self._format_value(value)
-                            if i > 0:
-                                prev_value = abs_data.loc[field_to_use].iloc[i-1]
-                                pct_change = self._calculate_percentage_change(prev_value, value)
-                                row_data[f"FY{abs_data.columns[i].year} Δ%"] = pct_change
-
-            # Calculate special items
-            if item_name == "Working Capital":
-                row_data = self._calculate_working_capital(data, row_data)
-            elif item_name == "Net Worth (OE)":
-                row_data = self._calculate_net_worth(data, row_data)
-            elif item_name == "Current Ratio":
-                row_data = self._calculate_current_ratio(data, row_data)
-            elif item_name == "Quick Ratio":
-                row_data = self._calculate_quick_ratio(data, row_data)
-            elif item_name == "Debt to Equity":
-                row_data = self._calculate_debt_to_equity(data, row_data)
-
-            formatted_data.append(row_data)
-
-        return pd.DataFrame(formatted_data)
+        statement = StatementTable(balance_sheet_items, self._statements(data)["balance_sheet"],
+                                   field_index=self._field_index)
+
+        # Calculate special items
+        return statement.render(self._ratio_values(data))
 
+    @_memoize_by_data
     def format_income_statement(self, data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
         """Format income statement data"""
         if not data:
             return pd.DataFrame()
 
-        formatted_data = []
-
         income_items = [
             ("INCOME STATEMENT", None, "section_header"),
             ("Total Revenue", "Total Revenue", "item"),
@@ -191,64 +186,18 @@ class FinancialDataFetcher:
             # ("EPS Diluted", "Diluted EPS", "item"),
         ]
 
-        for item_name, field_name, item_type in income_items:
-            row_data = {"Item": item_name}
-
-            if item_type == "section_header":
-                formatted_data.append(row_data)
-                continue
-
-            # Add last 3 quarters with percentage changes
-            if "quarterly_income" in data and data["quarterly_income"] is not None:
-                qi = data["quarterly_income"]
-                if not qi.empty and field_name:
-                    matching_fields = [idx for idx in qi.index if str(idx).strip().lower() == str(field_name).strip().lower()]
-                    if matching_fields:
-                        field_to_use = matching_fields[0]
-                        for i in range(min(3, len(qi.columns))):
-                            col_name = f"Q {qi.columns[i].strftime('%m/%d/%Y')}"
-                            value = qi.loc[field_to_use].iloc[i]
-                            row_data[col_name] = self._format_value(value)
-                            if i > 0:
-                                prev_value = qi.loc[field_to_use].iloc[i-1]
-                                pct_change = self._calculate_percentage_change(prev_value, value)
-                                row_data[f"Q Δ% {i}"] = pct_change
-
-            # Add last 3 annual data with percentage changes
-            if "annual_income" in data and data["annual_income"] is not None:
-                ai = data["annual_income"]
-                if not ai.empty and field_name:
-                    matching_fields = [idx for idx in ai.index if str(idx).strip().lower() == str(field_name).strip().lower()]
-                    if matching_fields:
-                        field_to_use = matching_fields[0]
-                        for i in range(min(3, len(ai.columns))):
-                            col_name = f"FY {ai.columns[i].year}"
-                            value = ai.loc[field_to_use].iloc[i]
-                            row_data[col_name] = self._format_value(value)
-                            if i > 0:
-                                prev_value = ai.loc[field_to_use].iloc[i-1]
-                                pct_change = self._calculate_percentage_change(prev_value, value)
-                                row_data[f"FY{ai.columns[i].year} Δ%"] = pct_change
-
-            # Calculate margins
-            if item_name == "Gross Margin %":
-                row_data = self._calculate_gross_margin(data, row_data)
-            elif item_name == "Operating Margin %":
-                row_data = self._calculate_operating_margin(data, row_data)
-            elif item_name == "Net Margin %":
-                row_data = self._calculate_net_margin(data, row_data)
-
-            formatted_data.append(row_data)
-
-        return pd.DataFrame(formatted_data)
+        statement = StatementTable(income_items, self._statements(data)["income"],
+                                   field_index=self._field_index)
+
+        # Calculate margins
+        return statement.render(self._ratio_values(data))
 
+    @_memoize_by_data
     def format_cash_flow(self, data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
         """Format cash flow statement data"""
         if not data:
             return pd.DataFrame()
 
-        formatted_data = []
-
         cash_flow_items = [
             ("CASH FLOW STATEMENT", None, "section_header"),
             ("Operating Activities:", None, "subsection"),
@@ -274,381 +223,69 @@ class FinancialDataFetcher:
             ("Free Cash Flow", "Free Cash Flow", "item"),
         ]
 
-        for item_name, field_name, item_type in cash_flow_items:
-            row_data = {"Item": item_name}
-
-            if item_type in ["section_header", "subsection", "blank"]:
-                formatted_data.append(row_data)
-                continue
-
-            # Add last 3 quarters
-            if "quarterly_cashflow" in data and data["quarterly_cashflow"] is not None:
-                qcf = data["quarterly_cashflow"]
-                if not qcf.empty and field_name:
-                    matching_fields = [idx for idx in qcf.index if str(idx).strip().lower() == str(field_name).strip().lower()]
-                    if matching_fields:
-                        field_to_use = matching_fields[0]
-                        for i in range(min(3, len(qcf.columns))):
-                            col_name = f"Q {qcf.columns[i].strftime('%m/%d/%Y')}"
-                            value = qcf.loc[field_to_use].iloc[i]
-                            row_data[col_name] = self._format_value(value)
-
-            # Add last 3 annual data
-            if "annual_cashflow" in data and data["annual_cashflow"] is not None:
-                acf = data["annual_cashflow"]
-                if not acf.empty and field_name:
-                    matching_fields = [idx for idx in acf.index if str(idx).strip().lower() == str(field_name).strip().lower()]
-                    if matching_fields:
-                        field_to_use = matching_fields[0]
-                        for i in range(min(3, len(acf.columns))):
-                            col_name = f"FY {acf.columns[i].year}"
-                            value = acf.loc[field_to_use].iloc[i]
-                            row_data[col_name] = self._format_value(value)
-
-            # Calculate net cash flow
-            if item_name == "Net Cash Flow":
-                row_data = self._calculate_net_cash_flow(data, row_data)
-
-            formatted_data.append(row_data)
-
-        return pd.DataFrame(formatted_data)
+        statement = StatementTable(cash_flow_items, self._statements(data)["cash_flow"],
+                                   with_changes=False, field_index=self._field_index)
+
+        # Calculate net cash flow
+        return statement.render(self._ratio_values(data))
 
     def _format_value(self, value) -> str:
         """Format financial values"""
-        if pd.isna(value) or value is None:
-            return "-"
-        # Convert to thousands
-        value = value / 1000
-        if value < 0:
-            return f"$({abs(value):,.0f})"
-        else:
-            return f"${value:,.0f}"
-
-    def _calculate_percentage_change(self, old_value, new_value) -> str:
-        """Calculate percentage change between two values"""
-        if pd.isna(old_value) or pd.isna(new_value) or old_value == 0:
-            return "-"
-        pct_change = ((new_value - old_value) / abs(old_value)) * 100
-        if pct_change > 0:
-            return f'<span class="percentage-positive">+{pct_change:.1f}%</span>'
-        else:
-            return f'<span class="percentage-negative">{pct_change:.1f}%</span>'
-
-    def _find_field_in_index(self, df: pd.DataFrame, field_name: str) -> Optional[str]:
-        """Find matching field name in dataframe index"""
-        if df is None or df.empty or not field_name:
-            return None
-        if field_name in df.index:
-            return field_name
-        field_lower = field_name.lower()
-        for idx in df.index:
-            if str(idx).lower() == field_lower:
-                return idx
-        for idx in df.index:
-            if field_lower in str(idx).lower():
-                return idx
-        return None
-
-    def _calculate_working_capital(self, data: Dict, row_data: Dict) -> Dict:
-        """Calculate working capital"""
+        return format_thousands(value)
+
+    def _field_index(self, df: pd.DataFrame) -> FieldIndex:
+        """Normalized field index of a statement, built once per DataFrame"""
+        field_index = self._field_indexes.get(id(df))
+        if field_index is None or field_index.statement is not df:
+            field_index = FieldIndex(df)
+            self._field_indexes[id(df)] = field_index
+        return field_index
+
+    def _statements(self, data: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, Optional[pd.DataFrame]]]:
+        """Statements of the fetched data by statement and frequency"""
+        return {
+            "balance_sheet": {
+                "quarterly": data.get("quarterly_balance_sheet"),
+                "annual": data.get("annual_balance_sheet"),
+            },
+            "income": {
+                "quarterly": data.get("quarterly_income"),
+                "annual": data.get("annual_income"),
+            },
+            "cash_flow": {
+                "quarterly": data.get("quarterly_cashflow"),
+                "annual": data.get("annual_cashflow"),
+            },
+        }
+
+    def _ratio_values(self, data: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, pd.Series]]:
+        """All calculated rows and ratios of the fetched data, evaluated once per data set"""
+        if self._ratio_cache is not None and self._ratio_cache[0] is data:
+            return self._ratio_cache[1]
         try:
-            # Quarterly
-            if "quarterly_balance_sheet" in data and data["quarterly_balance_sheet"] is not None:
-                qbs = data["quarterly_balance_sheet"]
-                if not qbs.empty:
-                    ca_field = self._find_field_in_index(qbs, "Current Assets")
-                    cl_field = self._find_field_in_index(qbs, "Current Liabilities")
-                    if ca_field and cl_field:
-                        for i in range(min(3, len(qbs.columns))):
-                            ca = qbs.loc[ca_field].iloc[i]
-                            cl = qbs.loc[cl_field].iloc[i]
-                            col_name = f"Q {qbs.columns[i].strftime('%m/%d/%Y')}"
-                            row_data[col_name] = self._format_value(ca - cl)
-            # Annual
-            if "annual_balance_sheet" in data and data["annual_balance_sheet"] is not None:
-                abs_data = data["annual_balance_sheet"]
-                if not abs_data.empty:
-                    ca_field = self._find_field_in_index(abs_data, "Current Assets")
-                    cl_field = self._find_field_in_index(abs_data, "Current Liabilities")
-                    if ca_field and cl_field:
-                        for i in range(min(3, len(abs_data.columns))):
-                            ca = abs_data.loc[ca_field].iloc[i]
-                            cl = abs_data.loc[cl_field].iloc[i]
-                            col_name = f"FY {abs_data.columns[i].year}"
-                            row_data[col_name] = self._format_value(ca - cl)
+            ratio_values = evaluate_ratios(self._statements(data), field_index=self._field_index)
         except Exception as e:
-            st.warning(f"Could not calculate working capital: {str(e)}")
-        return row_data
+            st.warning(f"Could not calculate ratios: {str(e)}")
+            ratio_values = {}
+        self._ratio_cache = (data, ratio_values)
+        return ratio_values
 
-    def _calculate_net_worth(self, data: Dict, row_data: Dict) -> Dict:
-        """Calculate net worth (Total Assets - Total Liabilities)"""
-        try:
-            # Quarterly
-            if "quarterly_balance_sheet" in data and data["quarterly_balance_sheet"] is not None:
-                qbs = data["quarterly_balance_sheet"]
-                if not qbs.empty:
-                    ta_field = self._find_field_in_index(qbs, "Total Assets")
-                    tl_field = self._find_field_in_index(qbs, "Total Liabilities")
-                    if ta_field and tl_field:
-                        for i in range(min(3, len(qbs.columns))):
-                            ta = qbs.loc[ta_field].iloc[i]
-                            tl = qbs.loc[tl_field].iloc[i]
-                            col_name = f"Q {qbs.columns[i].strftime('%m/%d/%Y')}"
-                            row_data[col_name] = self._format_value(ta - tl)
-            # Annual
-            if "annual_balance_sheet" in data and data["annual_balance_sheet"] is not None:
-                abs_data = data["annual_balance_sheet"]
-                if not abs_data.empty:
-                    ta_field = self._find_field_in_index(abs_data, "Total Assets")
-                    tl_field = self._find_field_in_index(abs_data, "Total Liabilities")
-                    if ta_field and tl_field:
-                        for i in range(min(3, len(abs_data.columns))):
-                            ta = abs_data.loc[ta_field].iloc[i]
-                            tl = abs_data.loc[tl_field].iloc[i]
-                            col_name = f"FY {abs_data.columns[i].year}"
-                            row_data[col_name] = self._format_value(ta - tl)
-        except Exception as e:
-            st.warning(f"Could not calculate net worth: {str(e)}")
-        return row_data
-
-    def _calculate_current_ratio(self, data: Dict, row_data: Dict) -> Dict:
-        """Calculate current ratio"""
-        try:
-            # Quarterly
-            if "quarterly_balance_sheet" in data and data["quarterly_balance_sheet"] is not None:
-                qbs = data["quarterly_balance_sheet"]
-                if not qbs.empty:
-                    ca_field = self._find_field_in_index(qbs, "Current Assets")
-                    cl_field = self._find_field_in_index(qbs, "Current Liabilities")
-                    if ca_field and cl_field:
-                        for i in range(min(3, len(qbs.columns))):
-                            ca = qbs.loc[ca_field].iloc[i]
-                            cl = qbs.loc[cl_field].iloc[i]
-                            if cl != 0 and not pd.isna(cl):
-                                col_name = f"Q {qbs.columns[i].strftime('%m/%d/%Y')}"
-                                row_data[col_name] = f"{ca/cl:.2f}"
-            # Annual
-            if "annual_balance_sheet" in data and data["annual_balance_sheet"] is not None:
-                abs_data = data["annual_balance_sheet"]
-                if not abs_data.empty:
-                    ca_field = self._find_field_in_index(abs_data, "Current Assets")
-                    cl_field = self._find_field_in_index(abs_data, "Current Liabilities")
-                    if ca_field and cl_field:
-                        for i in range(min(3, len(abs_data.columns))):
-                            ca = abs_data.loc[ca_field].iloc[i]
-                            cl = abs_data.loc[cl_field].iloc[i]
-                            if cl != 0 and not pd.isna(cl):
-                                col_name = f"FY {abs_data.columns[i].year}"
-                                row_data[col_name] = f"{ca/cl:.2f}"
-        except Exception as e:
-            st.warning(f"Could not calculate current ratio: {str(e)}")
-        return row_data
-
-    def _calculate_quick_ratio(self, data: Dict, row_data: Dict) -> Dict:
-        """Calculate quick ratio"""
-        try:
-            # Quarterly
-            if "quarterly_balance_sheet" in data and data["quarterly_balance_sheet"] is not None:
-                qbs = data["quarterly_balance_sheet"]
-                if not qbs.empty:
-                    ca_field = self._find_field_in_index(qbs, "Current Assets")
-                    inv_field = self._find_field_in_index(qbs, "Inventory")
-                    cl_field = self._find_field_in_index(qbs, "Current Liabilities")
-                    if ca_field and cl_field:
-                        for i in range(min(3, len(qbs.columns))):
-                            ca = qbs.loc[ca_field].iloc[i]
-                            inv = qbs.loc[inv_field].iloc[i] if inv_field else 0
-                            cl = qbs.loc[cl_field].iloc[i]
-                            if cl != 0 and not pd.isna(cl):
-                                col_name = f"Q {qbs.columns[i].strftime('%m/%d/%Y')}"
-                                row_data[col_name] = f"{(ca-inv)/cl:.2f}"
-            # Annual
-            if "annual_balance_sheet" in data and data["annual_balance_sheet"] is not None:
-                abs_data = data["annual_balance_sheet"]
-                if not abs_data.empty:
-                    ca_field = self._find_field_in_index(abs_data, "Current Assets")
-                    inv_field = self._find_field_in_index(abs_data, "Inventory")
-                    cl_field = self._find_field_in_index(abs_data, "Current Liabilities")
-                    if ca_field and cl_field:
-                        for i in range(min(3, len(abs_data.columns))):
-                            ca = abs_data.loc[ca_field].iloc[i]
-                            inv = abs_data.loc[inv_field].iloc[i] if inv_field else 0
-                            cl = abs_data.loc[cl_field].iloc[i]
-                            if cl != 0 and not pd.isna(cl):
-                                col_name = f"FY {abs_data.columns[i].year}"
-                                row_data[col_name] = f"{(ca-inv)/cl:.2f}"
-        except Exception as e:
-            st.warning(f"Could not calculate quick ratio: {str(e)}")
-        return row_data
-
-    def _calculate_debt_to_equity(self, data: Dict, row_data: Dict) -> Dict:
-        """Calculate debt to equity ratio"""
-        try:
-            # Quarterly
-            if "quarterly_balance_sheet" in data and data["quarterly_balance_sheet"] is not None:
-                qbs = data["quarterly_balance_sheet"]
-                if not qbs.empty:
-                    tl_field = self._find_field_in_index(qbs, "Total Liabilities")
-                    ta_field = self._find_field_in_index(qbs, "Total Assets")
-                    if tl_field and ta_field:
-                        for i in range(min(3, len(qbs.columns))):
-                            tl = qbs.loc[tl_field].iloc[i]
-                            ta = qbs.loc[ta_field].iloc[i]
-                            equity = ta - tl
-                            if equity != 0 and not pd.isna(equity):
-                                col_name = f"Q {qbs.columns[i].strftime('%m/%d/%Y')}"
-                                row_data[col_name] = f"{tl/equity:.2f}"
-            # Annual
-            if "annual_balance_sheet" in data and data["annual_balance_sheet"] is not None:
-                abs_data = data["annual_balance_sheet"]
-                if not abs_data.empty:
-                    tl_field = self._find_field_in_index(abs_data, "Total Liabilities")
-                    ta_field = self._find_field_in_index(abs_data, "Total Assets")
-                    if tl_field and ta_field:
-                        for i in range(min(3, len(abs_data.columns))):
-                            tl = abs_data.loc[tl_field].iloc[i]
-                            ta = abs_data.loc[ta_field].iloc[i]
-                            equity = ta - tl
-                            if equity != 0 and not pd.isna(equity):
-                                col_name = f"FY {abs_data.columns[i].year}"
-                                row_data[col_name] = f"{tl/equity:.2f}"
-        except Exception as e:
-            st.warning(f"Could not calculate debt to equity: {str(e)}")
-        return row_data
-
-    def _calculate_gross_margin(self, data: Dict, row_data: Dict) -> Dict:
-        """Calculate gross margin percentage"""
-        try:
-            # Quarterly
-            if "quarterly_income" in data and data["quarterly_income"] is not None:
-                qi = data["quarterly_income"]
-                if not qi.empty:
-                    rev_field = self._find_field_in_index(qi, "Total Revenue")
-                    gp_field = self._find_field_in_index(qi, "Gross Profit")
-                    if rev_field and gp_field:
-                        for i in range(min(3, len(qi.columns))):
-                            revenue = qi.loc[rev_field].iloc[i]
-                            gross_profit = qi.loc[gp_field].iloc[i]
-                            if revenue != 0 and not pd.isna(revenue):
-                                col_name = f"Q {qi.columns[i].strftime('%m/%d/%Y')}"
-                                row_data[col_name] = f"{(gross_profit/revenue)*100:.1f}%"
-            # Annual
-            if "annual_income" in data and data["annual_income"] is not None:
-                ai = data["annual_income"]
-                if not ai.empty:
-                    rev_field = self._find_field_in_index(ai, "Total Revenue")
-                    gp_field = self._find_field_in_index(ai, "Gross Profit")
-                    if rev_field and gp_field:
-                        for i in range(min(3, len(ai.columns))):
-                            revenue = ai.loc[rev_field].iloc[i]
-                            gross_profit = ai.loc[gp_field].iloc[i]
-                            if revenue != 0 and not pd.isna(revenue):
-                                col_name = f"FY {ai.columns[i].year}"
-                                row_data[col_name] = f"{(gross_profit/revenue)*100:.1f}%"
-        except Exception as e:
-            st.warning(f"Could not calculate gross margin: {str(e)}")
-        return row_data
-
-    def _calculate_operating_margin(self, data: Dict, row_data: Dict) -> Dict:
-        """Calculate operating margin percentage"""
-        try:
-            # Quarterly
-            if "quarterly_income" in data and data["quarterly_income"] is not None:
-                qi = data["quarterly_income"]
-                if not qi.empty:
-                    rev_field = self._find_field_in_index(qi, "Total Revenue")
-                    oi_field = self._find_field_in_index(qi, "Operating Income")
-                    if rev_field and oi_field:
-                        for i in range(min(3, len(qi.columns))):
-                            revenue = qi.loc[rev_field].iloc[i]
-                            op_income = qi.loc[oi_field].iloc[i]
-                            if revenue != 0 and not pd.isna(revenue):
-                                col_name = f"Q {qi.columns[i].strftime('%m/%d/%Y')}"
-                                row_data[col_name] = f"{(op_income/revenue)*100:.1f}%"
-            # Annual
-            if "annual_income" in data and data["annual_income"] is not None:
-                ai = data["annual_income"]
-                if not ai.empty:
-                    rev_field = self._find_field_in_index(ai, "Total Revenue")
-                    oi_field = self._find_field_in_index(ai, "Operating Income")
-                    if rev_field and oi_field:
-                        for i in range(min(3, len(ai.columns))):
-                            revenue = ai.loc[rev_field].iloc[i]
-                            op_income = ai.loc[oi_field].iloc[i]
-                            if revenue != 0 and not pd.isna(revenue):
-                                col_name = f"FY {ai.columns[i].year}"
-                                row_data[col_name] = f"{(op_income/revenue)*100:.1f}%"
-        except Exception as e:
-            st.warning(f"Could not calculate operating margin: {str(e)}")
-        return row_data
+def get_session_fetcher(ticker: str) -> FinancialDataFetcher:
+    """
+    Get the fetcher of a ticker for this Streamlit session, creating it on first use.
 
-    def _calculate_net_margin(self, data: Dict, row_data: Dict) -> Dict:
-        """Calculate net margin percentage"""
-        try:
-            # Quarterly
-            if "quarterly_income" in data and data["quarterly_income"] is not None:
-                qi = data["quarterly_income"]
-                if not qi.empty:
-                    rev_field = self._find_field_in_index(qi, "Total Revenue")
-                    ni_field = self._find_field_in_index(qi, "Net Income")
-                    if rev_field and ni_field:
-                        for i in range(min(3, len(qi.columns))):
-                            revenue = qi.loc[rev_field].iloc[i]
-                            net_income = qi.loc[ni_field].iloc[i]
-                            if revenue != 0 and not pd.isna(revenue):
-                                col_name = f"Q {qi.columns[i].strftime('%m/%d/%Y')}"
-                                row_data[col_name] = f"{(net_income/revenue)*100:.1f}%"
-            # Annual
-            if "annual_income" in data and data["annual_income"] is not None:
-                ai = data["annual_income"]
-                if not ai.empty:
-                    rev_field = self._find_field_in_index(ai, "Total Revenue")
-                    ni_field = self._find_field_in_index(ai, "Net Income")
-                    if rev_field and ni_field:
-                        for i in range(min(3, len(ai.columns))):
-                            revenue = ai.loc[rev_field].iloc[i]
-                            net_income = ai.loc[ni_field].iloc[i]
-                            if revenue != 0 and not pd.isna(revenue):
-                                col_name = f"FY {ai.columns[i].year}"
-                                row_data[col_name] = f"{(net_income/revenue)*100:.1f}%"
-        except Exception as e:
-            st.warning(f"Could not calculate net margin: {str(e)}")
-        return row_data
+    The fetcher (and its yfinance Ticker and memoized tables) survives reruns
+    and tab switches, so they neither refetch nor reformat anything.
+    """
+    fetchers = st.session_state.setdefault(SESSION_FETCHERS_KEY, {})
+    ticker = ticker.upper()
+    if ticker not in fetchers:
+        fetchers[ticker] = FinancialDataFetcher(ticker)
+    return fetchers[ticker]
 
-    def _calculate_net_cash_flow(self, data: Dict, row_data: Dict) -> Dict:
-        """Calculate net cash flow"""
-        try:
-            # Quarterly
-            if "quarterly_cashflow" in data and data["quarterly_cashflow"] is not None:
-                qcf = data["quarterly_cashflow"]
-                if not qcf.empty:
-                    ocf_field = self._find_field_in_index(qcf, "Operating Cash Flow")
-                    icf_field = self._find_field_in_index(qcf, "Investing Cash Flow")
-                    fcf_field = self._find_field_in_index(qcf, "Financing Cash Flow")
-                    for i in range(min(3, len(qcf.columns))):
-                        ocf = qcf.loc[ocf_field].iloc[i] if ocf_field else 0
-                        icf = qcf.loc[icf_field].iloc[i] if icf_field else 0
-                        fcf = qcf.loc[fcf_field].iloc[i] if fcf_field else 0
-                        col_name = f"Q {qcf.columns[i].strftime('%m/%d/%Y')}"
-                        row_data[col_name] = self._format_value(ocf + icf + fcf)
-            # Annual
-            if "annual_cashflow" in data and data["annual_cashflow"] is not None:
-                acf = data["annual_cashflow"]
-                if not acf.empty:
-                    ocf_field = self._find_field_in_index(acf, "Operating Cash Flow")
-                    icf_field = self._find_field_in_index(acf, "Investing Cash Flow")
-                    fcf_field = self._find_field_in_index(acf, "Financing Cash Flow")
-                    for i in range(min(3, len(acf.columns))):
-                        ocf = acf.loc[ocf_field].iloc[i] if ocf_field else 0
-                        icf = acf.loc[icf_field].iloc[i] if icf_field else 0
-                        fcf = acf.loc[fcf_field].iloc[i] if fcf_field else 0
-                        col_name = f"FY {acf.columns[i].year}"
-                        row_data[col_name] = self._format_value(ocf + icf + fcf)
-        except Exception as e:
-            st.warning(f"Could not calculate net cash flow: {str(e)}")
-        return row_data
 
-def display_financial_statements(financial_data: Dict[str, pd.DataFrame], ticker: str):
+def display_financial_statements(financial_data: Dict[str, pd.DataFrame], ticker: str,
+                                 fetcher: Optional[FinancialDataFetcher] = None):
     """Display financial statements in tabular format"""
     st.header("📊 Financial Statements")
     st.caption("Data sourced from Yahoo Finance (yfinance)")
@@ -665,7 +302,7 @@ def display_financial_statements(financial_data: Dict[str, pd.DataFrame], ticker
         st.caption("All values in thousands (000s)")
 
         # Get formatted balance sheet
-        fetcher = FinancialDataFetcher(ticker)
+        fetcher = fetcher or get_session_fetcher(ticker)
         balance_sheet = fetcher.format_financial_table(financial_data).fillna("")
 
         if not balance_sheet.empty:
@@ -769,7 +406,7 @@ def display_cashflow_analysis(cashflow_data: str):
     </div>
     """, unsafe_allow_html=True)
 
-def display_AI_recommendation(file_path:str):
+def display_AI_recommendation(recommendation: str):
     """Display AI-Recommendation"""
     st.header("AI-Recommendation")
     st.caption("AI-generated analysis from 10-Q document")
@@ -777,7 +414,7 @@ def display_AI_recommendation(file_path:str):
     st.markdown(
         f"""
         <div class="ai-summary">
-            {Path(file_path).read_text(encoding="utf-8")}
+            {recommendation}
         </div>
         """, unsafe_allow_html=True)
 
@@ -0,0 +1,257 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+ANALYSIS_STORE_DIR = "analysis_store"
+CHECKPOINT_DIR = os.path.join("financial_analysis_output", "checkpoints")
+RESULT_CACHE_DIR = os.path.join("financial_analysis_output", "result_cache")
+RESULT_CACHE_MAX_ENTRIES = 256
+# Persisted results beyond this count are removed, least recently used first
+RESULT_CACHE_MAX_DISK_ENTRIES = 1024
+
+
+def _write_json(path: str, data) -> None:
+    """Atomically write JSON so concurrent readers never see a partial file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    """Read a JSON file, returning None if it is missing or unreadable."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Warning: Ignoring unreadable store file {path}: {e}")
+        return None
+
+
+class AnalysisStore:
+    """
+    Completed 10-Q analyses keyed by filing accession number.
+
+    A stored analysis is only served when it was produced by the same
+    prompt/model version, so changing a prompt invalidates old results.
+    """
+
+    def __init__(self, directory: str = ANALYSIS_STORE_DIR):
+        self.directory = directory
+
+    def _path(self, accession: str) -> str:
+        return os.path.join(self.directory, f"{accession.replace('-', '')}.json")
+
+    def load(self, accession: str, version: str) -> Optional[Dict]:
+        """
+        Get the stored analysis for a filing.
+
+        Args:
+            accession: Filing accession number
+            version: Prompt/model version the analysis must have been produced with
+
+        Returns:
+            Stored analysis sections, or None if absent or produced by another version
+        """
+        if not accession:
+            return None
+        record = _read_json(self._path(accession))
+        if not record or record.get("version") != version:
+            return None
+        return record.get("analysis")
+
+    def save(self, accession: str, version: str, analysis: Dict, ticker: str = "") -> None:
+        """
+        Store the analysis of a filing.
+
+        Args:
+            accession: Filing accession number
+            version: Prompt/model version the analysis was produced with
+            analysis: Analysis sections (tables, AI analyses, recommendation)
+            ticker: Ticker the filing was fetched for
+        """
+        if not accession:
+            return
+        record = {
+            "accession": accession,
+            "ticker": ticker,
+            "version": version,
+            "saved_at": datetime.now().isoformat(),
+            "analysis": analysis,
+        }
+        _write_json(self._path(accession), record)
+
+
+class StepCheckpointStore:
+    """
+    Per-step pipeline checkpoints keyed by filing and a hash of the step's inputs.
+
+    A checkpoint is only reused when the step is rerun with identical inputs, so
+    a changed upstream result or pipeline version recomputes the step.
+    """
+
+    def __init__(self, directory: str = CHECKPOINT_DIR):
+        self.directory = directory
+
+    @staticmethod
+    def input_hash(*inputs) -> str:
+        """Stable hash of a step's inputs."""
+        payload = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, filing_key: str, step: str, input_hash: str) -> str:
+        return os.path.join(self.directory, filing_key, f"{step}_{input_hash}.json")
+
+    def load(self, filing_key: str, step: str, input_hash: str):
+        """Return the checkpointed step result, or None if the step has not completed."""
+        record = _read_json(self._path(filing_key, step, input_hash))
+        if not record:
+            return None
+        return record.get("result")
+
+    def save(self, filing_key: str, step: str, input_hash: str, result) -> None:
+        """Checkpoint a completed step result."""
+        record = {
+            "step": step,
+            "saved_at": datetime.now().isoformat(),
+            "result": result,
+        }
+        _write_json(self._path(filing_key, step, input_hash), record)
+
+
+class ResultCache:
+    """
+    LRU cache of complete pipeline results keyed by filing and pipeline version.
+
+    At most max_entries results are held in memory. When a directory is given,
+    results are also persisted there and reloaded on a memory miss, so they
+    survive restarts; a result from another pipeline version is never served.
+    At most max_disk_entries results are kept on disk.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, directory: Optional[str] = RESULT_CACHE_DIR,
+                 max_disk_entries: int = RESULT_CACHE_MAX_DISK_ENTRIES):
+        """
+        Args:
+            max_entries: Maximum number of results held in memory
+            directory: Directory results are persisted to, or None for memory only
+            max_disk_entries: Maximum number of results kept in directory
+        """
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, filing_key: str) -> str:
+        return os.path.join(self.directory, f"{filing_key}.json")
+
+    def _remember(self, key: Tuple[str, str], results: Dict) -> None:
+        """Insert a result as most recently used, evicting the least recently used beyond the cap."""
+        self._entries[key] = results
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _prune_disk(self) -> None:
+        """Remove the least recently used persisted results beyond max_disk_entries."""
+        try:
+            paths = [entry.path for entry in os.scandir(self.directory)
+                     if entry.is_file() and entry.name.endswith(".json")]
+            if len(paths) <= self.max_disk_entries:
+                return
+            paths.sort(key=os.path.getmtime)
+            for path in paths[:len(paths) - self.max_disk_entries]:
+                os.remove(path)
+        except OSError as e:
+            print(f"Warning: Could not prune result cache {self.directory}: {e}")
+
+    def get(self, filing_key: str, version: str) -> Optional[Dict]:
+        """
+        Get the cached pipeline results of a filing.
+
+        Args:
+            filing_key: Filing accession number (or URL hash)
+            version: Pipeline version the results must have been produced with
+
+        Returns:
+            Cached results, or None on a miss
+        """
+        key = (filing_key, version)
+        with self._lock:
+            results = self._entries.get(key)
+            if results is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return results
+
+        record = _read_json(self._path(filing_key)) if self.directory else None
+        if not record or record.get("version") != version:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Mark the file as recently used so _prune_disk keeps it
+        try:
+            os.utime(self._path(filing_key))
+        except OSError:
+            pass
+        with self._lock:
+            self._remember(key, record["results"])
+            self.hits += 1
+        return record["results"]
+
+    def put(self, filing_key: str, version: str, results: Dict) -> None:
+        """
+        Cache the pipeline results of a filing.
+
+        Args:
+            filing_key: Filing accession number (or URL hash)
+            version: Pipeline version the results were produced with
+            results: Results from run_complete_pipeline
+        """
+        with self._lock:
+            self._remember((filing_key, version), results)
+        if self.directory:
+            record = {
+                "filing_key": filing_key,
+                "version": version,
+                "saved_at": datetime.now().isoformat(),
+                "results": results,
+            }
+            _write_json(self._path(filing_key), record)
+            self._prune_disk()
+
+    def results(self) -> List[Dict]:
+        """Results currently held in memory, least recently used first."""
+        with self._lock:
+            return list(self._entries.values())
+
+    def metrics(self) -> Dict:
+        """Hit/miss counts and current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable
+
+from numeric_parser import parse_money
+
+
+# Ranked metric -> (step-1 section, True if higher is better)
+RANKED_METRICS = {
+    "Current_Ratio": ("Liquidity", True),
+    "Debt_to_Equity": ("Leverage", False),
+    "Operating_Margin": ("Profitability", True),
+}
+
+# Companies listed per metric in the summary sent to the LLM
+SUMMARY_TOP_N = 5
+
+
+def comparison_frame(extractions: Iterable[Dict]) -> pd.DataFrame:
+    """
+    Build a numeric comparison table from step-1 extractions.
+
+    Args:
+        extractions: Step-1 JSON of each company
+
+    Returns:
+        DataFrame with Company, Report_Date and one numeric column per ranked metric
+        (Operating_Margin in percent)
+    """
+    rows = [
+        {
+            "Company": extraction.get("Company") or "Unknown",
+            "Report_Date": extraction.get("Report_Date", ""),
+            **{metric: extraction.get(section, {}).get(metric) for metric, (section, _) in RANKED_METRICS.items()},
+        }
+        for extraction in extractions
+    ]
+    frame = pd.DataFrame(rows, columns=["Company", "Report_Date", *RANKED_METRICS])
+    for metric in RANKED_METRICS:
+        frame[metric] = parse_money(frame[metric])
+    return frame
+
+
+def rank_companies(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rank companies on each metric and overall.
+
+    Debt-to-equity is ranked lowest first, except that a negative value
+    (negative equity) ranks last. Missing metrics rank last.
+
+    Args:
+        frame: Output of comparison_frame
+
+    Returns:
+        The frame with a <metric>_Rank column per metric and an Overall_Rank
+        (rank of the mean metric rank), sorted by Overall_Rank
+    """
+    ranked = frame.copy()
+    for metric, (_, higher_is_better) in RANKED_METRICS.items():
+        values = ranked[metric]
+        if metric == "Debt_to_Equity":
+            values = values.where(values >= 0, np.inf)
+        ranked[f"{metric}_Rank"] = values.rank(ascending=not higher_is_better, method="min", na_option="bottom")
+
+    rank_columns = [f"{metric}_Rank" for metric in RANKED_METRICS]
+    ranked["Overall_Rank"] = ranked[rank_columns].mean(axis=1).rank(method="min")
+    return ranked.sort_values(["Overall_Rank", "Company"]).reset_index(drop=True)
+
+
+def _markdown_table(frame: pd.DataFrame) -> str:
+    """Render a frame as a markdown table."""
+    header = "| " + " | ".join(frame.columns) + " |"
+    divider = "|" + "---|" * len(frame.columns)
+    body = ["| " + " | ".join(row) + " |" for row in frame.astype(str).itertuples(index=False, name=None)]
+    return "\n".join([header, divider, *body])
+
+
+def rankings_markdown(ranked: pd.DataFrame) -> str:
+    """Full ranking table of every company, in markdown."""
+    display = ranked[["Overall_Rank", "Company", "Report_Date", *RANKED_METRICS]].copy()
+    display["Overall_Rank"] = display["Overall_Rank"].astype(int)
+    display["Current_Ratio"] = display["Current_Ratio"].map(lambda v: f"{v:.2f}" if pd.notna(v) else "N/A")
+    display["Debt_to_Equity"] = display["Debt_to_Equity"].map(lambda v: f"{v:.2f}" if pd.notna(v) else "N/A")
+    display["Operating_Margin"] = display["Operating_Margin"].map(lambda v: f"{v:.2f}%" if pd.notna(v) else "N/A")
+    return _markdown_table(display)
+
+
+def summary_table(ranked: pd.DataFrame, top_n: int = SUMMARY_TOP_N) -> str:
+    """
+    Compact, fixed-size portfolio summary for the LLM narrative.
+
+    Contains the distribution of each metric and the best and worst top_n
+    companies per metric, so its size does not grow with the portfolio.
+
+    Args:
+        ranked: Output of rank_companies
+        top_n: Companies listed at each end of every metric
+
+    Returns:
+        Markdown summary
+    """
+    stats = ranked[list(RANKED_METRICS)].describe(percentiles=[0.25, 0.5, 0.75]).T
+    stats = stats[["count", "mean", "25%", "50%", "75%", "min", "max"]].round(2).reset_index()
+    stats = stats.rename(columns={"index": "Metric"})
+
+    sections = [f"Companies compared: {len(ranked)}", "", "Metric distribution:", _markdown_table(stats)]
+
+    for metric in RANKED_METRICS:
+        by_rank = ranked.dropna(subset=[metric]).sort_values(f"{metric}_Rank")
+        best = ", ".join(f"{row.Company} ({getattr(row, metric):.2f})" for row in by_rank.head(top_n).itertuples())
+        worst = ", ".join(f"{row.Company} ({getattr(row, metric):.2f})"
+                          for row in by_rank.tail(top_n).iloc[::-1].itertuples())
+        sections += ["", f"{metric} best: {best or 'N/A'}", f"{metric} worst: {worst or 'N/A'}"]
+
+    overall = ranked.head(top_n)["Company"].tolist()
+    laggards = ranked.tail(top_n)["Company"].tolist()[::-1]
+    sections += ["", f"Overall leaders: {', '.join(overall)}", f"Overall laggards: {', '.join(laggards)}"]
+    return "\n".join(sections)
@@ -0,0 +1,238 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+# Scale phrases found in statement headings, e.g. "(In millions, except per-share amounts)"
+SCALE_PATTERNS = [
+    (re.compile(r'in\s+billions', re.IGNORECASE), 1_000_000_000),
+    (re.compile(r'in\s+millions', re.IGNORECASE), 1_000_000),
+    (re.compile(r'in\s+thousands', re.IGNORECASE), 1_000),
+]
+
+# Row labels that identify each condensed statement. Every pattern must match
+# at least one row label for a table to be classified as that statement.
+STATEMENT_SIGNATURES = {
+    "cash_flow": [
+        r'operating activities',
+        r'investing activities',
+    ],
+    "balance_sheet": [
+        r'^total current assets',
+        r'^total current liabilities',
+    ],
+    "income_statement": [
+        r'^(total )?(net )?(revenues?|sales)\b',
+        r'^net (income|earnings|loss)',
+    ],
+}
+
+# (statement, step-1 section, step-1 field, row label pattern)
+FIELD_RULES = [
+    ("balance_sheet", "Liquidity", "Cash_and_Equivalents", r'^cash and cash equivalents'),
+    ("balance_sheet", "Liquidity", "Total_Current_Assets", r'^total current assets'),
+    ("balance_sheet", "Liquidity", "Total_Current_Liabilities", r'^total current liabilities'),
+    ("balance_sheet", "Leverage", "Shareholders_Equity",
+     r"^total (stockholders|shareholders)['’]?s?['’]? (equity|deficit)"),
+    ("income_statement", "Profitability", "Revenue", r'^(total )?(net )?(revenues?|sales)\b'),
+    ("income_statement", "Profitability", "Operating_Income",
+     r'^(total )?(operating (income|loss|\(loss\))|(income|loss|\(loss\)|income \(loss\)) from operations)'),
+    ("income_statement", "Profitability", "Net_Income", r'^net \(?(income|earnings|loss)\)?'),
+    ("cash_flow", "Cash_Flow", "Operating_Cash_Flow", r'^(net )?cash\b.*\boperating activities'),
+    ("cash_flow", "Cash_Flow", "Capex",
+     r'^capital expenditures|^(purchases? of|payments for( the)?( acquisitions? of)?|additions to|expenditures for) (property|premises)'),
+]
+
+# Balance sheet rows that are summed into Total_Debt when no "Total debt" row exists
+DEBT_ROW_PATTERN = re.compile(
+    r'(long-term debt|term debt|commercial paper|short-term borrowings|notes payable|'
+    r'senior notes|convertible notes|revolving credit|credit facility)'
+)
+DEBT_ROW_EXCLUDE = re.compile(r'(lease|interest|issuance costs)')
+TOTAL_DEBT_PATTERN = re.compile(r'^total (debt|borrowings)')
+
+# Fields that must be parsed from the tables before the LLM is limited to narrative fields
+CORE_FIELDS = [
+    ("Liquidity", "Total_Current_Assets"),
+    ("Liquidity", "Total_Current_Liabilities"),
+    ("Leverage", "Shareholders_Equity"),
+    ("Cash_Flow", "Operating_Cash_Flow"),
+]
+
+DATE_PATTERN = re.compile(
+    r'(January|February|March|April|May|June|July|August|September|October|November|December)'
+    r'\s+\d{1,2},\s+\d{4}'
+)
+NUMBER_PATTERN = re.compile(r'\d[\d,]*(\.\d+)?')
+
+
+def format_amount(value: float) -> str:
+    """Format a whole-dollar amount, with parentheses for negatives."""
+    if value < 0:
+        return f'$({abs(value):,.0f})'
+    return f'${value:,.0f}'
+
+
+class FinancialTableExtractor:
+    """
+    Rule-based parser that fills the step-1 statement fields directly from the
+    condensed balance sheet, income statement and cash-flow tables of a 10-Q.
+
+    Values are read from the first (most recent) period column and normalized to
+    whole dollars using the statement's "in millions"/"in thousands" heading.
+    """
+
+    def __init__(self, tables: List[Dict]):
+        """
+        Args:
+            tables: Parsed HTML tables, each a dict with "rows" (list of cell-text lists)
+                    and "context" (text preceding the table, used for scale detection)
+        """
+        self.tables = tables or []
+
+    def find_statements(self) -> Dict[str, Dict]:
+        """Return the first table recognized as each statement type."""
+        statements = {}
+        for table in self.tables:
+            labels = [self._row_label(row) for row in table.get("rows", [])]
+            labels = [label for label in labels if label]
+            statement_type = self._classify(labels)
+            if statement_type and statement_type not in statements:
+                statements[statement_type] = table
+            if len(statements) == len(STATEMENT_SIGNATURES):
+                break
+        return statements
+
+    def extract(self) -> Dict:
+        """
+        Extract the step-1 statement fields from the recognized tables.
+
+        Returns:
+            Partial step-1 JSON containing only the fields that were found
+        """
+        data: Dict = {}
+        statements = self.find_statements()
+
+        for statement_type, table in statements.items():
+            scale = self._detect_scale(table)
+            rows = self._labelled_values(table)
+
+            for rule_statement, section, field, pattern in FIELD_RULES:
+                if rule_statement != statement_type:
+                    continue
+                value = self._first_match(rows, re.compile(pattern))
+                if value is not None:
+                    data.setdefault(section, {})[field] = format_amount(value * scale)
+
+            if statement_type == "balance_sheet":
+                total_debt = self._total_debt(rows)
+                if total_debt is not None:
+                    data.setdefault("Leverage", {})["Total_Debt"] = format_amount(total_debt * scale)
+
+                report_date = self._report_date(table)
+                if report_date:
+                    data["Report_Date"] = report_date
+
+        # The step-1 schema repeats operating cash flow under Liquidity
+        ocf = data.get("Cash_Flow", {}).get("Operating_Cash_Flow")
+        if ocf:
+            data.setdefault("Liquidity", {})["Operating_Cash_Flow"] = ocf
+
+        return data
+
+    @staticmethod
+    def covers_core_fields(data: Dict) -> bool:
+        """Check whether the structured extraction found every core statement field."""
+        return all(data.get(section, {}).get(field) for section, field in CORE_FIELDS)
+
+    # =================== HELPER METHODS ===================
+
+    def _classify(self, labels: List[str]) -> Optional[str]:
+        """Classify a table by the row labels it contains."""
+        for statement_type, patterns in STATEMENT_SIGNATURES.items():
+            if all(any(re.search(pattern, label) for label in labels) for pattern in patterns):
+                return statement_type
+        return None
+
+    def _row_label(self, row: List[str]) -> str:
+        """Normalized label of a row: its first cell containing letters."""
+        for cell in row:
+            text = cell.replace('\xa0', ' ').strip()
+            if re.search(r'[A-Za-z]', text):
+                text = re.sub(r'\s+', ' ', text.lower())
+                return text.rstrip(':').strip()
+        return ""
+
+    def _row_values(self, row: List[str]) -> List[float]:
+        """Numeric cells of a row in column order, with parentheses as negatives and dashes as zero."""
+        values = []
+        negative = False
+        label_seen = False
+        for cell in row:
+            text = cell.replace('\xa0', ' ').strip()
+            if not label_seen:
+                if re.search(r'[A-Za-z]', text):
+                    label_seen = True
+                continue
+            text = text.replace('$', '').replace(' ', '')
+            if not text or text in (')', ')%'):
+                continue
+            if text == '(':
+                negative = True
+                continue
+            if text in ('—', '–', '-', '—%'):
+                values.append(0.0)
+                negative = False
+                continue
+            is_negative = negative or text.startswith('(')
+            text = text.strip('()%')
+            if not NUMBER_PATTERN.fullmatch(text):
+                continue
+            number = float(text.replace(',', ''))
+            values.append(-number if is_negative else number)
+            negative = False
+        return values
+
+    def _labelled_values(self, table: Dict) -> List[Tuple[str, List[float]]]:
+        """Pair each labelled row with its numeric values."""
+        rows = []
+        for row in table.get("rows", []):
+            label = self._row_label(row)
+            if label:
+                rows.append((label, self._row_values(row)))
+        return rows
+
+    def _first_match(self, rows: List[Tuple[str, List[float]]], pattern) -> Optional[float]:
+        """Most recent period value of the first row whose label matches and has values."""
+        for label, values in rows:
+            if values and pattern.search(label):
+                return values[0]
+        return None
+
+    def _total_debt(self, rows: List[Tuple[str, List[float]]]) -> Optional[float]:
+        """Total debt from a "Total debt" row, or the sum of the individual debt rows."""
+        total = self._first_match(rows, TOTAL_DEBT_PATTERN)
+        if total is not None:
+            return total
+
+        debt_values = [
+            values[0] for label, values in rows
+            if values and DEBT_ROW_PATTERN.search(label) and not DEBT_ROW_EXCLUDE.search(label)
+        ]
+        return sum(debt_values) if debt_values else None
+
+    def _detect_scale(self, table: Dict) -> int:
+        """Scale multiplier from the table heading, falling back to the preceding text."""
+        table_text = " ".join(" ".join(row) for row in table.get("rows", []))
+        for text in (table_text, table.get("context", "")):
+            for pattern, multiplier in SCALE_PATTERNS:
+                if pattern.search(text):
+                    return multiplier
+        return 1
+
+    def _report_date(self, table: Dict) -> str:
+        """First period-end date found in the balance sheet header rows."""
+        for row in table.get("rows", [])[:6]:
+            match = DATE_PATTERN.search(" ".join(row))
+            if match:
+                return match.group()
+        return ""
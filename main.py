@@ -7,13 +7,14 @@ import re
 import requests
 import os
 import Account_Overview
-from pathlib import Path
 from html_account_oveview import account_overview_to_html
+from upload_ingest import ingest_account_overview, upload_hash
 
-from Config_file import logger
-from Azure_OpenAI_Analyzer import AzureOpenAIAnalyzer
+from Config_file import logger, AZURE_OPENAI_DEPLOYMENT
+from Azure_OpenAI_Analyzer import AzureOpenAIAnalyzer, PROMPT_VERSION, is_fallback_analysis
+from analysis_store import AnalysisStore
 from Financial_Data_Fetcher import ( 
-    FinancialDataFetcher, 
+    get_session_fetcher, 
     display_financial_statements, 
     display_risk_analysis, 
     display_liquidity_analysis, 
@@ -29,7 +30,14 @@ from FinancialStatement_API import (
     
 
 )
-from query_engine import AI_rec_main
+from query_engine import AI_rec_main, FinancialRAGPipeline, PIPELINE_VERSION
+
+# Stored analyses are only reused when produced by the same prompts and model
+ANALYSIS_VERSION = f"{PROMPT_VERSION}:{PIPELINE_VERSION}:{AZURE_OPENAI_DEPLOYMENT}"
+# st.session_state key of the (upload hash, AccountOverview) of the last uploads
+ACCOUNT_OVERVIEW_KEY = "account_overview"
+
+
 def main():
     """Main Streamlit app"""
     st.title("CreditIQ - Credit Compliance report with AI")
@@ -38,6 +46,10 @@ def main():
 
     with col1:
         ticker = st.text_input("Enter Stock Ticker Symbol").upper()
+        reanalyze = st.checkbox(
+            "Re-analyze filing",
+            help="Ignore the stored analysis of this filing and run the AI analysis again"
+        )
 
     with col2:
         filing_source = st.radio(
@@ -70,6 +82,9 @@ def main():
 
         pdf_file = None
         raw_text = ""
+        acc_num = None
+        stored_analysis = None
+        analysis_store = AnalysisStore()
 
         # Handle filing source
         analyzer = AzureOpenAIAnalyzer()  # construct once
@@ -112,91 +127,106 @@ def main():
                         html_url = f"https://www.sec.gov/Archives/edgar/data/{CIK}/{acc_num}/{doc_name}"
                         pdf_url = f"https://www.sec.gov/Archives/edgar/data/{CIK}/{acc_num}/{doc_name.replace('.htm', '.pdf')}"
 
-                        pdf_response = requests.get(pdf_url, headers=headers)
-                        # AI_rec_main(html_url)
+                        # Skip the whole pipeline if this filing was already analyzed
+                        stored_analysis = None if reanalyze else analysis_store.load(acc_num, ANALYSIS_VERSION)
 
-                        if pdf_response.status_code == 200:
-                            pdf_file = io.BytesIO(pdf_response.content)
+                        if stored_analysis:
+                            st.success(f"Latest 10-Q filing for {ticker} already analyzed; showing stored results")
                         else:
-                            # Fallback to HTML -> PDF conversion (best-effort)
-                            html_content = requests.get(html_url, headers=headers).content.decode("utf-8", errors="ignore")
-                            html_content = re.sub(r'<img[^>]*>', '', html_content)
-                            # html_content = re.sub(r'<table[^>]*>.*?</table>', '', html_content, flags=re.DOTALL)
-                            try:
-                                from xhtml2pdf import pisa
-                                pdf_buffer = io.BytesIO()
-                                pisa.CreatePDF(io.StringIO(html_content), dest=pdf_buffer)
-                                pdf_buffer.seek(0)
-                                pdf_file = pdf_buffer
-                            except Exception:
-                                # If conversion not available, keep raw HTML text
-                                raw_text = re.sub("<[^<]+?>", " ", html_content)
-
-                        if pdf_file and not raw_text:
-                            st.success(f"Latest 10-Q filing fetched for {ticker}")
+                            pdf_response = requests.get(pdf_url, headers=headers)
+                            # AI_rec_main(html_url)
+
+                            if pdf_response.status_code == 200:
+                                pdf_file = io.BytesIO(pdf_response.content)
+                            else:
+                                # Fallback to HTML -> PDF conversion (best-effort)
+                                html_content = requests.get(html_url, headers=headers).content.decode("utf-8", errors="ignore")
+                                html_content = re.sub(r'<img[^>]*>', '', html_content)
+                                # html_content = re.sub(r'<table[^>]*>.*?</table>', '', html_content, flags=re.DOTALL)
+                                try:
+                                    from xhtml2pdf import pisa
+                                    pdf_buffer = io.BytesIO()
+                                    pisa.CreatePDF(io.StringIO(html_content), dest=pdf_buffer)
+                                    pdf_buffer.seek(0)
+                                    pdf_file = pdf_buffer
+                                except Exception:
+                                    # If conversion not available, keep raw HTML text
+                                    raw_text = re.sub("<[^<]+?>", " ", html_content)
+
+                            if pdf_file and not raw_text:
+                                st.success(f"Latest 10-Q filing fetched for {ticker}")
                 except Exception as e:
                     st.error(f"Failed to fetch 10-Q from SEC: {e}")
         #Converting Item List and Payment History to DataFrame
 
         
         
+        # The account overview is computed once per upload and shared by the tab and the report
+        account_overview = None
         if Item_List_Source and Payment_History_source:
-            try:
-                if Item_List_Source:
-                    if Item_List_Source.name.endswith('.csv'):
-                        item_list_df = pd.read_csv(Item_List_Source)
-                    else:
-                        item_list_df = pd.read_excel(Item_List_Source)
+            upload_hashes = (upload_hash(Item_List_Source), upload_hash(Payment_History_source))
+            upload_key = "|".join(upload_hashes)
+            cached_overview = st.session_state.get(ACCOUNT_OVERVIEW_KEY)
+            if cached_overview and cached_overview[0] == upload_key:
+                account_overview = cached_overview[1]
+            else:
+                try:
+                    # Read in chunks of the needed columns only, so large uploads are never loaded whole
+                    with st.spinner("Processing Item List and Payment History..."):
+                        account_overview = ingest_account_overview(Item_List_Source, Payment_History_source,
+                                                                   upload_hashes=upload_hashes)
+                    st.session_state[ACCOUNT_OVERVIEW_KEY] = (upload_key, account_overview)
 
-                if Payment_History_source:
-                    if Payment_History_source.name.endswith('.csv'):
-                        payment_history_df = pd.read_csv(Payment_History_source)
-                    else:
-                        payment_history_df = pd.read_excel(Payment_History_source)
-        
-            except Exception as e:
-                st.error(f"Failed to process uploaded files: {e}")
+                except Exception as e:
+                    st.error(f"Failed to process uploaded files: {e}")
         # Process if we have either uploaded text or fetched PDF
-        if ticker and (raw_text or pdf_file):
+        if ticker and (stored_analysis or raw_text or pdf_file):
             try:
-                fetcher = FinancialDataFetcher(ticker)
+                fetcher = get_session_fetcher(ticker)
                 fetcher_api = Financial_api(ticker)
-                finincial_statements_dataframe = fetcher.get_financial_statements()
-
-                # Extract text from PDF if needed (pass explicit file_type to avoid .type error)
-                if not raw_text and pdf_file:
-                    with st.spinner("Extracting text from 10-Q document..."):
-                        raw_text = analyzer.extract_text_from_file(pdf_file, filename=f"{ticker}_10q.pdf", file_type="application/pdf")
-
-                # If we still don't have text, stop early
-                if not raw_text:
-                    st.error("Could not extract text from the 10-Q document.")
-                    return
-
-                # Build vector index ONCE here so downstream analyses are not empty
-                analyzer.vector_index = analyzer.create_vector_index(raw_text)
 
                 # Fetch financial statements
                 financial_data = fetcher.get_financial_statements()
 
-                # Perform AI-driven analyses using vector embeddings
-                with st.spinner("Analyzing risks using AI"):
-                    risk_analysis = analyzer.analyze_risks(raw_text)
-
-                with st.spinner("Analyzing liquidity using AI"):
-                    liquidity_analysis = analyzer.analyze_liquidity(raw_text)
-
-                with st.spinner("Analyzing profitability using AI"):
-                    profitability_analysis = analyzer.analyze_profitability(raw_text)
-
-                with st.spinner("Analyzing cash flow using AI"):
-                    cashflow_analysis = analyzer.analyze_cashflow(raw_text)
-
-                with st.spinner("Analysing AI Recommendation form 10q"):
-                     AI_rec_main(html_url)
-                
-                AI_Recommendation = Path("financial_analysis_output\step4_extractred_summary.txt").read_text(encoding="utf-8")
-                
+                if stored_analysis:
+                    tables_html = stored_analysis['tables']
+                    risk_analysis = stored_analysis['risk_analysis']
+                    liquidity_analysis = stored_analysis['liquidity_analysis']
+                    profitability_analysis = stored_analysis['profitability_analysis']
+                    cashflow_analysis = stored_analysis['cashflow_analysis']
+                    AI_Recommendation = stored_analysis['AI_Recommendation']
+                else:
+                    # Extract text from PDF if needed (pass explicit file_type to avoid .type error)
+                    if not raw_text and pdf_file:
+                        with st.spinner("Extracting text from 10-Q document..."):
+                            raw_text = analyzer.extract_text_from_file(pdf_file, filename=f"{ticker}_10q.pdf", file_type="application/pdf")
+
+                    # If we still don't have text, stop early
+                    if not raw_text:
+                        st.error("Could not extract text from the 10-Q document.")
+                        return
+
+                    # Build vector index ONCE here so downstream analyses are not empty
+                    analyzer.vector_index = analyzer.create_vector_index(raw_text)
+
+                    # Perform AI-driven analyses using vector embeddings
+                    with st.spinner("Analyzing risks using AI"):
+                        risk_analysis = analyzer.analyze_risks(raw_text)
+
+                    with st.spinner("Analyzing liquidity using AI"):
+                        liquidity_analysis = analyzer.analyze_liquidity(raw_text)
+
+                    with st.spinner("Analyzing profitability using AI"):
+                        profitability_analysis = analyzer.analyze_profitability(raw_text)
+
+                    with st.spinner("Analyzing cash flow using AI"):
+                        cashflow_analysis = analyzer.analyze_cashflow(raw_text)
+
+                    with st.spinner("Analysing AI Recommendation form 10q"):
+                         AI_rec_results = AI_rec_main(html_url)
+                    
+                    AI_Recommendation = AI_rec_results["step4_extract_summary"] or "AI recommendation unavailable for this filing"
+                    
 
                 # account_overview_html = ""
                 # if 'item_list_df' in locals() and 'payment_history_df' in locals():
@@ -214,25 +244,43 @@ def main():
                 #         logger.warning(f"Could not generate Account Overview for report: {e}")
                 #         account_overview_html = "<h3>Account Overview</h3><p>Account Overview data not available</p>"
 
-                # Prepare HTML snippets for print
-                # Financial tables
-                # bal_html = fetcher.format_financial_table(financial_data).to_html(index=False, escape=False, na_rep="")
-                bal_html = fetcher_api.get_balance_sheet().to_html(index=True, escape=False, na_rep="")
-                # inc_html = fetcher.format_income_statement(financial_data).to_html(index=False, escape=False, na_rep="")
-                inc_html = fetcher_api.get_income_statement().to_html(index=True, escape=False, na_rep="")
-                # cf_html = fetcher.format_cash_flow(financial_data).to_html(index=False, escape=False, na_rep="")
-                cf_html = fetcher_api.get_cash_flow().to_html(index=True, escape=False, na_rep="")
-                # ratios_html = fetcher.format_financial_ratios(financial_data).to_html(index=False, escape=False, na_rep="")
-                ratios_html = fetcher_api.get_financial_ratios().to_html(index=True, escape=False, na_rep="")
-                tables_html = f"<h3>Balance Sheet</h3>{bal_html}<h3>Ratios</h3>{ratios_html}<h3>Income Statement</h3>{inc_html}<h3>Cash Flow</h3>{cf_html}"
-                # Acc_Over_html = Account_Overview.main(item_list_df,payment_history_df).to_html(index=False, escape=False, na_rep="")
+                    # Prepare HTML snippets for print
+                    # Financial tables
+                    # bal_html = fetcher.format_financial_table(financial_data).to_html(index=False, escape=False, na_rep="")
+                    bal_html = fetcher_api.get_balance_sheet().to_html(index=True, escape=False, na_rep="")
+                    # inc_html = fetcher.format_income_statement(financial_data).to_html(index=False, escape=False, na_rep="")
+                    inc_html = fetcher_api.get_income_statement().to_html(index=True, escape=False, na_rep="")
+                    # cf_html = fetcher.format_cash_flow(financial_data).to_html(index=False, escape=False, na_rep="")
+                    cf_html = fetcher_api.get_cash_flow().to_html(index=True, escape=False, na_rep="")
+                    # ratios_html = fetcher.format_financial_ratios(financial_data).to_html(index=False, escape=False, na_rep="")
+                    ratios_html = fetcher_api.get_financial_ratios().to_html(index=True, escape=False, na_rep="")
+                    tables_html = f"<h3>Balance Sheet</h3>{bal_html}<h3>Ratios</h3>{ratios_html}<h3>Income Statement</h3>{inc_html}<h3>Cash Flow</h3>{cf_html}"
+                    # Acc_Over_html = Account_Overview.main(item_list_df,payment_history_df).to_html(index=False, escape=False, na_rep="")
+
+                    # Store the analysis so later runs on the same filing are served instantly;
+                    # failed or fallback results are not stored, so the next run retries them
+                    analysis_complete = (
+                        not FinancialRAGPipeline._step_failed(AI_rec_results["step1_extraction"])
+                        and not FinancialRAGPipeline._step_failed(AI_rec_results["step4_extract_summary"])
+                        and not any(is_fallback_analysis(analysis) for analysis in (
+                            risk_analysis, liquidity_analysis, profitability_analysis, cashflow_analysis))
+                    )
+                    if acc_num and analysis_complete:
+                        analysis_store.save(acc_num, ANALYSIS_VERSION, {
+                            'tables': tables_html,
+                            'risk_analysis': risk_analysis,
+                            'liquidity_analysis': liquidity_analysis,
+                            'profitability_analysis': profitability_analysis,
+                            'cashflow_analysis': cashflow_analysis,
+                            'AI_Recommendation': AI_Recommendation
+                        }, ticker=ticker)
                 
 
                 # Main tabs for interactive display - Added Cash Flow tab
                 tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["Financial Statements", "Risk Analysis", "Liquidity", "Profitability", "Cash Flow", "Account Overview", "AI Recommendation"])
 
                 with tab1:
-                    display_financial_statements(financial_data, ticker)
+                    display_financial_statements(financial_data, ticker, fetcher)
 
                 with tab2:
                     display_risk_analysis(risk_analysis)
@@ -246,9 +294,12 @@ def main():
                 with tab5:
                     display_cashflow_analysis(cashflow_analysis)
                 with tab6:
-                    Account_Overview.main(item_list_df,payment_history_df)
+                    if account_overview is not None:
+                        Account_Overview.render_account_overview(account_overview)
+                    else:
+                        st.info("Upload the Item List and Payment History to see the account overview")
                 with tab7:
-                    display_AI_recommendation("financial_analysis_output\step4_extractred_summary.txt")
+                    display_AI_recommendation(AI_Recommendation)
 
                 # Generate full report for download
                 st.markdown("---")
@@ -261,7 +312,7 @@ def main():
                     'liquidity_analysis': liquidity_analysis.replace('\n', '<br>'),
                     'profitability_analysis': profitability_analysis.replace('\n', '<br>'),
                     'cashflow_analysis': cashflow_analysis.replace('\n', '<br>'),
-                    'account_overview': account_overview_to_html(item_list_df, payment_history_df),
+                    'account_overview': account_overview_to_html(account_overview),
                     'AI_Recommendation': AI_Recommendation.replace('\n', '<br>')
                     # 'Account_Overview': Acc_Over_html
                 }
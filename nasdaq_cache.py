@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+
+NASDAQ_CACHE_PATH = os.path.join("nasdaq_cache", "financials.sqlite3")
+# Payloads younger than this are served without contacting NASDAQ
+NASDAQ_CACHE_TTL_HOURS = 24
+# Older payloads up to this age are served immediately while being refreshed in the background
+NASDAQ_CACHE_MAX_STALE_HOURS = 24 * 7
+FREQUENCIES = (1, 2)  # 1 = annual, 2 = quarterly
+
+
+def is_financials_payload(payload) -> bool:
+    """
+    True if a NASDAQ response holds financials.
+
+    NASDAQ answers unknown tickers and throttled requests with HTTP 200 and
+    {"data": null, "status": {"rCode": 400, ...}}; such payloads are failures.
+    """
+    return isinstance(payload, dict) and isinstance(payload.get("data"), dict) and bool(payload["data"])
+
+
+class NasdaqCache:
+    """
+    SQLite cache of NASDAQ financials payloads keyed by ticker and frequency.
+
+    Shared by every session and kept across restarts. Payloads are stored as
+    zlib-compressed JSON. Fresh payloads are served directly; stale ones are
+    served immediately and revalidated in the background
+    (stale-while-revalidate).
+    """
+
+    def __init__(self, path: str = NASDAQ_CACHE_PATH, ttl_hours: float = NASDAQ_CACHE_TTL_HOURS,
+                 max_stale_hours: float = NASDAQ_CACHE_MAX_STALE_HOURS):
+        """
+        Args:
+            path: SQLite database file
+            ttl_hours: Age after which a payload is refreshed
+            max_stale_hours: Age up to which a stale payload is still served while refreshing
+        """
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_stale_seconds = max_stale_hours * 3600
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection, creating the database on first use."""
+        with self._init_lock:
+            if not self._initialized:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                connection = sqlite3.connect(self.path, timeout=30)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS payloads ("
+                    "ticker TEXT NOT NULL, frequency INTEGER NOT NULL, "
+                    "fetched_at REAL NOT NULL, payload BLOB NOT NULL, "
+                    "PRIMARY KEY (ticker, frequency))"
+                )
+                connection.commit()
+                connection.close()
+                self._initialized = True
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, ticker: str, frequency: int) -> Tuple[Optional[Dict], Optional[float]]:
+        """
+        Get a cached payload.
+
+        Returns:
+            (payload, age in seconds), or (None, None) if not cached
+        """
+        try:
+            connection = self._connect()
+            try:
+                row = connection.execute(
+                    "SELECT fetched_at, payload FROM payloads WHERE ticker = ? AND frequency = ?",
+                    (ticker.upper(), frequency),
+                ).fetchone()
+            finally:
+                connection.close()
+            if row is None:
+                return None, None
+            return json.loads(zlib.decompress(row[1])), time.time() - row[0]
+        except Exception as e:
+            print(f"Warning: Could not read NASDAQ cache for {ticker}: {e}")
+            return None, None
+
+    def put(self, ticker: str, frequency: int, payload: Dict) -> None:
+        """Store a payload fetched now."""
+        try:
+            connection = self._connect()
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO payloads (ticker, frequency, fetched_at, payload) VALUES (?, ?, ?, ?)",
+                    (ticker.upper(), frequency, time.time(), zlib.compress(json.dumps(payload).encode("utf-8"))),
+                )
+                connection.commit()
+            finally:
+                connection.close()
+        except Exception as e:
+            print(f"Warning: Could not write NASDAQ cache for {ticker}: {e}")
+
+    def _refresh(self, ticker: str, frequency: int, fetch: Callable[[int], Optional[Dict]]) -> Optional[Dict]:
+        """Fetch a payload from NASDAQ and cache it if the fetch returned financials."""
+        data = fetch(frequency)
+        if not is_financials_payload(data):
+            return None
+        self.put(ticker, frequency, data)
+        return data
+
+    def _refresh_in_background(self, ticker: str, frequency: int, fetch: Callable[[int], Optional[Dict]]) -> None:
+        """Refresh a stale payload on a background thread, at most once at a time per key."""
+        key = (ticker.upper(), frequency)
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._refresh(ticker, frequency, fetch)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"nasdaq-refresh-{ticker}-{frequency}", daemon=True).start()
+
+    def fetch(self, ticker: str, frequency: int, fetch: Callable[[int], Optional[Dict]]) -> Optional[Dict]:
+        """
+        Get a payload through the cache.
+
+        Args:
+            ticker: Company ticker
+            frequency: 1 for annual, 2 for quarterly
+            fetch: Downloads the payload for a frequency (returns None on failure)
+
+        Returns:
+            The payload, or None if it is neither cached nor downloadable
+        """
+        payload, age = self.get(ticker, frequency)
+        if not is_financials_payload(payload):
+            payload = None
+        if payload is not None and age < self.ttl_seconds:
+            return payload
+        if payload is not None and age < self.max_stale_seconds:
+            self._refresh_in_background(ticker, frequency, fetch)
+            return payload
+
+        data = self._refresh(ticker, frequency, fetch)
+        # Serve an expired payload rather than nothing when NASDAQ is unavailable
+        return data if data is not None else payload
+
+    def warm(self, tickers: Iterable[str], force: bool = False, max_workers: int = 4) -> Dict[str, bool]:
+        """
+        Download the payloads of a watchlist into the cache.
+
+        Args:
+            tickers: Tickers to cache
+            force: Refresh payloads that are still fresh
+            max_workers: Tickers fetched at once
+
+        Returns:
+            dict: ticker -> True if both frequencies are cached
+        """
+        from FinancialStatement_API import Financial_api
+
+        def warm_ticker(ticker):
+            api = Financial_api(ticker, cache_ttl=0, disk_cache=None)
+            cached = True
+            for frequency in FREQUENCIES:
+                payload, age = self.get(ticker, frequency)
+                if force or payload is None or age >= self.ttl_seconds:
+                    cached = self._refresh(ticker, frequency, api.fetch_financial_data) is not None and cached
+            return cached
+
+        tickers = [ticker.strip().upper() for ticker in tickers if ticker.strip()]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(tickers, executor.map(warm_ticker, tickers)))
+
+
+shared_cache = NasdaqCache()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NASDAQ financials cache")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    warm_parser = subparsers.add_parser("warm", help="Download a watchlist into the cache")
+    warm_parser.add_argument("tickers", nargs="*", help="Tickers to cache")
+    warm_parser.add_argument("--watchlist", help="File with one ticker per line")
+    warm_parser.add_argument("--force", action="store_true", help="Refresh payloads that are still fresh")
+    warm_parser.add_argument("--workers", type=int, default=4, help="Tickers fetched at once")
+    args = parser.parse_args()
+
+    tickers = list(args.tickers)
+    if args.watchlist:
+        with open(args.watchlist, "r", encoding="utf-8") as f:
+            tickers += [line.split("#")[0] for line in f]
+
+    results = shared_cache.warm(tickers, force=args.force, max_workers=args.workers)
+    for ticker, cached in results.items():
+        print(f"{'✅' if cached else '❌'} {ticker}")
+    print(f"Cached {sum(results.values())}/{len(results)} tickers in {shared_cache.path}")
+
+
+if __name__ == "__main__":
+    main()
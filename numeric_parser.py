@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+
+# Cells meaning "no value"; "--" is NASDAQ's marker for a missing figure
+MISSING_TOKENS = ["", "n/a", "na", "nan", "none", "nm", "--"]
+# A lone dash in a financial statement means zero
+ZERO_TOKENS = ["-", "—", "–", "‒", "―"]
+
+# Scale words, largest first
+SCALE_WORDS = [
+    ("trillion", 1_000_000_000_000),
+    ("billion", 1_000_000_000),
+    ("million", 1_000_000),
+    ("thousand", 1_000),
+]
+
+NUMBER_PATTERN = r'(?P<paren>\()?(?P<sign>-)?(?P<number>\d+(?:\.\d+)?|\.\d+)'
+
+
+def parse_money(values) -> pd.Series:
+    """
+    Parse formatted money/number strings into floats, a whole Series at a time.
+
+    Handles "$", thousands separators, "%" (kept in percent units), negatives
+    written as "(1,234)" or "-1,234", a lone dash or em-dash as zero, and
+    "million"/"billion"/"thousand"/"trillion" scale words. Blank, "N/A" and
+    "--" cells become NaN. The first number in each string is used.
+
+    Args:
+        values: Series or list-like of strings and/or numbers
+
+    Returns:
+        Series of floats with the same index as values
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.astype("float64")
+
+    text = series.astype("string").str.strip()
+    lowered = text.str.lower()
+    cleaned = text.str.replace("−", "-", regex=False).str.replace(r'[$,\s]', '', regex=True)
+
+    match = cleaned.str.extract(NUMBER_PATTERN)
+    numbers = pd.to_numeric(match["number"], errors="coerce").astype("float64")
+    negative = (match["paren"].notna() | match["sign"].notna()).to_numpy(dtype=bool)
+    numbers = numbers.where(~negative, -numbers)
+
+    scale = np.select(
+        [lowered.str.contains(word, regex=False).fillna(False).to_numpy(dtype=bool) for word, _ in SCALE_WORDS],
+        [multiplier for _, multiplier in SCALE_WORDS],
+        default=1,
+    )
+    numbers = numbers * scale
+
+    zero = cleaned.isin(ZERO_TOKENS).fillna(False).to_numpy(dtype=bool)
+    missing = (text.isna() | lowered.isin(MISSING_TOKENS)).fillna(True).to_numpy(dtype=bool)
+    numbers[zero] = 0.0
+    numbers[missing] = np.nan
+    return numbers.astype("float64")
+
+
+def parse_money_value(value) -> float:
+    """Parse a single formatted money/number value (NaN if it has no number)."""
+    return float(parse_money(pd.Series([value], dtype=object)).iloc[0])
@@ -1,9 +1,17 @@
 import os
+import copy
 import json
-import requests
+import time
+import uuid
 import re
-from typing import Dict, List, Optional, Tuple
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
+import pandas as pd
 from bs4 import BeautifulSoup
 from llama_index.core import Document, VectorStoreIndex, ServiceContext
 from llama_index.core.node_parser import SimpleNodeParser
@@ -13,6 +21,42 @@ from llama_index.core.settings import Settings
 from llama_index.core.query_engine import RetrieverQueryEngine
 from llama_index.core.retrievers import VectorIndexRetriever
 
+from financial_table_extractor import FinancialTableExtractor
+from sec_companyfacts import load_company_facts, parse_edgar_url
+from analysis_store import ResultCache, StepCheckpointStore
+from numeric_parser import parse_money_value
+from comparison_engine import comparison_frame, rank_companies, rankings_markdown, summary_table
+from rate_limited_clients import edgar_get, llm_call
+
+# Bump whenever a pipeline prompt or step changes so stored results are regenerated
+PIPELINE_VERSION = "1"
+
+OUTPUT_DIR = "financial_analysis_output"
+
+# Batch audit trail: JSON lines rotated at AUDIT_LOG_MAX_BYTES, with only the
+# latest AUDIT_LOG_MEMORY_ENTRIES entries kept in memory
+AUDIT_LOG_PATH = os.path.join(OUTPUT_DIR, "audit_log.jsonl")
+AUDIT_LOG_MAX_BYTES = 5 * 1024 * 1024
+AUDIT_LOG_BACKUP_COUNT = 5
+AUDIT_LOG_MEMORY_ENTRIES = 1000
+
+# Pipeline step -> steps whose results it depends on. Steps whose
+# dependencies are complete run concurrently.
+PIPELINE_GRAPH = {
+    "step1_extraction": [],
+    "step2_analysis": ["step1_extraction"],
+    "step3_verification": ["step1_extraction"],
+    "step4_extract_summary": ["step2_analysis"],
+}
+
+# Step-1 derived field (section, field) -> the (section, field) inputs _calculate_ratios derives it from
+DERIVED_RATIO_INPUTS = {
+    ("Liquidity", "Current_Ratio"): [("Liquidity", "Total_Current_Assets"), ("Liquidity", "Total_Current_Liabilities")],
+    ("Leverage", "Debt_to_Equity"): [("Leverage", "Total_Debt"), ("Leverage", "Shareholders_Equity")],
+    ("Profitability", "Operating_Margin"): [("Profitability", "Operating_Income"), ("Profitability", "Revenue")],
+    ("Cash_Flow", "Free_Cash_Flow"): [("Cash_Flow", "Operating_Cash_Flow"), ("Cash_Flow", "Capex")],
+}
+
 class FinancialRAGPipeline:
     """
     Complete RAG pipeline for financial document analysis with 3-step process:
@@ -26,9 +70,16 @@ class FinancialRAGPipeline:
                  api_key: str,
                  embedding_deployment: str = "text-embedding-ada-002",
                  AZURE_OPENAI_DEPLOYMENT: str = "dev-gpt-4o",
-                 api_version: str = "2024-02-01"):
+                 api_version: str = "2024-02-01",
+                 checkpoint_store: Optional[StepCheckpointStore] = None,
+                 max_workers: int = 2):
         """
         Initialize the RAG pipeline with Azure OpenAI configurations.
+        
+        Args:
+            checkpoint_store: Where completed steps are checkpointed (defaults to
+                              financial_analysis_output/checkpoints)
+            max_workers: Number of independent pipeline steps run concurrently
         """
         
         # Configure Azure OpenAI Embedding model
@@ -59,7 +110,15 @@ class FinancialRAGPipeline:
         
         # Store the source text for verification
         self.source_text = ""
+        self.source_tables = []
+        self.source_url = None
         self.vector_index = None
+        # time.monotonic() after which _run_step_graph starts no further steps
+        self.deadline = None
+        
+        # Completed steps are checkpointed so failed runs can resume
+        self.checkpoints = checkpoint_store or StepCheckpointStore()
+        self.max_workers = max_workers
         
     # =================== STEP 1: DATA EXTRACTION ===================
     
@@ -127,6 +186,34 @@ Rules:
 - Output must be valid JSON only (no commentary)
 - Look for the most recent quarter data
 - For debt maturities, check the notes section
+- For undrawn facilities, check credit agreements or liquidity sections"""
+
+        narrative_prompt = """You are a financial data extractor. The statement line items of this 10-Q have already been read from its tables. From the provided 10-Q document, extract only the following narrative fields into valid JSON:
+
+{
+  "Company": "",
+  "Report_Date": "",
+  "Leverage": {
+    "Debt_Maturities": {
+      "2025": "",
+      "2026": "",
+      "2027": "",
+      "2028": "",
+      "2029_and_beyond": ""
+    },
+    "Undrawn_Facilities": ""
+  },
+  "Commitments_Contingencies": {
+    "Purchase_Obligations": "",
+    "Legal_Tax_Exposure": ""
+  }
+}
+
+Rules:
+- Use exact reported values and currency units
+- Do not invent values; leave as "" if not disclosed
+- Output must be valid JSON only (no commentary)
+- For debt maturities, check the notes section
 - For undrawn facilities, check credit agreements or liquidity sections"""
 
         try:
@@ -137,19 +224,46 @@ Rules:
             
             print("Creating vector index with Azure OpenAI embeddings...")
             self.vector_index = self._create_vector_index(self.source_text)
+            self.source_url = html_url
             
-            # Query for financial data extraction
-            print("Extracting financial data...")
-            query_engine = self.vector_index.as_query_engine(
-                llm=self.llm,
-                similarity_top_k=15,  # Retrieve more chunks for comprehensive data
-                response_mode="compact"
-            )
-            
-            response = query_engine.query(extraction_prompt)
+            # Read statement line items from XBRL facts and the condensed statement tables
+            print("Reading structured statement data...")
+            structured_data = self._structured_financial_data(html_url)
             
-            # Parse JSON response
-            financial_data = self._parse_json_response(str(response))
+            if FinancialTableExtractor.covers_core_fields(structured_data):
+                # Only the narrative fields still need the LLM
+                print("Statement tables parsed; extracting narrative fields...")
+                query_engine = self.vector_index.as_query_engine(
+                    llm=self.llm,
+                    similarity_top_k=5,
+                    response_mode="compact"
+                )
+                
+                response = llm_call(query_engine.query, narrative_prompt)
+                narrative_data = self._parse_json_response(str(response))
+                
+                if "error" in narrative_data:
+                    print("Warning: Narrative extraction failed; using statement tables only")
+                    narrative_data = {}
+                
+                financial_data = self._merge_structured_data(narrative_data, structured_data)
+            else:
+                # Query for financial data extraction
+                print("Extracting financial data...")
+                query_engine = self.vector_index.as_query_engine(
+                    llm=self.llm,
+                    similarity_top_k=15,  # Retrieve more chunks for comprehensive data
+                    response_mode="compact"
+                )
+                
+                response = llm_call(query_engine.query, extraction_prompt)
+                
+                # Parse JSON response
+                financial_data = self._parse_json_response(str(response))
+                
+                # Exact table values take precedence over LLM-extracted ones
+                if "error" not in financial_data:
+                    financial_data = self._merge_structured_data(financial_data, structured_data)
             
             # Perform calculations if needed
             financial_data = self._calculate_ratios(financial_data)
@@ -216,7 +330,7 @@ Rules:
 
         try:
             # Use the LLM directly for analysis
-            response = self.llm.complete(analysis_prompt)
+            response = llm_call(self.llm.complete, analysis_prompt)
             analysis_summary = str(response)
             
             print("\n✅ Step 2 Complete: Credit rating summary generated")
@@ -271,7 +385,7 @@ Report format:
                 response_mode="tree_summarize"
             )
             
-            verification_result = query_engine.query(verification_prompt)
+            verification_result = llm_call(query_engine.query, verification_prompt)
             
             print("\n✅ Step 3 Complete: Verification performed")
             return str(verification_result)
@@ -327,7 +441,7 @@ Report format:
         """
         try:
             # Use the LLM directly for analysis
-            response = self.llm.complete(extract_summary_prompt)
+            response = llm_call(self.llm.complete, extract_summary_prompt)
             extracted_summary = str(response)
             
             print("\n✅ Step 2 Complete: Credit rating summary generated")
@@ -345,7 +459,7 @@ Report format:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
-            response = requests.get(html_url, headers=headers, timeout=30)
+            response = edgar_get(html_url, headers=headers, timeout=30)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -357,9 +471,14 @@ Report format:
             # Extract tables separately to preserve structure
             tables = soup.find_all('table')
             table_texts = []
+            self.source_tables = []
             for table in tables:
-                table_text = self._extract_table_text(table)
-                table_texts.append(table_text)
+                rows = self._extract_table_rows(table)
+                table_texts.append(self._extract_table_text(rows))
+                self.source_tables.append({
+                    "rows": rows,
+                    "context": self._extract_table_context(table)
+                })
             
             # Get all text
             text = soup.get_text(separator=' ', strip=True)
@@ -376,15 +495,22 @@ Report format:
         except Exception as e:
             raise Exception(f"Error parsing HTML: {e}")
     
-    def _extract_table_text(self, table) -> str:
-        """Extract text from HTML table preserving structure."""
-        rows = table.find_all('tr')
-        table_data = []
-        for row in rows:
+    def _extract_table_rows(self, table) -> List[List[str]]:
+        """Extract the cell texts of an HTML table, row by row."""
+        table_rows = []
+        for row in table.find_all('tr'):
             cells = row.find_all(['td', 'th'])
-            row_data = [cell.get_text(strip=True) for cell in cells]
-            table_data.append(' | '.join(row_data))
-        return '\n'.join(table_data)
+            table_rows.append([cell.get_text(strip=True) for cell in cells])
+        return table_rows
+    
+    def _extract_table_text(self, rows: List[List[str]]) -> str:
+        """Extract text from HTML table rows preserving structure."""
+        return '\n'.join(' | '.join(row_data) for row_data in rows)
+    
+    def _extract_table_context(self, table, limit: int = 15) -> str:
+        """Text immediately preceding a table (statement title and scale heading)."""
+        previous = table.find_all_previous(string=True, limit=limit)
+        return ' '.join(reversed([text.strip() for text in previous if text.strip()]))
     
     def _create_vector_index(self, text: str) -> VectorStoreIndex:
         """Create a vector index from text."""
@@ -428,6 +554,50 @@ Report format:
                 "raw_response": response_text[:500]
             }
     
+    def _structured_financial_data(self, html_url: str) -> Dict:
+        """
+        Fill step-1 statement fields without the LLM.
+        
+        Values parsed from the filing's statement tables are overridden by the
+        filing's XBRL companyfacts when the URL identifies an EDGAR filing.
+        """
+        structured_data = FinancialTableExtractor(self.source_tables).extract()
+        
+        cik, accession = parse_edgar_url(html_url)
+        if cik:
+            company_facts = load_company_facts(cik)
+            if company_facts is not None:
+                xbrl_data = company_facts.step1_data(accession)
+                structured_data = self._merge_financial_data(structured_data, xbrl_data)
+        
+        return structured_data
+    
+    def _merge_financial_data(self, base: Dict, overrides: Dict) -> Dict:
+        """Recursively merge overrides into base; non-empty override values win."""
+        merged = dict(base)
+        for key, value in overrides.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = self._merge_financial_data(merged[key], value)
+            elif value not in ("", None):
+                merged[key] = value
+        return merged
+    
+    def _merge_structured_data(self, llm_data: Dict, structured_data: Dict) -> Dict:
+        """
+        Merge statement-table values over LLM-extracted step-1 data.
+
+        A derived ratio the LLM returned is cleared when any of its inputs was
+        replaced by a table value, so _calculate_ratios recomputes it from the
+        merged inputs instead of keeping a ratio that contradicts them.
+        """
+        merged = self._merge_financial_data(llm_data, structured_data)
+        for (section, field), inputs in DERIVED_RATIO_INPUTS.items():
+            overridden = any(structured_data.get(input_section, {}).get(input_field) not in ("", None)
+                             for input_section, input_field in inputs)
+            if overridden and isinstance(merged.get(section), dict) and merged[section].get(field):
+                merged[section] = dict(merged[section], **{field: ""})
+        return merged
+    
     def _calculate_ratios(self, data: Dict) -> Dict:
         """Calculate financial ratios if not already calculated."""
         try:
@@ -497,42 +667,151 @@ Report format:
     
     def _extract_number(self, value_str: str) -> Optional[float]:
         """Extract numeric value from string with currency/units."""
-        if not value_str or value_str == "":
+        if not value_str:
             return None
         
-        try:
-            # Remove currency symbols and commas
-            clean_str = re.sub(r'[$,()]', '', str(value_str))
-            
-            # Handle parentheses for negative numbers
-            if '(' in str(value_str) and ')' in str(value_str):
-                clean_str = '-' + clean_str
-            
-            # Extract number
-            match = re.search(r'-?\d+\.?\d*', clean_str)
-            if match:
-                number = float(match.group())
+        number = parse_money_value(value_str)
+        return None if pd.isna(number) else number
+    
+    # =================== CHECKPOINTING ===================
+    
+    def _filing_key(self, html_url: str) -> str:
+        """Checkpoint namespace of a filing: its accession number, else a hash of the URL."""
+        _, accession = parse_edgar_url(html_url)
+        return accession or StepCheckpointStore.input_hash(html_url)
+    
+    @staticmethod
+    def _step_failed(result) -> bool:
+        """Steps report failures in their result instead of raising."""
+        if isinstance(result, dict):
+            return "error" in result
+        return not result or str(result).startswith("Error")
+    
+    def _run_checkpointed(self, filing_key: str, step: str, inputs: List, run_step, resume: bool):
+        """
+        Run a pipeline step, reusing its checkpoint when the inputs are unchanged.
+        
+        Args:
+            filing_key: Checkpoint namespace of the filing
+            step: Step name (the results key)
+            inputs: Everything the step's output depends on
+            run_step: Callable that runs the step
+            resume: Reuse a matching checkpoint instead of rerunning the step
+        """
+        input_hash = StepCheckpointStore.input_hash(PIPELINE_VERSION, step, inputs)
+        
+        if resume:
+            checkpoint = self.checkpoints.load(filing_key, step, input_hash)
+            if checkpoint is not None:
+                print(f"\n↩️ {step}: resumed from checkpoint")
+                return checkpoint
+        
+        result = run_step()
+        if not self._step_failed(result):
+            self.checkpoints.save(filing_key, step, input_hash, result)
+        return result
+    
+    def _ensure_vector_index(self, html_url: str) -> None:
+        """Rebuild the source index when step 1 was resumed from a checkpoint."""
+        if self.vector_index is None or self.source_url != html_url:
+            print("Rebuilding vector index for verification...")
+            self.source_text = self._parse_html(html_url)
+            self.vector_index = self._create_vector_index(self.source_text)
+            self.source_url = html_url
+    
+    # =================== STEP GRAPH ===================
+    
+    def _run_step(self, step: str, html_url: str, filing_key: str, results: Dict, resume: bool):
+        """Run one pipeline step on the results of its dependencies."""
+        if step == "step1_extraction":
+            return self._run_checkpointed(
+                filing_key, step, [html_url],
+                lambda: self.step1_extract_financial_data(html_url), resume
+            )
+        
+        inputs = [results[dependency] for dependency in PIPELINE_GRAPH[step]]
+        
+        if step == "step2_analysis":
+            run_step = lambda: self.step2_analyze_and_rate(inputs[0])
+        elif step == "step3_verification":
+            def run_step():
+                # Rebuilding the index refetches and re-embeds the filing; a failure there is reported like step 3's own
+                try:
+                    self._ensure_vector_index(html_url)
+                except Exception as e:
+                    print(f"❌ Error in Step 3: {e}")
+                    return f"Error during verification: {str(e)}"
+                return self.step3_verify_data(inputs[0])
+        elif step == "step4_extract_summary":
+            run_step = lambda: self.step_4_extract_summary(inputs[0])
+        else:
+            raise ValueError(f"Unknown pipeline step: {step}")
+        
+        return self._run_checkpointed(filing_key, step, inputs, run_step, resume)
+    
+    def _run_step_graph(self, html_url: str, results: Dict, resume: bool, max_workers: int) -> Dict:
+        """
+        Run the steps of PIPELINE_GRAPH, each as soon as its dependencies complete.
+        
+        Args:
+            html_url: URL of the 10-Q HTML document
+            results: Results dictionary filled in place, keyed by step name
+            resume: Skip steps already checkpointed with the same inputs
+            max_workers: Maximum number of steps running at once
+        """
+        filing_key = self._filing_key(html_url)
+        pending = dict(PIPELINE_GRAPH)
+        completed = set()
+        running = {}
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                ready = [step for step, dependencies in pending.items()
+                         if all(dependency in completed for dependency in dependencies)]
+                if ready and self.deadline is not None and time.monotonic() > self.deadline:
+                    print(f"\n⏱️ Deadline passed; skipping {', '.join(pending)}")
+                    pending.clear()
+                    ready = []
+                for step in ready:
+                    del pending[step]
+                    future = executor.submit(self._run_step, step, html_url, filing_key, results, resume)
+                    running[future] = step
+                
+                if not running:
+                    break
                 
-                # Handle millions/billions
-                if 'million' in value_str.lower():
-                    number *= 1_000_000
-                elif 'billion' in value_str.lower():
-                    number *= 1_000_000_000
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    step = running.pop(future)
+                    try:
+                        results[step] = future.result()
+                    except Exception as e:
+                        # Steps report failures in their results; one that raises must not abort the run
+                        print(f"❌ Error in {step}: {e}")
+                        error = f"Error in {step}: {str(e)}"
+                        results[step] = {"error": error} if step == "step1_extraction" else error
+                    completed.add(step)
                 
-                return number
-        except:
-            pass
+                financial_data = results["step1_extraction"]
+                if financial_data is not None and "error" in financial_data:
+                    print(f"\n❌ Pipeline halted due to Step 1 error: {financial_data['error']}")
+                    pending.clear()
         
-        return None
+        return results
     
     # =================== MAIN PIPELINE METHOD ===================
     
-    def run_complete_pipeline(self, html_url: str) -> Dict:
+    def run_complete_pipeline(self, html_url: str, resume: bool = True,
+                              max_workers: Optional[int] = None) -> Dict:
         """
         Run the complete 3-step financial analysis pipeline.
         
+        Steps 2 and 3 only depend on step 1 and run concurrently.
+        
         Args:
             html_url: URL of the 10-Q HTML document
+            resume: Skip steps already checkpointed for this filing with the same inputs
+            max_workers: Concurrent steps (defaults to the pipeline's max_workers)
             
         Returns:
             Dictionary containing results from all 3 steps
@@ -552,27 +831,12 @@ Report format:
             "step4_extract_summary": None
         }
         
-        # Step 1: Extract Financial Data
-        financial_data = self.step1_extract_financial_data(html_url)
-        results["step1_extraction"] = financial_data
+        # Steps 1-4: Extract, analyze and rate, verify, summarize
+        self._run_step_graph(html_url, results, resume, max_workers or self.max_workers)
         
-        if "error" in financial_data:
-            print(f"\n❌ Pipeline halted due to Step 1 error: {financial_data['error']}")
+        if "error" in results["step1_extraction"]:
             return results
         
-        # Step 2: Analyze and Rate
-        analysis_summary = self.step2_analyze_and_rate(financial_data)
-        results["step2_analysis"] = analysis_summary
-        
-        # Step 3: Verify Data
-        verification_report = self.step3_verify_data(financial_data)
-        results["step3_verification"] = verification_report
-
-        # Step 4: Extract summary
-
-        extract_summary = self.step_4_extract_summary(analysis_summary)
-        results["step4_extract_summary"] = extract_summary
-        
         print("\n" + "=" * 60)
         print("FINANCIAL RAG PIPELINE - COMPLETE")
         print("=" * 60)
@@ -580,13 +844,89 @@ Report format:
         return results
 
 
+# =================== RESULT PERSISTENCE ===================
+
+def save_results(results: Dict, output_dir: str) -> str:
+    """
+    Save pipeline results to a directory.
+    
+    Args:
+        results: Results from run_complete_pipeline
+        output_dir: Directory to write the step files into
+        
+    Returns:
+        The output directory
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Save Step 1 - JSON extraction
+    with open(f"{output_dir}/step1_extraction.json", "w") as f:
+        json.dump(results["step1_extraction"], f, indent=2)
+    
+    # Save Step 2 - Analysis summary
+    with open(f"{output_dir}/step2_analysis.md", "w", encoding="utf-8") as f:
+        f.write(results["step2_analysis"] or "")
+    
+    # Save Step 3 - Verification report
+    with open(f"{output_dir}/step3_verification.txt", "w",encoding="utf-8") as f:
+        f.write(results["step3_verification"] or "")
+
+    # Save Step 4- Extract Summary
+    with open(f"{output_dir}/step4_extractred_summary.txt", "w",encoding="utf-8") as f:
+        f.write(results["step4_extract_summary"] or "")
+    
+    # Save complete results
+    with open(f"{output_dir}/complete_results.json", "w") as f:
+        json.dump(results, f, indent=2)
+    
+    print(f"\n📁 Results saved to '{output_dir}/' directory")
+    return output_dir
+
+
+def persist_results_async(results: Dict, output_dir: str = OUTPUT_DIR,
+                          run_id: Optional[str] = None) -> threading.Thread:
+    """
+    Save pipeline results in the background under a per-run directory.
+    
+    Each run writes to its own output_dir/runs/<run_id>/ so concurrent users
+    never overwrite each other's files.
+    
+    Args:
+        results: Results from run_complete_pipeline
+        output_dir: Base output directory
+        run_id: Run namespace (defaults to a timestamp plus a random suffix)
+        
+    Returns:
+        The thread writing the files
+    """
+    run_id = run_id or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    run_dir = os.path.join(output_dir, "runs", run_id)
+    
+    def persist():
+        try:
+            save_results(results, run_dir)
+        except Exception as e:
+            print(f"Warning: Could not save results to {run_dir}: {e}")
+    
+    thread = threading.Thread(target=persist, name=f"persist-{run_id}", daemon=True)
+    thread.start()
+    return thread
+
+
 # =================== USAGE EXAMPLE ===================
 
-def AI_rec_main(html_url):
+def AI_rec_main(html_url, persist: bool = True):
 
     
     """
     Example usage of the Financial RAG Pipeline.
+    
+    Args:
+        html_url: URL of the 10-Q HTML document
+        persist: Also save the results in the background under a per-run directory
+        
+    Returns:
+        Results from run_complete_pipeline
     """
     
     # Configure Azure OpenAI credentials
@@ -609,31 +949,9 @@ def AI_rec_main(html_url):
     # Run the complete pipeline
     results = pipeline.run_complete_pipeline(html_url)
     
-    # Save results
-    output_dir = "financial_analysis_output"
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Save Step 1 - JSON extraction
-    with open(f"{output_dir}/step1_extraction.json", "w") as f:
-        json.dump(results["step1_extraction"], f, indent=2)
-    
-    # Save Step 2 - Analysis summary
-    with open(f"{output_dir}/step2_analysis.md", "w", encoding="utf-8") as f:
-        f.write(results["step2_analysis"])
-    
-    # Save Step 3 - Verification report
-    with open(f"{output_dir}/step3_verification.txt", "w",encoding="utf-8") as f:
-        f.write(results["step3_verification"])
-
-    # Save Step 4- Extract Summary
-    with open(f"{output_dir}/step4_extractred_summary.txt", "w",encoding="utf-8") as f:
-        f.write(results["step4_extract_summary"])
-    
-    # Save complete results
-    with open(f"{output_dir}/complete_results.json", "w") as f:
-        json.dump(results, f, indent=2)
-    
-    print(f"\n📁 Results saved to '{output_dir}/' directory")
+    # Save results without blocking the caller
+    if persist:
+        persist_results_async(results)
     
     # Display summary
     print("\n" + "=" * 60)
@@ -660,101 +978,279 @@ def AI_rec_main(html_url):
 
 # =================== ADVANCED FEATURES ===================
 
+_audit_loggers: Dict[str, logging.Logger] = {}
+_audit_loggers_lock = threading.Lock()
+
+
+def get_audit_logger(path: str = AUDIT_LOG_PATH) -> logging.Logger:
+    """Logger streaming audit entries to a rotating JSON-lines file (one per path)."""
+    path = os.path.abspath(path)
+    with _audit_loggers_lock:
+        logger = _audit_loggers.get(path)
+        if logger is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=AUDIT_LOG_MAX_BYTES,
+                                          backupCount=AUDIT_LOG_BACKUP_COUNT, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger(f"{__name__}.audit.{len(_audit_loggers)}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            _audit_loggers[path] = logger
+        return logger
+
+
 class EnhancedFinancialRAGPipeline(FinancialRAGPipeline):
     """
     Enhanced pipeline with additional features for production use.
     """
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, result_cache: Optional[ResultCache] = None,
+                 audit_log_path: str = AUDIT_LOG_PATH, **kwargs):
+        """
+        Args:
+            result_cache: Cache of completed results (defaults to an LRU persisted
+                          under financial_analysis_output/result_cache)
+            audit_log_path: Rotating JSON-lines file the audit trail is written to
+        """
         super().__init__(*args, **kwargs)
-        self.cache = {}
-        self.audit_log = []
+        self.cache = result_cache or ResultCache()
+        self.audit_log = deque(maxlen=AUDIT_LOG_MEMORY_ENTRIES)
+        self.audit_logger = get_audit_logger(audit_log_path)
     
-    def batch_process_urls(self, urls: List[str]) -> List[Dict]:
+    def fork(self) -> "EnhancedFinancialRAGPipeline":
         """
-        Process multiple 10-Q URLs in batch.
+        Copy of the pipeline with fresh per-document state.
+        
+        Forks share the LLM/embedding clients, checkpoint store, cache and audit
+        log, but each has its own parsed source and vector index so several
+        documents can be processed at once.
+        """
+        pipeline = copy.copy(self)
+        pipeline.source_text = ""
+        pipeline.source_tables = []
+        pipeline.source_url = None
+        pipeline.vector_index = None
+        pipeline.deadline = None
+        return pipeline
+    
+    def get_cached_results(self, url: str) -> Optional[Dict]:
+        """Results of a URL already analyzed by the current pipeline version, if any."""
+        return self.cache.get(self._filing_key(url), PIPELINE_VERSION)
+    
+    def _cache_results(self, url: str, results: Dict) -> None:
+        """Cache results in which every step completed."""
+        steps_ok = all(not self._step_failed(results.get(step)) for step in PIPELINE_GRAPH)
+        if steps_ok:
+            self.cache.put(self._filing_key(url), PIPELINE_VERSION, results)
+    
+    def _process_url(self, url: str, started: Dict[str, float], timeout: Optional[float] = None) -> Dict:
+        """Run the complete pipeline for one URL on its own fork, starting no new step after timeout."""
+        pipeline = self.fork()
+        started[url] = time.monotonic()
+        if timeout:
+            pipeline.deadline = started[url] + timeout
+        results = pipeline.run_complete_pipeline(url)
+        self._cache_results(url, results)
+        return results
+    
+    def _audit(self, url: str, status: str) -> None:
+        """Record an audit entry in memory and stream it to the audit log file."""
+        entry = {
+            "url": url,
+            "timestamp": datetime.now().isoformat(),
+            "status": status
+        }
+        self.audit_log.append(entry)
+        self.audit_logger.info(json.dumps(entry))
+    
+    def _batch_result(self, url: str, results: Optional[Dict] = None, error: Optional[str] = None,
+                      progress: str = "") -> Dict:
+        """Record the audit entry of a processed URL, report its status and return its batch result."""
+        if error is None:
+            status = "success" if "error" not in results["step1_extraction"] else "failed"
+        else:
+            print(f"Error processing {url}: {error}")
+            status = "failed"
+            results = {"url": url, "error": error}
+        
+        print(f"\n{'✅' if status == 'success' else '❌'} Processed URL {progress}: {url} ({status})")
+        self._audit(url, status)
+        return results
+    
+    def iter_process_urls(self, urls: Iterable[str], max_workers: int = 4,
+                          timeout: Optional[float] = None) -> Iterator[Dict]:
+        """
+        Process 10-Q URLs concurrently, yielding each result as soon as it completes.
+        
+        Every URL runs on its own fork of the pipeline. All workers share the
+        rate-limited EDGAR and LLM clients, so throughput is bounded by those
+        quotas rather than by the latency of each document.
         
         Args:
-            urls: List of HTML URLs to process
+            urls: HTML URLs to process
+            max_workers: Number of URLs processed at once
+            timeout: Seconds a URL may run before it is reported as timed out.
+                     A timed-out URL starts no further pipeline steps, but the
+                     request in flight is not interrupted: its worker keeps its
+                     slot until that step returns.
             
-        Returns:
-            List of results for each URL
+        Yields:
+            Pipeline results per URL, in completion order; failed URLs yield
+            {"url": ..., "error": ...}. URLs already analyzed by this pipeline
+            version are served from the cache first.
         """
-        batch_results = []
+        # Duplicates would share their start time and batch result
+        urls = list(dict.fromkeys(urls))
+        to_process = []
+        for url in urls:
+            cached = self.get_cached_results(url)
+            if cached is None:
+                to_process.append(url)
+            else:
+                self._audit(url, "cached")
+                yield {**cached, "url": url}
         
-        for i, url in enumerate(urls, 1):
-            print(f"\n{'='*60}")
-            print(f"Processing URL {i}/{len(urls)}")
-            print(f"{'='*60}")
-            
-            try:
-                results = self.run_complete_pipeline(url)
-                batch_results.append(results)
+        print(f"\n♻️ {len(urls) - len(to_process)}/{len(urls)} URLs served from cache")
+        if not to_process:
+            return
+        
+        started: Dict[str, float] = {}
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        running = {executor.submit(self._process_url, url, started, timeout): url for url in to_process}
+        completed = 0
+        
+        try:
+            while running:
+                finished, _ = wait(running, timeout=1 if timeout else None, return_when=FIRST_COMPLETED)
                 
-                # Log audit trail
-                self.audit_log.append({
-                    "url": url,
-                    "timestamp": datetime.now().isoformat(),
-                    "status": "success" if "error" not in results["step1_extraction"] else "failed"
-                })
+                for future in finished:
+                    url = running.pop(future)
+                    completed += 1
+                    progress = f"{completed}/{len(to_process)}"
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        yield self._batch_result(url, error=str(e), progress=progress)
+                    else:
+                        yield self._batch_result(url, results=results, progress=progress)
                 
-            except Exception as e:
-                print(f"Error processing {url}: {e}")
-                batch_results.append({
-                    "url": url,
-                    "error": str(e)
-                })
+                if timeout:
+                    now = time.monotonic()
+                    for future, url in list(running.items()):
+                        if url in started and now - started[url] > timeout:
+                            # The worker thread cannot be interrupted; its result is discarded
+                            del running[future]
+                            completed += 1
+                            yield self._batch_result(url, error=f"Timed out after {timeout:.0f} seconds",
+                                                     progress=f"{completed}/{len(to_process)}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def batch_process_urls(self, urls: List[str], max_workers: int = 4,
+                           timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Process multiple 10-Q URLs in batch.
         
-        return batch_results
+        Args:
+            urls: List of HTML URLs to process
+            max_workers: Number of URLs processed at once
+            timeout: Seconds a URL may run before it is reported as timed out
+            
+        Returns:
+            List of results for each distinct URL, in the order of urls
+        """
+        urls = list(dict.fromkeys(urls))
+        results_by_url = {result["url"]: result
+                          for result in self.iter_process_urls(urls, max_workers, timeout)}
+        return [results_by_url[url] for url in urls]
     
-    def generate_comparison_report(self, results_list: List[Dict]) -> str:
+    def _successful_extractions(self, results: Iterable[Dict]) -> Iterator[Dict]:
+        """Step-1 extractions of the results that completed without errors."""
+        for result in results:
+            extraction = result.get("step1_extraction")
+            if extraction and "error" not in extraction:
+                yield extraction
+    
+    def generate_comparison_report(self, results_list: Optional[Iterable[Dict]] = None) -> str:
         """
         Generate a comparison report across multiple companies.
         
+        Rankings are computed locally from the step-1 extractions; only a
+        fixed-size portfolio summary is sent to the LLM for the narrative, and
+        the narrative is checkpointed so an unchanged portfolio costs no tokens.
+        
         Args:
-            results_list: List of pipeline results
+            results_list: Pipeline results, e.g. a list or iter_process_urls()
+                          (defaults to the results held in the cache)
             
         Returns:
             Comparison report in markdown format
         """
+        if results_list is None:
+            results_list = self.cache.results()
+        
+        ranked = rank_companies(comparison_frame(self._successful_extractions(results_list)))
+        if ranked.empty:
+            return "No successfully extracted companies to compare."
+        
+        summary = summary_table(ranked)
+        
         comparison_prompt = f"""
-        Generate a comparative analysis report for the following companies:
+        Write the narrative part of a comparative credit analysis for a portfolio
+        of companies. Rankings are already computed; use only this summary:
         
-        {json.dumps([r["step1_extraction"] for r in results_list], indent=2)}
+        {summary}
         
         Include:
-        1. Ranking by Current Ratio
-        2. Ranking by Debt-to-Equity
-        3. Ranking by Operating Margin
-        4. Overall Risk Assessment Comparison
-        5. Investment Recommendation
+        1. Overall Risk Assessment Comparison
+        2. Investment Recommendation
         """
         
-        response = self.llm.complete(comparison_prompt)
-        return str(response)
+        narrative = self._run_checkpointed(
+            "comparison", "comparison_narrative", [summary],
+            lambda: str(llm_call(self.llm.complete, comparison_prompt)), resume=True
+        )
+        
+        return "\n\n".join([
+            "# Portfolio Comparison",
+            "## Rankings by Current Ratio, Debt-to-Equity and Operating Margin",
+            rankings_markdown(ranked),
+            "## Portfolio Summary",
+            summary,
+            "## Risk Assessment and Recommendation",
+            narrative,
+        ])
     
-    def export_to_excel(self, results: Dict, filename: str = "financial_analysis.xlsx"):
+    def export_to_excel(self, results, filename: str = "financial_analysis.xlsx"):
         """
         Export results to Excel format (requires openpyxl).
         
+        Args:
+            results: Pipeline results of one URL, or an iterable of results
+                     (one row per company on each sheet)
+            filename: Excel file to write
+        
         Note: This is a template - requires openpyxl installation.
         """
         try:
             import pandas as pd
             
-            # Flatten the JSON data
-            extraction = results["step1_extraction"]
+            if isinstance(results, dict):
+                results = [results]
             
-            # Create DataFrames
-            df_liquidity = pd.DataFrame([extraction.get("Liquidity", {})])
-            df_leverage = pd.DataFrame([extraction.get("Leverage", {})])
-            df_profitability = pd.DataFrame([extraction.get("Profitability", {})])
+            # Flatten the JSON data, one row per company
+            rows = {"Liquidity": [], "Leverage": [], "Profitability": []}
+            for extraction in self._successful_extractions(results):
+                company = {"Company": extraction.get("Company", ""),
+                           "Report_Date": extraction.get("Report_Date", "")}
+                for section in rows:
+                    rows[section].append({**company, **extraction.get(section, {})})
             
             # Write to Excel
             with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                df_liquidity.to_excel(writer, sheet_name='Liquidity', index=False)
-                df_leverage.to_excel(writer, sheet_name='Leverage', index=False)
-                df_profitability.to_excel(writer, sheet_name='Profitability', index=False)
+                for section, section_rows in rows.items():
+                    pd.DataFrame(section_rows).to_excel(writer, sheet_name=section, index=False)
             
             print(f"✅ Exported to {filename}")
             
@@ -0,0 +1,88 @@
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, Optional
+
+
+# SEC fair-access policy allows at most 10 requests per second per client
+EDGAR_REQUESTS_PER_SECOND = 10
+# Azure OpenAI calls (completions and RAG queries) per second across all pipelines
+LLM_REQUESTS_PER_SECOND = 5
+HTTP_POOL_SIZE = 20
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by every caller of one API.
+
+    Callers block in acquire() until a token is available, so any number of
+    worker threads together stay within the configured request rate.
+    """
+
+    def __init__(self, rate_per_second: float, burst: Optional[int] = None):
+        """
+        Args:
+            rate_per_second: Sustained number of requests allowed per second
+            burst: Requests that may be made back to back (defaults to one second's worth)
+        """
+        self.rate = float(rate_per_second)
+        self.capacity = float(burst or max(1, int(rate_per_second)))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request may be made."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+edgar_limiter = RateLimiter(EDGAR_REQUESTS_PER_SECOND)
+llm_limiter = RateLimiter(LLM_REQUESTS_PER_SECOND)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide HTTP session with a connection pool sized for concurrent workers."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def edgar_get(url: str, headers: Optional[Dict] = None, timeout: float = 30) -> requests.Response:
+    """
+    GET an SEC EDGAR URL within the shared EDGAR rate limit.
+
+    Args:
+        url: EDGAR URL
+        headers: Request headers (SEC requires a User-Agent)
+        timeout: Request timeout in seconds
+
+    Returns:
+        The HTTP response
+    """
+    edgar_limiter.acquire()
+    return get_session().get(url, headers=headers, timeout=timeout)
+
+
+def llm_call(call, *args, **kwargs):
+    """Run an LLM call (e.g. llm.complete or query_engine.query) within the shared LLM rate limit."""
+    llm_limiter.acquire()
+    return call(*args, **kwargs)
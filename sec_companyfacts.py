@@ -0,0 +1,280 @@
+import os
+import re
+import json
+import time
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from financial_table_extractor import format_amount
+from rate_limited_clients import edgar_get
+
+
+SEC_HEADERS = {"User-Agent": "your.email@domain.com"}
+COMPANYFACTS_URL = "https://data.sec.gov/api/xbrl/companyfacts/CIK{cik}.json"
+CACHE_DIR = "companyfacts_cache"
+CACHE_MAX_AGE_HOURS = 24
+
+# Canonical field -> (period kind, us-gaap concepts in order of preference).
+# "instant" facts are balance sheet values, "quarter" facts cover ~3 months and
+# "cumulative" facts take the longest fiscal-year-to-date duration ending on a date.
+CONCEPT_MAP = {
+    "Cash_and_Equivalents": ("instant", ["CashAndCashEquivalentsAtCarryingValue",
+                                         "CashCashEquivalentsRestrictedCashAndRestrictedCashEquivalents"]),
+    "Total_Current_Assets": ("instant", ["AssetsCurrent"]),
+    "Total_Current_Liabilities": ("instant", ["LiabilitiesCurrent"]),
+    "Total_Assets": ("instant", ["Assets"]),
+    "Total_Liabilities": ("instant", ["Liabilities"]),
+    "Shareholders_Equity": ("instant", ["StockholdersEquity",
+                                        "StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest"]),
+    "Long_Term_Debt_Current": ("instant", ["LongTermDebtCurrent", "LongTermDebtAndCapitalLeaseObligationsCurrent"]),
+    "Long_Term_Debt_Noncurrent": ("instant", ["LongTermDebtNoncurrent", "LongTermDebtAndCapitalLeaseObligations"]),
+    "Commercial_Paper": ("instant", ["CommercialPaper"]),
+    "Short_Term_Borrowings": ("instant", ["ShortTermBorrowings"]),
+    "Revenue": ("quarter", ["Revenues", "RevenueFromContractWithCustomerExcludingAssessedTax", "SalesRevenueNet"]),
+    "Operating_Income": ("quarter", ["OperatingIncomeLoss"]),
+    "Net_Income": ("quarter", ["NetIncomeLoss"]),
+    "Operating_Cash_Flow": ("cumulative", ["NetCashProvidedByUsedInOperatingActivities"]),
+    "Capex": ("cumulative", ["PaymentsToAcquirePropertyPlantAndEquipment"]),
+}
+
+DEBT_FIELDS = ["Long_Term_Debt_Current", "Long_Term_Debt_Noncurrent", "Commercial_Paper", "Short_Term_Borrowings"]
+
+# Step-1 JSON location of each canonical field
+STEP1_FIELDS = [
+    ("Liquidity", "Cash_and_Equivalents", "Cash_and_Equivalents"),
+    ("Liquidity", "Total_Current_Assets", "Total_Current_Assets"),
+    ("Liquidity", "Total_Current_Liabilities", "Total_Current_Liabilities"),
+    ("Liquidity", "Operating_Cash_Flow", "Operating_Cash_Flow"),
+    ("Leverage", "Total_Debt", "Total_Debt"),
+    ("Leverage", "Shareholders_Equity", "Shareholders_Equity"),
+    ("Profitability", "Revenue", "Revenue"),
+    ("Profitability", "Operating_Income", "Operating_Income"),
+    ("Profitability", "Net_Income", "Net_Income"),
+    ("Cash_Flow", "Operating_Cash_Flow", "Operating_Cash_Flow"),
+    ("Cash_Flow", "Capex", "Capex"),
+]
+
+EDGAR_URL_PATTERN = re.compile(r'/edgar/data/(\d+)/(\d{10}-?\d{2}-?\d{6})/')
+
+_facts_cache: Dict[str, "CompanyFacts"] = {}
+_facts_lock = threading.Lock()
+
+
+def parse_edgar_url(url: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extract the CIK and accession number from an EDGAR archive URL.
+
+    Returns:
+        (cik, accession) with the accession number undashed, or (None, None)
+    """
+    match = EDGAR_URL_PATTERN.search(url or "")
+    if not match:
+        return None, None
+    return match.group(1), match.group(2).replace("-", "")
+
+
+def _write_cache(path: str, payload: Dict) -> None:
+    """Atomically cache a companyfacts payload; a failed write only warns."""
+    tmp_path = None
+    try:
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Warning: Could not write companyfacts cache {path}: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_company_facts(cik, cache_dir: str = CACHE_DIR,
+                       max_age_hours: float = CACHE_MAX_AGE_HOURS) -> Optional["CompanyFacts"]:
+    """
+    Load the XBRL companyfacts for a CIK, downloading it at most once per cache period.
+
+    The parsed facts are kept in memory for the life of the process and the raw
+    JSON is cached on disk, so each CIK is fetched from SEC once per max_age_hours.
+
+    Args:
+        cik: Company CIK (with or without leading zeros)
+        cache_dir: Directory for the on-disk JSON cache
+        max_age_hours: Age after which the cached JSON is downloaded again
+
+    Returns:
+        CompanyFacts or None if the facts could not be retrieved
+    """
+    cik = str(cik).zfill(10)
+
+    with _facts_lock:
+        facts = _facts_cache.get(cik)
+    if facts is not None and time.time() - facts.loaded_at < max_age_hours * 3600:
+        return facts
+
+    cache_path = os.path.join(cache_dir, f"CIK{cik}.json")
+    payload = None
+
+    if os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < max_age_hours * 3600:
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable companyfacts cache {cache_path}: {e}")
+
+    if payload is None:
+        try:
+            response = edgar_get(COMPANYFACTS_URL.format(cik=cik), headers=SEC_HEADERS, timeout=30)
+            if response.status_code != 200:
+                print(f"Companyfacts request failed with status code: {response.status_code}")
+                return None
+            payload = response.json()
+        except Exception as e:
+            print(f"Error fetching companyfacts: {e}")
+            return None
+
+        _write_cache(cache_path, payload)
+
+    facts = CompanyFacts(cik, payload)
+    with _facts_lock:
+        _facts_cache[cik] = facts
+    return facts
+
+
+class CompanyFacts:
+    """
+    Columnar, period-indexed view of a company's SEC XBRL companyfacts.
+    """
+
+    def __init__(self, cik: str, payload: Dict):
+        self.cik = cik
+        self.entity_name = payload.get("entityName", "")
+        self.loaded_at = time.time()
+        self.facts = self._build_fact_frame(payload)
+
+    def _build_fact_frame(self, payload: Dict) -> pd.DataFrame:
+        """Flatten the USD facts of every mapped concept into one long columnar frame."""
+        us_gaap = payload.get("facts", {}).get("us-gaap", {})
+        concepts = {concept for _, concept_list in CONCEPT_MAP.values() for concept in concept_list}
+
+        columns: Dict[str, List] = {name: [] for name in ("concept", "start", "end", "val", "accn", "form", "filed")}
+        for concept in concepts:
+            for fact in us_gaap.get(concept, {}).get("units", {}).get("USD", []):
+                columns["concept"].append(concept)
+                columns["start"].append(fact.get("start"))
+                columns["end"].append(fact.get("end"))
+                columns["val"].append(fact.get("val"))
+                columns["accn"].append(fact.get("accn", "").replace("-", ""))
+                columns["form"].append(fact.get("form"))
+                columns["filed"].append(fact.get("filed"))
+
+        facts = pd.DataFrame(columns)
+        facts["start"] = pd.to_datetime(facts["start"], errors="coerce")
+        facts["end"] = pd.to_datetime(facts["end"], errors="coerce")
+        facts["filed"] = pd.to_datetime(facts["filed"], errors="coerce")
+        facts["val"] = pd.to_numeric(facts["val"], errors="coerce").astype("float64")
+        for column in ("concept", "accn", "form"):
+            facts[column] = facts[column].astype("category")
+        facts["days"] = (facts["end"] - facts["start"]).dt.days
+        return facts
+
+    def fact_table(self, accession: Optional[str] = None) -> pd.DataFrame:
+        """
+        Build a period-indexed table of the canonical statement fields.
+
+        Args:
+            accession: Restrict to facts reported in this filing (undashed accession number)
+
+        Returns:
+            DataFrame indexed by period end date (most recent first), one column per field
+        """
+        facts = self.facts
+        if accession:
+            facts = facts[facts["accn"] == accession.replace("-", "")]
+
+        # Later filings restate earlier ones: keep the most recently filed value
+        facts = facts.sort_values("filed")
+        instant = facts[facts["start"].isna()]
+        quarter = facts[facts["days"].between(80, 100)]
+        cumulative = facts[facts["days"] <= 380].sort_values(["days", "filed"])
+
+        kind_frames = {
+            "instant": instant.pivot_table(index="end", columns="concept", values="val", aggfunc="last", observed=True),
+            "quarter": quarter.pivot_table(index="end", columns="concept", values="val", aggfunc="last", observed=True),
+            "cumulative": cumulative.pivot_table(index="end", columns="concept", values="val", aggfunc="last",
+                                                 observed=True),
+        }
+
+        table = pd.DataFrame(index=pd.DatetimeIndex(facts["end"].dropna().unique(), name="end"))
+        for field, (kind, concepts) in CONCEPT_MAP.items():
+            frame = kind_frames[kind]
+            column = pd.Series(np.nan, index=table.index)
+            for concept in concepts:
+                if concept in frame.columns:
+                    column = column.combine_first(frame[concept].reindex(table.index))
+            table[field] = column
+
+        table["Total_Debt"] = table[DEBT_FIELDS].sum(axis=1, min_count=1)
+        return table.sort_index(ascending=False)
+
+    def ratio_table(self, accession: Optional[str] = None, table: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Compute the step-1 ratios for every period in one vectorized pass.
+
+        Returns:
+            DataFrame indexed by period end with Current_Ratio, Debt_to_Equity,
+            Operating_Margin and Free_Cash_Flow columns
+        """
+        if table is None:
+            table = self.fact_table(accession)
+        ratios = pd.DataFrame(index=table.index)
+        ratios["Current_Ratio"] = table["Total_Current_Assets"] / table["Total_Current_Liabilities"]
+        ratios["Debt_to_Equity"] = table["Total_Debt"] / table["Shareholders_Equity"]
+        ratios["Operating_Margin"] = table["Operating_Income"] / table["Revenue"]
+        ratios["Free_Cash_Flow"] = table["Operating_Cash_Flow"] - table["Capex"].abs()
+        return ratios.replace([np.inf, -np.inf], np.nan)
+
+    def step1_data(self, accession: Optional[str] = None) -> Dict:
+        """
+        Fill the step-1 statement fields and ratios for a filing's reporting period.
+
+        Args:
+            accession: Filing accession number; defaults to the latest reported period
+
+        Returns:
+            Partial step-1 JSON containing only the fields with reported facts
+        """
+        table = self.fact_table(accession)
+        if table.empty:
+            return {}
+
+        ratios = self.ratio_table(table=table)
+        period_end = table.index[0]
+        values = table.loc[period_end]
+        period_ratios = ratios.loc[period_end]
+
+        data: Dict = {"Report_Date": period_end.strftime("%B %d, %Y")}
+        if self.entity_name:
+            data["Company"] = self.entity_name
+
+        for section, field, column in STEP1_FIELDS:
+            value = values[column]
+            if pd.notna(value):
+                # Capex is reported as a positive payment; show it as a cash outflow
+                if column == "Capex":
+                    value = -abs(value)
+                data.setdefault(section, {})[field] = format_amount(value)
+
+        if pd.notna(period_ratios["Current_Ratio"]):
+            data.setdefault("Liquidity", {})["Current_Ratio"] = f"{period_ratios['Current_Ratio']:.2f}"
+        if pd.notna(period_ratios["Debt_to_Equity"]):
+            data.setdefault("Leverage", {})["Debt_to_Equity"] = f"{period_ratios['Debt_to_Equity']:.2f}"
+        if pd.notna(period_ratios["Operating_Margin"]):
+            data.setdefault("Profitability", {})["Operating_Margin"] = f"{period_ratios['Operating_Margin'] * 100:.2f}%"
+        if pd.notna(period_ratios["Free_Cash_Flow"]):
+            data.setdefault("Cash_Flow", {})["Free_Cash_Flow"] = f"${period_ratios['Free_Cash_Flow']:,.0f}"
+
+        return data
@@ -0,0 +1,331 @@
+import re
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+STATEMENT_PERIODS = 3
+FREQUENCIES = ("quarterly", "annual")
+
+# Line item kinds that are labels only and carry no values
+LABEL_KINDS = ("section_header", "subsection", "blank")
+
+# Field name -> other yfinance row labels used for the same line item, in order
+# of preference. Labels are matched case- and whitespace-insensitively.
+FIELD_ALIASES = {
+    "Total Liabilities": ["Total Liabilities Net Minority Interest"],
+    "Current Assets": ["Total Current Assets"],
+    "Current Liabilities": ["Total Current Liabilities"],
+    "Stockholders Equity": ["Common Stock Equity", "Total Equity Gross Minority Interest"],
+    "Total Revenue": ["Operating Revenue"],
+    "Net Income": ["Net Income From Continuing Operations"],
+    "Depreciation And Amortization": ["Depreciation Amortization Depletion"],
+    "Changes in Account Receivables": ["Change In Receivables"],
+    "Inventory": ["Inventories"],
+}
+
+# Ratio variable -> (statement, field name, value used when the field is missing;
+# None means ratios using the variable are not shown without the field)
+RATIO_FIELDS = {
+    "current_assets": ("balance_sheet", "Current Assets", None),
+    "current_liabilities": ("balance_sheet", "Current Liabilities", None),
+    "inventory": ("balance_sheet", "Inventory", 0),
+    "total_assets": ("balance_sheet", "Total Assets", None),
+    "total_liabilities": ("balance_sheet", "Total Liabilities", None),
+    "total_revenue": ("income", "Total Revenue", None),
+    "gross_profit": ("income", "Gross Profit", None),
+    "operating_income": ("income", "Operating Income", None),
+    "net_income": ("income", "Net Income", None),
+    "operating_cash_flow": ("cash_flow", "Operating Cash Flow", 0),
+    "investing_cash_flow": ("cash_flow", "Investing Cash Flow", 0),
+    "financing_cash_flow": ("cash_flow", "Financing Cash Flow", 0),
+}
+
+# Display name -> (expression over RATIO_FIELDS variables, display format).
+# "currency" values show every period; "ratio" and "percent" values are left
+# blank where the expression is undefined (e.g. a zero denominator).
+RATIOS = {
+    "Working Capital": ("current_assets - current_liabilities", "currency"),
+    "Net Worth (OE)": ("total_assets - total_liabilities", "currency"),
+    "Current Ratio": ("current_assets / current_liabilities", "ratio"),
+    "Quick Ratio": ("(current_assets - inventory) / current_liabilities", "ratio"),
+    "Debt to Equity": ("total_liabilities / (total_assets - total_liabilities)", "ratio"),
+    "Gross Margin %": ("gross_profit / total_revenue * 100", "percent"),
+    "Operating Margin %": ("operating_income / total_revenue * 100", "percent"),
+    "Net Margin %": ("net_income / total_revenue * 100", "percent"),
+    "Net Cash Flow": ("operating_cash_flow + investing_cash_flow + financing_cash_flow", "currency"),
+}
+
+
+def value_label(frequency: str, period) -> str:
+    """Display column of a period's values."""
+    if frequency == "quarterly":
+        return f"Q {period.strftime('%m/%d/%Y')}"
+    return f"FY {period.year}"
+
+
+def change_label(frequency: str, period, position: int) -> str:
+    """Display column of a period's change from the period before it in the table."""
+    if frequency == "quarterly":
+        return f"Q Δ% {position}"
+    return f"FY{period.year} Δ%"
+
+
+def format_thousands(value) -> str:
+    """Format a dollar value in thousands, with parentheses for negatives."""
+    if pd.isna(value):
+        return "-"
+    value = value / 1000
+    if value < 0:
+        return f"$({abs(value):,.0f})"
+    return f"${value:,.0f}"
+
+
+def format_change(value) -> str:
+    """Format a percentage change as a colored HTML span."""
+    if pd.isna(value):
+        return "-"
+    if value > 0:
+        return f'<span class="percentage-positive">+{value:.1f}%</span>'
+    return f'<span class="percentage-negative">{value:.1f}%</span>'
+
+
+def format_ratio_value(value, value_format: str) -> Optional[str]:
+    """Format a calculated value, or None if the cell should stay blank."""
+    if value_format == "currency":
+        return format_thousands(value)
+    if not np.isfinite(value):
+        return None
+    if value_format == "percent":
+        return f"{value:.1f}%"
+    return f"{value:.2f}"
+
+
+def normalize_label(label) -> str:
+    """Case- and whitespace-insensitive form of a row label."""
+    return " ".join(str(label).split()).lower()
+
+
+class FieldIndex:
+    """
+    Constant-time lookup of a statement's rows by field name or alias.
+
+    Built once per statement; the first row with a given normalized label wins.
+    """
+
+    def __init__(self, statement: pd.DataFrame, aliases: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            statement: yfinance statement (rows = line items)
+            aliases: Field name -> alternative row labels (defaults to FIELD_ALIASES)
+        """
+        self.statement = statement
+        self.labels: Dict[str, str] = {}
+        for label in statement.index:
+            self.labels.setdefault(normalize_label(label), label)
+        aliases = FIELD_ALIASES if aliases is None else aliases
+        self.aliases = {normalize_label(field): alternatives for field, alternatives in aliases.items()}
+
+    def resolve(self, field_name: str) -> Optional[str]:
+        """Row label for a field name, trying its aliases if the name itself is absent."""
+        key = normalize_label(field_name)
+        for candidate in (key, *map(normalize_label, self.aliases.get(key, []))):
+            label = self.labels.get(candidate)
+            if label is not None:
+                return label
+        return None
+
+
+def period_matrix(statement: Optional[pd.DataFrame], fields: Dict[str, str],
+                  periods: int = STATEMENT_PERIODS, field_index: Optional[FieldIndex] = None) -> pd.DataFrame:
+    """
+    Numeric matrix of a statement's line items over its latest periods.
+
+    Args:
+        statement: yfinance statement (rows = line items, columns = periods, latest first)
+        fields: Display item name -> statement field name
+        periods: Number of latest periods to keep
+        field_index: Prebuilt FieldIndex of the statement
+
+    Returns:
+        DataFrame indexed by display item name (items whose field is missing are
+        left out), one float column per period
+    """
+    if statement is None or statement.empty:
+        return pd.DataFrame()
+
+    field_index = field_index or FieldIndex(statement)
+    statement = statement[~statement.index.duplicated()]
+    resolved = {item: field_index.resolve(field) for item, field in fields.items()}
+    resolved = {item: label for item, label in resolved.items() if label is not None}
+
+    matrix = statement.loc[list(resolved.values()), statement.columns[:periods]]
+    matrix.index = list(resolved.keys())
+    return matrix.apply(pd.to_numeric, errors="coerce").astype("float64")
+
+
+def period_changes(matrix: pd.DataFrame) -> pd.DataFrame:
+    """
+    Percentage change of every period from the period before it in the matrix.
+
+    Periods run latest first, so each change is measured from the newer period
+    to the older one, as the statement tables have always shown it. Changes
+    from a zero value are NaN; the first period has no change.
+    """
+    previous = matrix.shift(1, axis=1)
+    return ((matrix - previous) / previous.abs() * 100).where(previous != 0)
+
+
+def ratio_variables(expression: str) -> List[str]:
+    """RATIO_FIELDS variables an expression uses."""
+    return [name for name in dict.fromkeys(re.findall(r'[A-Za-z_]\w*', expression)) if name in RATIO_FIELDS]
+
+
+def evaluate_ratios(statements: Dict[str, Dict[str, Optional[pd.DataFrame]]],
+                    ratios: Optional[Dict[str, Tuple[str, str]]] = None,
+                    periods: int = STATEMENT_PERIODS,
+                    field_index: Callable[[pd.DataFrame], FieldIndex] = FieldIndex) -> Dict[str, Dict[str, pd.Series]]:
+    """
+    Evaluate every ratio for every period in one vectorized pass.
+
+    The variables of all statements are aligned by period into one frame,
+    quarterly and annual stacked together, and all ratio expressions are
+    evaluated with a single multi-line DataFrame.eval.
+
+    Args:
+        statements: Statement ("balance_sheet"/"income"/"cash_flow") -> frequency -> yfinance statement
+        ratios: Display name -> (expression, format) (defaults to RATIOS)
+        periods: Number of latest periods per statement
+        field_index: Returns the FieldIndex of a statement
+
+    Returns:
+        Display name -> frequency -> values indexed by period; a ratio is left
+        out for a frequency when a variable without a default is missing
+    """
+    ratios = RATIOS if ratios is None else ratios
+    frames = {}
+    available = {}
+    statement_periods = {}
+
+    for frequency in FREQUENCIES:
+        parts = []
+        for statement_name, by_frequency in statements.items():
+            statement = by_frequency.get(frequency)
+            if statement is None or statement.empty:
+                continue
+            fields = {name: field for name, (source, field, _) in RATIO_FIELDS.items() if source == statement_name}
+            matrix = period_matrix(statement, fields, periods, field_index(statement))
+            statement_periods[(frequency, statement_name)] = list(statement.columns[:periods])
+            parts.append(matrix.T)
+
+        frame = pd.concat(parts, axis=1) if parts else pd.DataFrame()
+        available[frequency] = set(frame.columns)
+        for name, (_, _, default) in RATIO_FIELDS.items():
+            if name not in frame.columns:
+                frame[name] = np.nan if default is None else default
+        frames[frequency] = frame
+
+    stacked = pd.concat(frames, names=["frequency", "period"])
+    targets = {name: f"ratio_{i}" for i, name in enumerate(ratios)}
+    program = "\n".join(f"{targets[name]} = {expression}" for name, (expression, _) in ratios.items())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        evaluated = stacked.eval(program) if len(stacked) else stacked
+
+    results: Dict[str, Dict[str, pd.Series]] = {}
+    for name, (expression, _) in ratios.items():
+        variables = ratio_variables(expression)
+        sources = sorted({RATIO_FIELDS[variable][0] for variable in variables})
+        if not sources:
+            continue
+        for frequency in FREQUENCIES:
+            required = [variable for variable in variables if RATIO_FIELDS[variable][2] is None]
+            if any(variable not in available[frequency] for variable in required):
+                continue
+            if any((frequency, source) not in statement_periods for source in sources):
+                continue
+            # Periods every source statement reports, in the first statement's (latest first) order
+            ratio_periods = [period for period in statement_periods[(frequency, sources[0])]
+                             if all(period in statement_periods[(frequency, source)] for source in sources)]
+            values = evaluated.loc[frequency, targets[name]]
+            results.setdefault(name, {})[frequency] = values.loc[ratio_periods]
+    return results
+
+
+class StatementTable:
+    """
+    One financial statement held as numeric metrics × periods matrices.
+
+    Quarterly and annual values are kept as floats and their period-over-period
+    changes are computed in one vectorized pass; formatting is applied only in
+    render(), so the numbers can be reused for ratios and exports.
+    """
+
+    def __init__(self, items: List[Tuple[str, Optional[str], str]], statements: Dict[str, Optional[pd.DataFrame]],
+                 with_changes: bool = True, periods: int = STATEMENT_PERIODS,
+                 field_index: Callable[[pd.DataFrame], FieldIndex] = FieldIndex):
+        """
+        Args:
+            items: (display name, statement field name or None, item kind) in display order
+            statements: Frequency ("quarterly"/"annual") -> yfinance statement or None
+            with_changes: Render a Δ% column after every period but the first
+            periods: Number of latest periods to show
+            field_index: Returns the FieldIndex of a statement (lets callers reuse indexes)
+        """
+        self.items = items
+        self.with_changes = with_changes
+        fields = {name: field for name, field, kind in items if field and kind not in LABEL_KINDS}
+        self.values = {}
+        for frequency in FREQUENCIES:
+            statement = statements.get(frequency)
+            index = field_index(statement) if statement is not None and not statement.empty else None
+            self.values[frequency] = period_matrix(statement, fields, periods, index)
+        self.changes = {frequency: period_changes(matrix) for frequency, matrix in self.values.items()}
+
+    def _item_cells(self, name: str) -> Dict[str, str]:
+        """Formatted value and change cells of a line item."""
+        cells = {}
+        for frequency in FREQUENCIES:
+            matrix = self.values[frequency]
+            if name not in matrix.index:
+                continue
+            values = matrix.loc[name]
+            changes = self.changes[frequency].loc[name]
+            for position, period in enumerate(matrix.columns):
+                cells[value_label(frequency, period)] = format_thousands(values.iloc[position])
+                if self.with_changes and position > 0:
+                    cells[change_label(frequency, period, position)] = format_change(changes.iloc[position])
+        return cells
+
+    def _calculated_cells(self, name: str, values: Dict[str, pd.Series], value_format: str) -> Dict[str, str]:
+        """Formatted cells of a calculated row."""
+        cells = {}
+        for frequency in FREQUENCIES:
+            for period, value in values.get(frequency, pd.Series(dtype="float64")).items():
+                cell = format_ratio_value(value, value_format)
+                if cell is not None:
+                    cells[value_label(frequency, period)] = cell
+        return cells
+
+    def render(self, calculated: Optional[Dict[str, Dict[str, pd.Series]]] = None,
+               ratios: Optional[Dict[str, Tuple[str, str]]] = None) -> pd.DataFrame:
+        """
+        Render the statement as a display table.
+
+        Args:
+            calculated: Output of evaluate_ratios, filling the rows of the same name
+            ratios: Ratio definitions giving the display format (defaults to RATIOS)
+
+        Returns:
+            DataFrame with an "Item" column and one column per period (and change)
+        """
+        calculated = calculated or {}
+        ratios = RATIOS if ratios is None else ratios
+        rows = []
+        for name, _, kind in self.items:
+            row = {"Item": name}
+            if kind not in LABEL_KINDS:
+                row.update(self._item_cells(name))
+                if name in calculated:
+                    row.update(self._calculated_cells(name, calculated[name], ratios[name][1]))
+            rows.append(row)
+        return pd.DataFrame(rows)
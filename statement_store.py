@@ -0,0 +1,320 @@
+import os
+import time
+import shutil
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from rate_limited_clients import RateLimiter
+from statement_engine import FIELD_ALIASES, FREQUENCIES, RATIO_FIELDS, RATIOS, ratio_variables, normalize_label
+
+
+STATEMENT_STORE_PATH = os.path.join("statement_store", "statements")
+# Stored statements younger than this are not refetched by load_tickers
+STATEMENT_STORE_MAX_AGE_HOURS = 24
+# Yahoo Finance requests per second across all bulk-loading workers
+YAHOO_REQUESTS_PER_SECOND = 4
+
+# yfinance statement key -> (statement, frequency)
+STATEMENT_KEYS = {
+    "quarterly_balance_sheet": ("balance_sheet", "quarterly"),
+    "annual_balance_sheet": ("balance_sheet", "annual"),
+    "quarterly_income": ("income", "quarterly"),
+    "annual_income": ("income", "annual"),
+    "quarterly_cashflow": ("cash_flow", "quarterly"),
+    "annual_cashflow": ("cash_flow", "annual"),
+}
+
+STORE_COLUMNS = ["ticker", "frequency", "statement", "period_end", "field", "label", "value", "fetched_at"]
+
+yahoo_limiter = RateLimiter(YAHOO_REQUESTS_PER_SECOND)
+
+
+def normalize_statements(ticker: str, data: Dict[str, Optional[pd.DataFrame]],
+                         fetched_at: Optional[float] = None) -> pd.DataFrame:
+    """
+    Convert yfinance statements into one long table.
+
+    Args:
+        ticker: Company ticker
+        data: Statement key (see STATEMENT_KEYS) -> yfinance statement (rows = line items, columns = periods)
+        fetched_at: Fetch time (defaults to now)
+
+    Returns:
+        DataFrame with one row per ticker, frequency, statement, period and field
+        (STORE_COLUMNS); label is the normalized field name used for lookups
+    """
+    fetched_at = time.time() if fetched_at is None else fetched_at
+    parts = []
+    for key, (statement_name, frequency) in STATEMENT_KEYS.items():
+        statement = data.get(key)
+        if statement is None or statement.empty:
+            continue
+        rows, periods = statement.shape
+        parts.append(pd.DataFrame({
+            "field": np.repeat(statement.index.to_numpy(), periods),
+            "period_end": np.tile(statement.columns.to_numpy(), rows),
+            "value": statement.to_numpy().ravel(),
+            "statement": statement_name,
+            "frequency": frequency,
+        }))
+
+    if not parts:
+        return pd.DataFrame(columns=STORE_COLUMNS)
+
+    frame = pd.concat(parts, ignore_index=True)
+    frame["ticker"] = ticker.upper()
+    frame["field"] = frame["field"].astype(str)
+    frame["label"] = frame["field"].map(normalize_label)
+    frame["period_end"] = pd.to_datetime(frame["period_end"])
+    frame["value"] = pd.to_numeric(frame["value"], errors="coerce").astype("float64")
+    frame["fetched_at"] = fetched_at
+    return frame[STORE_COLUMNS]
+
+
+class StatementStore:
+    """
+    Columnar store of yfinance statements for many tickers.
+
+    Statements are kept in a Parquet dataset partitioned by ticker and
+    frequency (quarterly/annual), so a ticker is rewritten without touching
+    the others and cross-sectional queries read only the columns and
+    partitions they need, without the network.
+    """
+
+    def __init__(self, path: str = STATEMENT_STORE_PATH):
+        """
+        Args:
+            path: Directory of the Parquet dataset
+        """
+        self.path = path
+        self._write_lock = threading.Lock()
+
+    def write(self, ticker: str, data: Dict[str, Optional[pd.DataFrame]]) -> int:
+        """
+        Replace the stored statements of a ticker.
+
+        Args:
+            ticker: Company ticker
+            data: Statement key -> yfinance statement
+
+        Returns:
+            Number of values stored
+        """
+        frame = normalize_statements(ticker, data)
+        if frame.empty:
+            return 0
+        with self._write_lock:
+            ticker_dir = os.path.join(self.path, f"ticker={ticker.upper()}")
+            if os.path.isdir(ticker_dir):
+                shutil.rmtree(ticker_dir)
+            frame.to_parquet(self.path, engine="pyarrow", partition_cols=["ticker", "frequency"], index=False)
+        return len(frame)
+
+    def load(self, tickers: Optional[Iterable[str]] = None, frequency: Optional[str] = None,
+             statement: Optional[str] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Read stored statements.
+
+        Args:
+            tickers: Only these tickers (default all)
+            frequency: Only "quarterly" or "annual" (default both)
+            statement: Only "balance_sheet", "income" or "cash_flow" (default all)
+            columns: Columns to read (default STORE_COLUMNS)
+
+        Returns:
+            DataFrame with the requested columns (empty if nothing is stored)
+        """
+        columns = list(STORE_COLUMNS if columns is None else columns)
+        if not os.path.isdir(self.path):
+            return pd.DataFrame(columns=columns)
+
+        filters = []
+        if tickers is not None:
+            filters.append(("ticker", "in", [ticker.upper() for ticker in tickers]))
+        if frequency is not None:
+            filters.append(("frequency", "==", frequency))
+        if statement is not None:
+            filters.append(("statement", "==", statement))
+
+        frame = pd.read_parquet(self.path, engine="pyarrow", columns=columns, filters=filters or None)
+        # Partition columns come back as categoricals
+        for column in ("ticker", "frequency"):
+            if column in frame.columns:
+                frame[column] = frame[column].astype(str)
+        return frame
+
+    def fetched_at(self) -> pd.Series:
+        """Fetch time of every stored ticker."""
+        frame = self.load(columns=["ticker", "fetched_at"])
+        return frame.groupby("ticker")["fetched_at"].max()
+
+    def field_values(self, field_name: str, frequency: str = "quarterly",
+                     tickers: Optional[Iterable[str]] = None, statement: Optional[str] = None) -> pd.DataFrame:
+        """
+        Values of one field for every ticker and period.
+
+        The field is matched like FieldIndex does: by normalized label, then by
+        its FIELD_ALIASES in order of preference.
+
+        Args:
+            field_name: yfinance field name (e.g. "Current Assets")
+            frequency: "quarterly" or "annual"
+            tickers: Only these tickers (default all)
+            statement: Only this statement (default all); fields like "Net Income"
+                       appear on both the income and the cash-flow statement
+
+        Returns:
+            DataFrame indexed by (ticker, period_end) with a value column
+        """
+        key = normalize_label(field_name)
+        aliases = {normalize_label(field): alternatives for field, alternatives in FIELD_ALIASES.items()}
+        preference = {label: rank for rank, label in
+                      enumerate(dict.fromkeys([key, *map(normalize_label, aliases.get(key, []))]))}
+
+        frame = self.load(tickers, frequency, statement, columns=["ticker", "period_end", "label", "value"])
+        frame = frame[frame["label"].isin(list(preference))].dropna(subset=["value"])
+        frame = frame.assign(preference=frame["label"].map(preference))
+        frame = frame.sort_values("preference", kind="stable").drop_duplicates(["ticker", "period_end"], keep="first")
+        return frame.set_index(["ticker", "period_end"])[["value"]].sort_index()
+
+    def ratio_values(self, ratio: str, frequency: str = "quarterly",
+                     tickers: Optional[Iterable[str]] = None) -> pd.Series:
+        """
+        A RATIOS entry for every ticker and period, evaluated in one pass.
+
+        Args:
+            ratio: RATIOS display name (e.g. "Current Ratio")
+            frequency: "quarterly" or "annual"
+            tickers: Only these tickers (default all)
+
+        Returns:
+            Series indexed by (ticker, period_end); periods missing a variable
+            without a default are left out
+        """
+        expression, _ = RATIOS[ratio]
+        variables = ratio_variables(expression)
+        values = {variable: self.field_values(RATIO_FIELDS[variable][1], frequency, tickers,
+                                              statement=RATIO_FIELDS[variable][0])["value"]
+                  for variable in variables}
+        frame = pd.DataFrame(values, columns=variables)
+        required = [variable for variable in variables if RATIO_FIELDS[variable][2] is None]
+        frame = frame.dropna(subset=required)
+        frame = frame.fillna({variable: RATIO_FIELDS[variable][2] for variable in variables
+                              if RATIO_FIELDS[variable][2] is not None})
+        if frame.empty:
+            return pd.Series(dtype="float64", name=ratio)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = frame.eval(expression)
+        return result.rename(ratio)
+
+    def cross_section(self, ratio: str, frequency: str = "quarterly",
+                      tickers: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Latest value of a ratio for every ticker, e.g. the current ratio of all names.
+
+        Args:
+            ratio: RATIOS display name
+            frequency: "quarterly" or "annual"
+            tickers: Only these tickers (default all)
+
+        Returns:
+            DataFrame indexed by ticker with the period_end and value of the
+            latest period the ratio can be calculated for
+        """
+        values = self.ratio_values(ratio, frequency, tickers)
+        values = values[np.isfinite(values)]
+        if values.empty:
+            return pd.DataFrame(columns=["period_end", ratio])
+        latest = values.reset_index().sort_values("period_end").groupby("ticker").tail(1)
+        return latest.set_index("ticker").sort_index()
+
+    def _fetch_and_write(self, ticker: str) -> bool:
+        """
+        Fetch the six yfinance statements of a ticker within the Yahoo rate limit and store them.
+
+        write replaces the whole ticker partition, so nothing is written when any
+        statement fetch fails: the previously stored statements are kept and the
+        ticker is retried on the next load.
+        """
+        import yfinance as yf
+        from Financial_Data_Fetcher import STATEMENT_ATTRIBUTES
+
+        stock = yf.Ticker(ticker)
+        data = {}
+        for key, attribute in STATEMENT_ATTRIBUTES.items():
+            yahoo_limiter.acquire()
+            try:
+                data[key] = getattr(stock, attribute)
+            except Exception as e:
+                print(f"Warning: Could not fetch {attribute} for {ticker}: {e}; keeping stored statements")
+                return False
+        return self.write(ticker, data) > 0
+
+    def load_tickers(self, tickers: Iterable[str], force: bool = False, max_workers: int = 8,
+                     max_age_hours: float = STATEMENT_STORE_MAX_AGE_HOURS) -> Dict[str, bool]:
+        """
+        Fetch the statements of many tickers concurrently into the store.
+
+        Args:
+            tickers: Tickers to load
+            force: Refetch tickers whose stored statements are still fresh
+            max_workers: Tickers fetched at once
+            max_age_hours: Age after which stored statements are refetched
+
+        Returns:
+            dict: ticker -> True if its statements are stored
+        """
+        tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+        fetched_at = self.fetched_at()
+        fresh = set(fetched_at[time.time() - fetched_at < max_age_hours * 3600].index)
+
+        def load_ticker(ticker):
+            if not force and ticker in fresh:
+                return True
+            try:
+                return self._fetch_and_write(ticker)
+            except Exception as e:
+                print(f"Warning: Could not load statements for {ticker}: {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(tickers, executor.map(load_ticker, tickers)))
+
+
+shared_store = StatementStore()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk yfinance statement store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    load_parser = subparsers.add_parser("load", help="Fetch a watchlist into the store")
+    load_parser.add_argument("tickers", nargs="*", help="Tickers to load")
+    load_parser.add_argument("--watchlist", help="File with one ticker per line")
+    load_parser.add_argument("--force", action="store_true", help="Refetch statements that are still fresh")
+    load_parser.add_argument("--workers", type=int, default=8, help="Tickers fetched at once")
+    query_parser = subparsers.add_parser("query", help="Latest value of a ratio for every stored ticker")
+    query_parser.add_argument("ratio", choices=list(RATIOS), help="Ratio to show")
+    query_parser.add_argument("--frequency", choices=list(FREQUENCIES), default="quarterly")
+    args = parser.parse_args()
+
+    if args.command == "query":
+        print(shared_store.cross_section(args.ratio, args.frequency).to_string())
+        return
+
+    tickers = list(args.tickers)
+    if args.watchlist:
+        with open(args.watchlist, "r", encoding="utf-8") as f:
+            tickers += [line.split("#")[0] for line in f]
+
+    results = shared_store.load_tickers(tickers, force=args.force, max_workers=args.workers)
+    for ticker, stored in results.items():
+        print(f"{'✅' if stored else '❌'} {ticker}")
+    print(f"Stored {sum(results.values())}/{len(results)} tickers in {shared_store.path}")
+
+
+if __name__ == "__main__":
+    main()
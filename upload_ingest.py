@@ -0,0 +1,353 @@
+import os
+import time
+import uuid
+import hashlib
+import importlib.util
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Dict, Iterator, Optional, Tuple
+
+from Account_Overview import (
+    AccountOverview,
+    BUSINESS_UNITS_PATH,
+    aging_balances,
+    format_aging_table,
+    payment_totals,
+    resolve_reference_date,
+    summarize_payments,
+    total_credits,
+)
+
+
+# Rows read from an upload at a time; peak memory is bounded by one chunk
+INGEST_CHUNK_ROWS = 100_000
+
+# Column -> dtype of the only columns the account overview reads
+ITEM_LIST_COLUMNS = {
+    "Unit": "category",
+    "Days Late": "float32",
+    "Item Balance": "float64",
+}
+PAYMENT_HISTORY_COLUMNS = {
+    "Payment Date": "datetime64[ns]",
+    "Amt Applied to Customer": "float64",
+    "Days Past Due": "float32",
+    "Terms": "category",
+}
+
+# Parsed Excel uploads, kept as Parquet by content hash so re-uploads skip Excel parsing
+UPLOAD_CACHE_DIR = "upload_cache"
+# Cached uploads are customer data: they are removed this long after being parsed
+UPLOAD_CACHE_MAX_AGE_DAYS = 7
+# Part of the cache key; bump when parsing changes so stale Parquet files are not served
+UPLOAD_CACHE_VERSION = 1
+
+# Column dtype -> Parquet type of the upload cache
+ARROW_TYPES = {
+    "category": pa.string(),
+    "float32": pa.float32(),
+    "float64": pa.float64(),
+    "datetime64[ns]": pa.timestamp("ns"),
+}
+
+
+def _compact(frame: pd.DataFrame, columns: Dict[str, str]) -> pd.DataFrame:
+    """Convert the columns of a frame read without dtypes to their compact dtypes."""
+    for column, dtype in columns.items():
+        if dtype == "category":
+            frame[column] = frame[column].astype("category")
+        elif dtype.startswith("float"):
+            frame[column] = pd.to_numeric(frame[column], errors="coerce").astype(dtype)
+        elif dtype.startswith("datetime"):
+            frame[column] = pd.to_datetime(frame[column], errors="coerce").astype(dtype)
+    return frame
+
+
+def _csv_chunks(source, columns: Dict[str, str], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV upload in chunks, parsing its date columns with one format for the whole file.
+
+    pandas infers a date format from the first value it parses; inferring it
+    per chunk would let a chunk boundary change which dates become NaT, so the
+    format of the first date in the file is reused for every chunk, as a
+    whole-file read does.
+    """
+    date_columns = [column for column, dtype in columns.items() if dtype.startswith("datetime")]
+    dtypes = {column: "string" if column in date_columns else dtype for column, dtype in columns.items()}
+    formats: Dict[str, str] = {}
+
+    for chunk in pd.read_csv(source, usecols=list(columns), dtype=dtypes, chunksize=chunk_rows):
+        for column in date_columns:
+            if column not in formats:
+                dates = chunk[column].dropna()
+                if not dates.empty:
+                    formats[column] = guess_datetime_format(dates.iloc[0]) or "mixed"
+            chunk[column] = pd.to_datetime(chunk[column], format=formats.get(column),
+                                           errors="coerce").astype(columns[column])
+        yield chunk
+
+
+def excel_engine() -> str:
+    """Fastest installed Excel reader: calamine (python-calamine) if available, else openpyxl."""
+    # pandas reads with calamine from 2.2 on
+    calamine = importlib.util.find_spec("python_calamine") and importlib.util.find_spec("pandas.io.excel._calamine")
+    return "calamine" if calamine else "openpyxl"
+
+
+def upload_hash(source) -> str:
+    """Content hash of an uploaded file (or path)."""
+    digest = hashlib.sha256()
+    if hasattr(source, "getvalue"):
+        digest.update(source.getvalue())
+    else:
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _openpyxl_chunks(source, columns: Dict[str, str], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Stream the needed columns of the first sheet with openpyxl in read-only mode."""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else "" for cell in next(rows, ())]
+        missing = [column for column in columns if column not in header]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        positions = [header.index(column) for column in columns]
+
+        batch = []
+        for row in rows:
+            values = [row[position] if position < len(row) else None for position in positions]
+            if all(value is None for value in values):
+                continue
+            batch.append(values)
+            if len(batch) == chunk_rows:
+                yield _compact(pd.DataFrame(batch, columns=list(columns)), columns)
+                batch = []
+        if batch:
+            yield _compact(pd.DataFrame(batch, columns=list(columns)), columns)
+    finally:
+        workbook.close()
+
+
+def _excel_chunks(source, columns: Dict[str, str], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Parse the needed columns of an Excel upload with the fastest available engine."""
+    name = getattr(source, "name", str(source))
+    engine = excel_engine()
+    if engine == "openpyxl" and not name.lower().endswith(".xls"):
+        yield from _openpyxl_chunks(source, columns, chunk_rows)
+        return
+
+    # calamine (or xlrd for legacy .xls) parses the sheet at once; it is then folded in slices
+    frame = _compact(pd.read_excel(source, engine=engine if engine == "calamine" else None,
+                                   usecols=list(columns)), columns)
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def prune_upload_cache(cache_dir: str = UPLOAD_CACHE_DIR,
+                       max_age_days: float = UPLOAD_CACHE_MAX_AGE_DAYS) -> int:
+    """
+    Remove cached uploads (and abandoned partial files) older than max_age_days.
+
+    Returns:
+        Number of files removed
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for entry in os.scandir(cache_dir):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError as e:
+            print(f"Warning: Could not remove cached upload {entry.path}: {e}")
+    return removed
+
+
+def _cached_excel_chunks(source, columns: Dict[str, str], chunk_rows: int,
+                         cache_dir: str = UPLOAD_CACHE_DIR,
+                         content_hash: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Chunks of an Excel upload, from the Parquet cache when it was parsed before.
+
+    On a cache miss the Excel chunks are written to the cache as they are
+    parsed; the cache file only appears once the whole upload was read.
+    Expired cache files are removed first, so they are never served.
+    """
+    prune_upload_cache(cache_dir)
+    column_key = hashlib.sha256(f"v{UPLOAD_CACHE_VERSION}|".encode() + "|".join(
+        f"{column}:{dtype}" for column, dtype in columns.items()).encode())
+    content_hash = content_hash or upload_hash(source)
+    path = os.path.join(cache_dir, f"{content_hash}_{column_key.hexdigest()[:12]}.parquet")
+
+    if os.path.exists(path):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=list(columns)):
+            yield _compact(batch.to_pandas(), columns)
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    schema = pa.schema([(column, ARROW_TYPES[dtype]) for column, dtype in columns.items()])
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    writer = pq.ParquetWriter(temp_path, schema)
+    complete = False
+    try:
+        for chunk in _excel_chunks(source, columns, chunk_rows):
+            # Categories are stored as plain strings so every chunk has the same schema
+            plain = chunk.astype({column: object for column, dtype in columns.items() if dtype == "category"})
+            writer.write_table(pa.Table.from_pandas(plain, schema=schema, preserve_index=False))
+            yield chunk
+        complete = True
+    finally:
+        writer.close()
+        if complete:
+            os.replace(temp_path, path)
+        else:
+            os.remove(temp_path)
+
+
+def read_chunks(source, columns: Dict[str, str], chunk_rows: int = INGEST_CHUNK_ROWS,
+                cache_dir: Optional[str] = UPLOAD_CACHE_DIR,
+                content_hash: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read the needed columns of an uploaded CSV or Excel file in chunks, with compact dtypes.
+
+    Excel uploads are parsed with excel_engine() and cached as Parquet by
+    content hash, so re-uploading the same file skips Excel parsing.
+
+    Args:
+        source: Uploaded file (or path); CSV if its name ends with .csv, Excel otherwise
+        columns: Column -> dtype of the columns to read; other columns are skipped
+        chunk_rows: Rows per chunk
+        cache_dir: Parquet cache of Excel uploads (None to always parse)
+        content_hash: upload_hash of source, if already computed
+
+    Yields:
+        DataFrames of at most chunk_rows rows with only the requested columns
+    """
+    if hasattr(source, "seek"):
+        source.seek(0)
+    name = getattr(source, "name", str(source))
+
+    if name.lower().endswith(".csv"):
+        yield from _csv_chunks(source, columns, chunk_rows)
+    elif cache_dir is None:
+        yield from _excel_chunks(source, columns, chunk_rows)
+    else:
+        yield from _cached_excel_chunks(source, columns, chunk_rows, cache_dir, content_hash)
+
+
+def fold_item_list(source, business_units_path: str = BUSINESS_UNITS_PATH,
+                   chunk_rows: int = INGEST_CHUNK_ROWS, cache_dir: Optional[str] = UPLOAD_CACHE_DIR,
+                   content_hash: Optional[str] = None) -> Tuple[pd.DataFrame, float]:
+    """
+    Aging balances and total credits of an item-list upload, folded chunk by chunk.
+
+    Args:
+        source: Uploaded item list
+        business_units_path: Business-unit mapping of the aging table
+        chunk_rows: Rows per chunk
+        cache_dir: Parquet cache of Excel uploads (None to always parse)
+        content_hash: upload_hash of source, if already computed
+
+    Returns:
+        (aging_balances of the whole list, total credits)
+    """
+    balances = None
+    credits = 0.0
+    for chunk in read_chunks(source, ITEM_LIST_COLUMNS, chunk_rows, cache_dir, content_hash):
+        chunk_balances = aging_balances(chunk, business_units_path)
+        balances = chunk_balances if balances is None else balances + chunk_balances
+        credits += total_credits(chunk)
+
+    if balances is None:
+        empty = pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in ITEM_LIST_COLUMNS.items()})
+        balances = aging_balances(empty, business_units_path)
+    return balances, credits
+
+
+def fold_payment_history(source, reference_date=None, chunk_rows: int = INGEST_CHUNK_ROWS,
+                         cache_dir: Optional[str] = UPLOAD_CACHE_DIR, content_hash: Optional[str] = None) -> Dict:
+    """
+    Payment-history metrics of an upload, folded chunk by chunk.
+
+    Args:
+        source: Uploaded payment history
+        reference_date: Date the L3M and LTM windows end on (defaults to today)
+        chunk_rows: Rows per chunk
+        cache_dir: Parquet cache of Excel uploads (None to always parse)
+        content_hash: upload_hash of source, if already computed
+
+    Returns:
+        dict as returned by Account_Overview.payment_history_metrics
+    """
+    reference_date = resolve_reference_date(reference_date)
+    by_window = None
+    last_payment_date: Optional[pd.Timestamp] = None
+    last_payment_amount = 0.0
+    net_terms = None
+
+    for chunk in read_chunks(source, PAYMENT_HISTORY_COLUMNS, chunk_rows, cache_dir, content_hash):
+        if net_terms is None and not chunk.empty:
+            net_terms = chunk["Terms"].iloc[0]
+
+        chunk_windows, chunk_date, chunk_amount = payment_totals(chunk, reference_date)
+        by_window = chunk_windows if by_window is None else by_window + chunk_windows
+
+        # Keep the latest payment day, adding up its payments across chunks
+        if chunk_date is None:
+            continue
+        if last_payment_date is None or chunk_date.normalize() > last_payment_date.normalize():
+            last_payment_date, last_payment_amount = chunk_date, chunk_amount
+        elif chunk_date.normalize() == last_payment_date.normalize():
+            last_payment_date = max(last_payment_date, chunk_date)
+            last_payment_amount += chunk_amount
+
+    if by_window is None:
+        empty = pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in PAYMENT_HISTORY_COLUMNS.items()})
+        by_window = payment_totals(empty, reference_date)[0]
+    return summarize_payments(by_window, last_payment_date, last_payment_amount,
+                              "N/A" if net_terms is None else net_terms)
+
+
+def ingest_account_overview(item_list_source, payment_history_source, reference_date=None,
+                            business_units_path: str = BUSINESS_UNITS_PATH,
+                            chunk_rows: int = INGEST_CHUNK_ROWS,
+                            cache_dir: Optional[str] = UPLOAD_CACHE_DIR,
+                            upload_hashes: Optional[Tuple[str, str]] = None) -> AccountOverview:
+    """
+    Compute the account overview straight from the uploads, without loading them whole.
+
+    Only the needed columns are read, with compact dtypes, chunk_rows rows
+    at a time; each chunk is folded into running totals and dropped, so
+    peak memory does not grow with the file size.
+
+    Args:
+        item_list_source: Uploaded item list (CSV or Excel)
+        payment_history_source: Uploaded payment history (CSV or Excel)
+        reference_date: Date the L3M and LTM windows end on (defaults to today)
+        business_units_path: Business-unit mapping of the aging table
+        chunk_rows: Rows per chunk
+        cache_dir: Parquet cache of Excel uploads (None to always parse)
+        upload_hashes: upload_hash of the item list and payment history, if already computed
+
+    Returns:
+        AccountOverview, as Account_Overview.compute_account_overview returns it
+    """
+    item_list_hash, payment_history_hash = upload_hashes or (None, None)
+    balances, credits = fold_item_list(item_list_source, business_units_path, chunk_rows,
+                                       cache_dir, item_list_hash)
+    return AccountOverview(
+        aging=format_aging_table(balances, business_units_path),
+        total_credits=credits,
+        **fold_payment_history(payment_history_source, reference_date, chunk_rows,
+                               cache_dir, payment_history_hash),
+    )